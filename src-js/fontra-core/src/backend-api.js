@@ -16,9 +16,13 @@ import { VarPackedPath } from "./var-path.js";
 class AbstractBackend {
   /**
    * Get a list of projects from the backend.
+   * @param {Object} [options] - Optional filtering and pagination.
+   * @param {string} [options.prefix] - Only return projects starting with this prefix.
+   * @param {number} [options.offset] - The index of the first project to return.
+   * @param {number} [options.limit] - The maximum number of projects to return.
    * @returns {Promise<string[]>} An array of project names.
    */
-  static async getProjects() {}
+  static async getProjects(options) {}
 
   /**
    * Parse clipboard data.
@@ -64,11 +68,43 @@ class AbstractBackend {
    * @returns {Promise<VarPackedPath>} The exclusion of the two paths.
    */
   static async excludePath(pathA, pathB) {}
+
+  /**
+   * Remove overlaps in many paths at once.
+   * @param {VarPackedPath[]} paths - The paths.
+   * @returns {Promise<VarPackedPath[]>} The paths with overlaps removed.
+   */
+  static async unionPaths(paths) {}
+
+  /**
+   * Subtract paths from paths, pairwise.
+   * @param {VarPackedPath[]} pathsA - The paths to subtract from.
+   * @param {VarPackedPath[]} pathsB - The paths to subtract.
+   * @returns {Promise<VarPackedPath[]>} The differences of the path pairs.
+   */
+  static async subtractPaths(pathsA, pathsB) {}
+
+  /**
+   * Intersect paths with paths, pairwise.
+   * @param {VarPackedPath[]} pathsA - The first paths.
+   * @param {VarPackedPath[]} pathsB - The second paths.
+   * @returns {Promise<VarPackedPath[]>} The intersections of the path pairs.
+   */
+  static async intersectPaths(pathsA, pathsB) {}
+
+  /**
+   * Exclude paths from paths, pairwise.
+   * @param {VarPackedPath[]} pathsA - The first paths.
+   * @param {VarPackedPath[]} pathsB - The second paths.
+   * @returns {Promise<VarPackedPath[]>} The exclusions of the path pairs.
+   */
+  static async excludePaths(pathsA, pathsB) {}
 }
 
 class PythonBackend extends AbstractBackend {
-  static async getProjects() {
-    return await fetchJSON("/projectlist");
+  static async getProjects(options = {}) {
+    const query = new URLSearchParams(options).toString();
+    return await fetchJSON(query ? `/projectlist?${query}` : "/projectlist");
   }
 
   static async _callServerAPI(functionName, kwargs) {
@@ -109,6 +145,26 @@ class PythonBackend extends AbstractBackend {
     return VarPackedPath.fromObject(newPath);
   }
 
+  static async unionPaths(paths) {
+    const newPaths = await this._callServerAPI("unionPaths", { paths });
+    return newPaths.map((newPath) => VarPackedPath.fromObject(newPath));
+  }
+
+  static async subtractPaths(pathsA, pathsB) {
+    const newPaths = await this._callServerAPI("subtractPaths", { pathsA, pathsB });
+    return newPaths.map((newPath) => VarPackedPath.fromObject(newPath));
+  }
+
+  static async intersectPaths(pathsA, pathsB) {
+    const newPaths = await this._callServerAPI("intersectPaths", { pathsA, pathsB });
+    return newPaths.map((newPath) => VarPackedPath.fromObject(newPath));
+  }
+
+  static async excludePaths(pathsA, pathsB) {
+    const newPaths = await this._callServerAPI("excludePaths", { pathsA, pathsB });
+    return newPaths.map((newPath) => VarPackedPath.fromObject(newPath));
+  }
+
   /**
    *
    * @param {string} projectIdentifier
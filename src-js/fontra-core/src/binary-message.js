@@ -0,0 +1,85 @@
+// Decoder for binary websocket messages, see fontra/core/binarymessage.py
+// for a description of the format.
+
+export const BINARY_ARRAY_KEY = "__fontra-binary-array__";
+
+const arrayTypes = {
+  i16: Int16Array,
+  i32: Int32Array,
+  f64: Float64Array,
+};
+
+const CHUNK_MARKER = 0xffffffff;
+const CHUNK_HEADER_SIZE = 20;
+
+export const MESSAGE_KIND_TEXT = 0;
+export const MESSAGE_KIND_BINARY = 1;
+
+const textDecoder = new TextDecoder();
+
+export function decodeBinaryMessage(buffer) {
+  const headerLength = new DataView(buffer).getUint32(0, true);
+  const headerEnd = 4 + headerLength;
+  const header = JSON.parse(
+    textDecoder.decode(new Uint8Array(buffer, 4, headerLength))
+  );
+  const dataStart = headerEnd + padding(headerEnd);
+
+  const arrays = header.a.map(([arrayType, offset, numItems]) =>
+    Array.from(new arrayTypes[arrayType](buffer, dataStart + offset, numItems))
+  );
+
+  return insertArrays(header.m, arrays);
+}
+
+export function isMessageChunk(buffer) {
+  return (
+    buffer.byteLength >= CHUNK_HEADER_SIZE &&
+    new DataView(buffer).getUint32(0, true) === CHUNK_MARKER
+  );
+}
+
+export function decodeMessageChunk(buffer) {
+  const view = new DataView(buffer);
+  return {
+    chunkedMessageID: view.getUint32(4, true),
+    chunkIndex: view.getUint32(8, true),
+    chunkCount: view.getUint32(12, true),
+    messageKind: view.getUint32(16, true),
+    data: new Uint8Array(buffer, CHUNK_HEADER_SIZE),
+  };
+}
+
+export function decodeChunkedMessage(messageKind, chunks) {
+  const length = chunks.reduce((total, chunk) => total + chunk.length, 0);
+  const data = new Uint8Array(length);
+  let offset = 0;
+  for (const chunk of chunks) {
+    data.set(chunk, offset);
+    offset += chunk.length;
+  }
+  return messageKind === MESSAGE_KIND_BINARY
+    ? decodeBinaryMessage(data.buffer)
+    : JSON.parse(textDecoder.decode(data));
+}
+
+function padding(length) {
+  return (8 - (length % 8)) % 8;
+}
+
+function insertArrays(obj, arrays) {
+  if (Array.isArray(obj)) {
+    for (let i = 0; i < obj.length; i++) {
+      obj[i] = insertArrays(obj[i], arrays);
+    }
+  } else if (obj !== null && typeof obj === "object") {
+    const arrayIndex = obj[BINARY_ARRAY_KEY];
+    if (arrayIndex !== undefined) {
+      return arrays[arrayIndex];
+    }
+    for (const key in obj) {
+      obj[key] = insertArrays(obj[key], arrays);
+    }
+  }
+  return obj;
+}
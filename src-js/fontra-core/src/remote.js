@@ -1,3 +1,9 @@
+import {
+  decodeBinaryMessage,
+  decodeChunkedMessage,
+  decodeMessageChunk,
+  isMessageChunk,
+} from "./binary-message.js";
 import { RemoteError } from "./errors.js";
 
 export async function getRemoteProxy(wsURL) {
@@ -35,6 +41,7 @@ export class RemoteObject {
 
     this.wsURL = wsURL;
     this._callReturnCallbacks = {};
+    this._incomingChunks = {};
     this._handlers = {
       close: this._default_onclose,
       error: this._default_onerror,
@@ -87,7 +94,11 @@ export class RemoteObject {
     if (this.websocket?.readyState <= 1) {
       throw new Error("assert -- trying to open new websocket while we still have one");
     }
+    // Chunks of messages that were interrupted by the disconnect won't be
+    // completed on the new connection
+    this._incomingChunks = {};
     this.websocket = new WebSocket(this.wsURL);
+    this.websocket.binaryType = "arraybuffer";
     this.websocket.onmessage = (event) => this._handleIncomingMessage(event);
     this._connectPromise = new Promise((resolve, reject) => {
       this.websocket.onopen = (event) => {
@@ -97,6 +108,9 @@ export class RemoteObject {
         this.websocket.onerror = (event) => this._trigger("error", event);
         const message = {
           "client-uuid": this.clientUUID,
+          "supports-binary-messages": true,
+          "supports-chunked-messages": true,
+          "supports-notifications": true,
         };
         this.websocket.send(JSON.stringify(message));
       };
@@ -118,9 +132,21 @@ export class RemoteObject {
   }
 
   async _handleIncomingMessage(event) {
-    const message = JSON.parse(event.data);
+    let message;
+    if (typeof event.data === "string") {
+      message = JSON.parse(event.data);
+    } else if (isMessageChunk(event.data)) {
+      message = this._collectMessageChunk(decodeMessageChunk(event.data));
+      if (message === undefined) {
+        // Wait for the remaining chunks
+        return;
+      }
+    } else {
+      message = decodeBinaryMessage(event.data);
+    }
     const clientCallID = message["client-call-id"];
     const serverCallID = message["server-call-id"];
+    const notification = message["notification"];
     const initializationError = message["initialization-error"];
 
     // console.log("incoming message");
@@ -136,6 +162,17 @@ export class RemoteObject {
         returnCallbacks.resolve(message["return-value"]);
       }
       delete this._callReturnCallbacks[clientCallID];
+    } else if (notification !== undefined) {
+      // this is a one-way server -> client call, the server expects no response
+      try {
+        if (!this._handlers.hasOwnProperty(notification)) {
+          throw new Error(`undefined method: ${notification}`);
+        }
+        await this._trigger(notification, ...message["arguments"]);
+      } catch (error) {
+        console.log("exception in notification handler", error.toString());
+        console.error(error, error.stack);
+      }
     } else if (serverCallID !== undefined) {
       // this is an incoming server -> client call
       let returnMessage;
@@ -158,6 +195,22 @@ export class RemoteObject {
     }
   }
 
+  _collectMessageChunk(chunk) {
+    const chunkedMessageID = chunk.chunkedMessageID;
+    let incoming = this._incomingChunks[chunkedMessageID];
+    if (incoming === undefined) {
+      incoming = { chunks: [], numReceived: 0 };
+      this._incomingChunks[chunkedMessageID] = incoming;
+    }
+    incoming.chunks[chunk.chunkIndex] = chunk.data;
+    incoming.numReceived++;
+    if (incoming.numReceived < chunk.chunkCount) {
+      return undefined;
+    }
+    delete this._incomingChunks[chunkedMessageID];
+    return decodeChunkedMessage(chunk.messageKind, incoming.chunks);
+  }
+
   async _doCall(methodName, args) {
     // console.log("--- doCall", methodName);
     const clientCallID = this._getNextClientCallID();
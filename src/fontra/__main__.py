@@ -7,7 +7,9 @@ from importlib.metadata import entry_points
 
 from . import __version__ as fontraVersion
 from .core.protocols import ProjectManager, ProjectManagerFactory
+from .core.remote import DEFAULT_CHUNK_SIZE
 from .core.server import FontraServer, findFreeTCPPort
+from .core.threading import DEFAULT_IO_THREAD_POOL_SIZE, configureBlockingIO
 
 DEFAULT_PORT = 8000
 
@@ -31,6 +33,26 @@ def main() -> None:
         "--launch", action="store_true", help="Launch the default browser"
     )
     parser.add_argument("--content-root", type=pathlib.Path)
+    parser.add_argument(
+        "--no-websocket-compression",
+        action="store_true",
+        help="Disable permessage-deflate compression for the websocket connection",
+    )
+    parser.add_argument(
+        "--websocket-chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Websocket messages longer than this number of characters are sent in "
+        "chunks, so they don't hold up other messages. 0 disables chunking "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=DEFAULT_IO_THREAD_POOL_SIZE,
+        help="The number of threads used for blocking backend I/O. 0 runs all I/O "
+        "on the event loop (default: %(default)s)",
+    )
     parser.add_argument(
         "-V",
         "--version",
@@ -52,6 +74,11 @@ def main() -> None:
 
     args = parser.parse_args()
 
+    if args.io_threads > 0:
+        configureBlockingIO(maxWorkers=args.io_threads)
+    else:
+        configureBlockingIO(inline=True)
+
     host = args.host
     httpPort = args.http_port
     manager: ProjectManager = args.getProjectManager(args)
@@ -70,6 +97,10 @@ def main() -> None:
         launchWebBrowser=args.launch,
         versionToken=secrets.token_hex(4),
         contentRoot=args.content_root,
+        # In dev mode the bundler rewrites the client files while we run
+        cacheStaticAssets=not args.dev,
+        websocketCompression=not args.no_websocket_compression,
+        websocketChunkSize=args.websocket_chunk_size,
     )
     server.setup()
     server.run()
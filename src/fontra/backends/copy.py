@@ -11,6 +11,7 @@ from ..core.protocols import (
     WritableFontBackend,
     WriteBackgroundImage,
 )
+from ..core.threading import configureBlockingIO
 from . import getFileSystemBackend, newFileSystemBackend
 
 logger = logging.getLogger(__name__)
@@ -247,6 +248,9 @@ async def async_nullcontext(item):
 
 
 def main():
+    # There are no connections to keep responsive, so there's no need to move
+    # blocking I/O off the event loop
+    configureBlockingIO(inline=True)
     asyncio.run(mainAsync())
 
 
@@ -5,9 +5,11 @@ import logging
 import os
 import pathlib
 import shutil
+import threading
 import uuid
 from collections import defaultdict
-from collections.abc import Iterable, Iterator
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import asynccontextmanager
 from copy import deepcopy
 from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime
@@ -70,9 +72,15 @@ from ..core.classes import (
     VariableGlyph,
 )
 from ..core.glyphdependencies import GlyphDependencies
-from ..core.path import PackedPathPointPen
+from ..core.glyphdependencycache import (
+    GlyphDependencyCache,
+    getGlyphDependencyCachePath,
+)
+from ..core.lrucache import LRUCache
+from ..core.path import PackedPath, PackedPathPointPen, copyContourInfo
 from ..core.protocols import WritableFontBackend
 from ..core.subprocess import runInSubProcess
+from ..core.threading import runBlockingIO
 from ..core.varutils import locationToTuple, makeDenseLocation, makeSparseLocation
 from .base import WritableBaseBackend
 from .filewatcher import Change
@@ -248,6 +256,7 @@ featuresWarning = """\
 
 class UFOGlyphSetReader(Protocol):
     contents: dict
+    dirName: str
 
     def __contains__(self, glyphName: str) -> bool:
         pass
@@ -290,6 +299,7 @@ class UFOGlyphSetWriter(UFOGlyphSetReader, Protocol):
 class DummyUFOGlyphSetReader:
     def __init__(self):
         self.contents = {}
+        self.dirName = ""
 
     def __contains__(self, glyphName: str) -> bool:
         return False
@@ -325,6 +335,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         super().__init__()
         self._glyphDependenciesTask: asyncio.Task[GlyphDependencies] | None = None
         self._glyphDependencies: GlyphDependencies | None = None
+        self._glyphDependencyCache: GlyphDependencyCache | None = None
         self._backgroundTasksTask: asyncio.Task | None = None
         self._imageMapping = DoubleDict()
         self._imageDataToWrite: dict[str, ImageData] = {}
@@ -333,6 +344,11 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         self._familyName: str | None = None
         self._defaultFontInfo: UFOFontInfo | None = None
         self._includedFeaturePaths: list[pathlib.Path] = []
+        # While writing a batch of glyphs, glyph set contents and glyph order
+        # updates are collected here, and written once at the end
+        self._glyphBatchDepth = 0
+        self._glyphSetsToUpdate: dict[tuple[str, str], UFOLayer] = {}
+        self._glyphOrderUpdates: dict[int, tuple[UFOLayer, list[tuple[str, bool]]]] = {}
         self._initialize(dsDoc)
         self._implicitDefaultLocationBase: str | None = None
 
@@ -353,6 +369,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             else getGlyphMapFromGlyphSet(self.defaultDSSource.layer.glyphSetReader)
         )
         self.savedGlyphModificationTimes: dict[str, set] = {}
+        self.parsedGlyphCache = ParsedGlyphCache()
         self.zombieDSSources: dict[str, DSSource] = {}
         self._ltrGlyphs: set | None = None
         self._rtlGlyphs: set | None = None
@@ -379,9 +396,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
 
         if self._glyphDependenciesTask is None:
             self._glyphDependenciesTask = asyncio.create_task(
-                extractGlyphDependenciesFromUFO(
-                    self.defaultDSSource.layer.path, self.defaultDSSource.layer.name
-                )
+                self._extractGlyphDependencies()
             )
 
             def setResult(task):
@@ -392,9 +407,28 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
 
         return await self._glyphDependenciesTask
 
+    async def _extractGlyphDependencies(self) -> GlyphDependencies:
+        ufoLayer = self.defaultUFOLayer
+        dependencyCache = None
+        if os.path.isdir(ufoLayer.path):
+            # The cache works with file modification times, so not for .ufoz
+            glyphsDir = os.path.join(ufoLayer.path, ufoLayer.glyphSetReader.dirName)
+            dependencyCache = GlyphDependencyCache(
+                glyphsDir, getGlyphDependencyCachePath(glyphsDir)
+            )
+        dependencies, self._glyphDependencyCache = (
+            await extractGlyphDependenciesFromUFO(
+                ufoLayer.path, ufoLayer.name, dependencyCache
+            )
+        )
+        return dependencies
+
     async def findGlyphsThatUseGlyph(self, glyphName):
         return sorted((await self.glyphDependencies).usedBy.get(glyphName, []))
 
+    def getCacheStats(self) -> dict[str, dict]:
+        return dict(parsedGlyphs=self.parsedGlyphCache.getStats())
+
     def _reloadEverything(self) -> None:
         self._initialize(DesignSpaceDocument.fromfile(self.dsDoc.path))
 
@@ -434,6 +468,8 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         await self.fileWatcherClose()
         if self._glyphDependenciesTask is not None:
             self._glyphDependenciesTask.cancel()
+        if self._glyphDependencyCache is not None:
+            await runBlockingIO(self._glyphDependencyCache.save)
         if self._backgroundTasksTask is not None:
             self._backgroundTasksTask.cancel()
 
@@ -572,38 +608,83 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
                 glifFileNames[fileName] = glyphName
         self.glifFileNames = glifFileNames
 
-    def updateGlyphSetContents(self, glyphSet: UFOGlyphSetWriter):
-        glyphSet.writeContents()
+    async def updateGlyphSetContents(self, ufoLayer: UFOLayer) -> None:
+        if self._glyphBatchDepth:
+            self._glyphSetsToUpdate[ufoLayer.path, ufoLayer.name] = ufoLayer
+            return
+        contents = await runBlockingIO(writeUFOLayerContents, ufoLayer)
         glifFileNames = self.glifFileNames
-        for glyphName, fileName in glyphSet.contents.items():
+        for glyphName, fileName in contents.items():
             glifFileNames[fileName] = glyphName
 
-    def ensureGlyphInGlyphOrder(self, layer, glyphName):
+    async def ensureGlyphInGlyphOrder(self, layer, glyphName):
+        await self._updateGlyphOrder(layer, glyphName, True)
+
+    async def ensureGlyphNotInGlyphOrder(self, layer: UFOLayer, glyphName: str) -> None:
+        await self._updateGlyphOrder(layer, glyphName, False)
+
+    async def _updateGlyphOrder(
+        self, layer: UFOLayer, glyphName: str, addGlyph: bool
+    ) -> None:
+        if self._glyphBatchDepth:
+            _, updates = self._glyphOrderUpdates.setdefault(id(layer), (layer, []))
+            updates.append((glyphName, addGlyph))
+        else:
+            await self._writeGlyphOrderUpdates(layer, [(glyphName, addGlyph)])
+
+    async def _writeGlyphOrderUpdates(
+        self, layer: UFOLayer, updates: list[tuple[str, bool]]
+    ) -> None:
         writer = layer.writer
         originalGlyphOrderMapping = layer.originalGlyphOrderMapping
-        lib = writer.readLib()
+        lib = await runBlockingIO(writer.readLib)
         glyphOrder = lib.get("public.glyphOrder")
-        if glyphOrder is not None and glyphName not in glyphOrder:
-            glyphOrder.append(glyphName)
+        if glyphOrder is None:
+            return
+
+        changed = False
+        needsSorting = False
+        for glyphName, addGlyph in updates:
+            if addGlyph:
+                if glyphName not in glyphOrder:
+                    glyphOrder.append(glyphName)
+                    needsSorting = True
+                    changed = True
+            else:
+                if not originalGlyphOrderMapping:
+                    originalGlyphOrderMapping.update(
+                        {gn: i for i, gn in enumerate(glyphOrder)}
+                    )
+                if glyphName in glyphOrder:
+                    glyphOrder.remove(glyphName)
+                    changed = True
+
+        if needsSorting:
+            # The sort is stable, so sorting once after all appends gives the
+            # same order as sorting after each append
             glyphOrder.sort(
                 key=lambda gn: originalGlyphOrderMapping.get(gn, 0xFFFFFFFF)
             )
-            writer.writeLib(lib)
+        if changed:
+            await runBlockingIO(writer.writeLib, lib)
             self.fileWatcherIgnoreNextChange(os.path.join(layer.path, LIB_FILENAME))
 
-    def ensureGlyphNotInGlyphOrder(self, layer: UFOLayer, glyphName: str) -> None:
-        writer = layer.writer
-        lib = writer.readLib()
-        glyphOrder = lib.get("public.glyphOrder")
-        if not layer.originalGlyphOrderMapping and glyphOrder is not None:
-            layer.originalGlyphOrderMapping.update(
-                {gn: i for i, gn in enumerate(glyphOrder)}
-            )
-
-        if glyphOrder is not None and glyphName in glyphOrder:
-            glyphOrder.remove(glyphName)
-            writer.writeLib(lib)
-            self.fileWatcherIgnoreNextChange(os.path.join(layer.path, LIB_FILENAME))
+    @asynccontextmanager
+    async def _batchGlyphWrites(self):
+        self._glyphBatchDepth += 1
+        try:
+            yield
+        finally:
+            self._glyphBatchDepth -= 1
+            if not self._glyphBatchDepth:
+                ufoLayers = list(self._glyphSetsToUpdate.values())
+                glyphOrderUpdates = list(self._glyphOrderUpdates.values())
+                self._glyphSetsToUpdate.clear()
+                self._glyphOrderUpdates.clear()
+                for ufoLayer in ufoLayers:
+                    await self.updateGlyphSetContents(ufoLayer)
+                for layer, updates in glyphOrderUpdates:
+                    await self._writeGlyphOrderUpdates(layer, updates)
 
     async def getGlyphMap(self) -> dict[str, list[int]]:
         return dict(self.glyphMap)
@@ -620,9 +701,17 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         localSources = []
         layers = {}
 
-        defaultStaticGlyph, defaultUFOGlyph = ufoLayerToStaticGlyph(
-            self.defaultUFOLayer.glyphSetReader, glyphName
+        ufoLayers = [
+            ufoLayer
+            for ufoLayer in self.ufoLayers
+            if glyphName in ufoLayer.glyphSetReader or ufoLayer == self.defaultUFOLayer
+        ]
+        parsedLayers = await runBlockingIO(
+            readUFOLayerGlyphs, ufoLayers, glyphName, self.parsedGlyphCache
         )
+        defaultStaticGlyph, defaultUFOGlyph = parsedLayers[
+            ufoLayers.index(self.defaultUFOLayer)
+        ]
 
         localDS = defaultUFOGlyph.lib.get(GLYPH_DESIGNSPACE_LIB_KEY)
         if localDS is not None:
@@ -641,16 +730,10 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         # per glyph source custom data, eg. status color code
         sourcesCustomData = {}
 
-        for ufoLayer in self.ufoLayers:
+        for ufoLayer, (staticGlyph, ufoGlyph) in zip(ufoLayers, parsedLayers):
             if glyphName not in ufoLayer.glyphSetReader:
                 continue
 
-            staticGlyph, ufoGlyph = (
-                (defaultStaticGlyph, defaultUFOGlyph)
-                if ufoLayer == self.defaultUFOLayer
-                else ufoLayerToStaticGlyph(ufoLayer.glyphSetReader, glyphName)
-            )
-
             layerName = layerNameMapping.get(
                 ufoLayer.fontraLayerName, ufoLayer.fontraLayerName
             )
@@ -769,10 +852,10 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             # This is the first glyph ever to be written, and font sources were not set up
             # explicitly, so we need to create the default UFO
             sourceName = getDefaultSourceName(glyph, self.defaultLocation, "Regular")
-            self._createDefaultSourceAndUFO(sourceName)
+            await self._createDefaultSourceAndUFO(sourceName)
 
-        defaultLayerGlyph = readGlyphOrCreate(
-            self.defaultUFOLayer.glyphSetWriter, glyphName, codePoints
+        defaultLayerGlyph = await runBlockingIO(
+            readUFOLayerGlyphOrCreate, self.defaultUFOLayer, glyphName, codePoints
         )
         revLayerNameMapping = reverseSparseDict(
             defaultLayerGlyph.lib.get(LAYER_NAME_MAPPING_LIB_KEY, {})
@@ -787,7 +870,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         localSources = []
         sourcesCustomData = {}
         for source in glyph.sources:
-            sourceInfo = self._prepareUFOSourceLayer(
+            sourceInfo = await self._prepareUFOSourceLayer(
                 glyphName, source, localDefaultLocation, revLayerNameMapping
             )
             if sourceInfo.sourceName != source.name and not (
@@ -828,7 +911,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             if ufoLayer is None:
                 # This layer is not used by any source and we haven't seen it
                 # before. Let's create a new layer in the appropriate UFO.
-                ufoLayer = self._createUFOLayer(
+                ufoLayer = await self._createUFOLayer(
                     glyphName, ufoPath, layerName, layerName
                 )
                 if ufoLayer.fontraLayerName != layerName:
@@ -850,10 +933,13 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
                 storeInLib(layerGlyph, GLYPH_DESIGNSPACE_LIB_KEY, localDS)
                 storeInLib(layerGlyph, SOURCE_NAME_MAPPING_LIB_KEY, sourceNameMapping)
                 storeInLib(layerGlyph, LAYER_NAME_MAPPING_LIB_KEY, layerNameMapping)
-                layerGlyph.note = glyph.customData.pop(GLYPH_NOTE_LIB_KEY, None)
-                storeInLib(layerGlyph, GLYPH_CUSTOM_DATA_LIB_KEY, glyph.customData)
+                customData = dict(glyph.customData)
+                layerGlyph.note = customData.pop(GLYPH_NOTE_LIB_KEY, None)
+                storeInLib(layerGlyph, GLYPH_CUSTOM_DATA_LIB_KEY, customData)
             else:
-                layerGlyph = readGlyphOrCreate(glyphSet, glyphName, codePoints)
+                layerGlyph = await runBlockingIO(
+                    readUFOLayerGlyphOrCreate, ufoLayer, glyphName, codePoints
+                )
 
             storeInLib(
                 layerGlyph,
@@ -885,13 +971,23 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
                 hasVariableComponents,
                 imageFileName=imageFileName,
             )
-            glyphSet.writeGlyph(glyphName, layerGlyph, drawPointsFunc=drawPointsFunc)
+            fileName, modTime = await runBlockingIO(
+                writeUFOLayerGlyph, ufoLayer, glyphName, layerGlyph, drawPointsFunc
+            )
             if writeGlyphSetContents:
-                # FIXME: this is inefficient if we write many glyphs
-                self.updateGlyphSetContents(glyphSet)
-                self.ensureGlyphInGlyphOrder(ufoLayer, glyphName)
+                await self.updateGlyphSetContents(ufoLayer)
+                await self.ensureGlyphInGlyphOrder(ufoLayer, glyphName)
+            if (
+                glyphSet == self.defaultUFOLayer.glyphSetWriter
+                and self._glyphDependencyCache is not None
+            ):
+                self._glyphDependencyCache.glyphWritten(
+                    glyphName,
+                    fileName,
+                    {compo.name for compo in layer.glyph.components},
+                )
 
-            modTimes.add(glyphSet.getGLIFModificationTime(glyphName))
+            modTimes.add(modTime)
 
         # Prune unused UFO layers
         relevantLayerNames = set(
@@ -905,15 +1001,14 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         for layerName in sorted(layersToDelete):
             ufoLayer = self.ufoLayers.findItem(fontraLayerName=layerName)
             assert ufoLayer is not None
-            glyphSet = ufoLayer.glyphSetWriter
-            glyphSet.deleteGlyph(glyphName)
-            # FIXME: this is inefficient if we write many glyphs
-            self.updateGlyphSetContents(glyphSet)
+            await runBlockingIO(deleteUFOLayerGlyph, ufoLayer, glyphName)
+            await self.updateGlyphSetContents(ufoLayer)
             if ufoLayer.isDefaultLayer:
-                self.ensureGlyphNotInGlyphOrder(ufoLayer, glyphName)
+                await self.ensureGlyphNotInGlyphOrder(ufoLayer, glyphName)
             modTimes.add(None)
 
         self.savedGlyphModificationTimes[glyphName] = modTimes
+        self.parsedGlyphCache.discardGlyph(glyphName)
 
     def _findUFOForLayerName(self, layerName, ufoPath):
         if "^" in layerName:
@@ -930,11 +1025,11 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
 
         return ufoPath, layerName
 
-    def _createDefaultSourceAndUFO(self, sourceName):
+    async def _createDefaultSourceAndUFO(self, sourceName):
         assert not self.dsSources
         assert not self.dsDoc.sources
         sourceIdentifier = makeDSSourceIdentifier(self.dsDoc, 0, None)
-        ufoLayer = self._createUFO(sourceName, sourceIdentifier)
+        ufoLayer = await self._createUFO(sourceName, sourceIdentifier)
 
         assert os.path.isdir(ufoLayer.path)
 
@@ -953,7 +1048,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         self.dsDoc.sources.append(dsSource.asDSSourceDescriptor(self.familyName))
         self._writeDesignSpaceDocument()
 
-    def _prepareUFOSourceLayer(
+    async def _prepareUFOSourceLayer(
         self,
         glyphName: str,
         source: GlyphSource,
@@ -989,7 +1084,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             locationTuple=locationToTuple(globalLocation)
         )
         if dsSource is None:
-            dsSource = self._createDSSourceForGlyph(
+            dsSource = await self._createDSSourceForGlyph(
                 glyphName,
                 source.name,
                 source.layerName,
@@ -1009,7 +1104,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             ufoLayer = self.ufoLayers.findItem(path=ufoPath, name=layerName)
 
             if ufoLayer is None:
-                ufoLayer = self._createUFOLayer(
+                ufoLayer = await self._createUFOLayer(
                     glyphName, ufoPath, layerName, source.layerName
                 )
                 ufoLayerName = ufoLayer.name
@@ -1036,7 +1131,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             localSourceDict=localSourceDict,
         )
 
-    def _createDSSourceForGlyph(
+    async def _createDSSourceForGlyph(
         self,
         glyphName: str | None,
         sourceName: str,
@@ -1050,7 +1145,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         if notAtPole:
             # Assume sparse source, add new layer to existing UFO
             poleDSSource = self._findDSSourceForSparseSource(location)
-            ufoLayer = self._createUFOLayer(
+            ufoLayer = await self._createUFOLayer(
                 glyphName,
                 poleDSSource.layer.path,
                 layerName,
@@ -1059,7 +1154,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             )
         else:
             # New UFO
-            ufoLayer = self._createUFO(sourceName, layerName)
+            ufoLayer = await self._createUFO(sourceName, layerName)
 
         return DSSource(
             identifier=sourceIdentifier,
@@ -1081,24 +1176,19 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
 
         return poleDSSource
 
-    def _createUFO(self, sourceName: str, sourceIdentifier: str) -> UFOLayer:
+    async def _createUFO(self, sourceName: str, sourceIdentifier: str) -> UFOLayer:
         dsFileName = pathlib.Path(self.dsDoc.path).stem
         sourceName = sourceName.replace("/", "-")
         suggestedUFOFileName = f"{dsFileName}_{sourceName}"
 
         ufoPath = os.fspath(makeUniqueUFOPath(self.ufoDir, suggestedUFOFileName))
 
-        writer = self.ufoManager.getWriter(ufoPath)  # this creates the UFO
         info = UFOFontInfo()
         for infoAttr in ufoFontInfoAttributes:
             value = getattr(self.defaultFontInfo, infoAttr, None)
             if value is not None:
                 setattr(info, infoAttr, value)
-        writer.writeInfo(info)
-        glyphSet = writer.getGlyphSet()  # this creates the default layer
-        glyphSet.writeContents()
-        writer.writeLayerContents()
-        ufoLayerName = writer.getDefaultLayerName()
+        ufoLayerName = await runBlockingIO(createUFO, self.ufoManager, ufoPath, info)
         assert os.path.isdir(ufoPath)
 
         ufoLayer = UFOLayer(
@@ -1111,7 +1201,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         self._updatePathsToWatch()
         return ufoLayer
 
-    def _createUFOLayer(
+    async def _createUFOLayer(
         self,
         glyphName: str | None,
         ufoPath: str,
@@ -1119,32 +1209,14 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         fontraLayerName: str,
         mustCreateNewLayer: bool = False,
     ) -> UFOLayer:
-        writer = self.ufoManager.getWriter(ufoPath)
-        existingLayerNames = set(writer.getLayerNames())
-        ufoLayerName = suggestedLayerName
-        count = 0
-
-        if mustCreateNewLayer:
-            while ufoLayerName in existingLayerNames:
-                count += 1
-                ufoLayerName = f"{suggestedLayerName}#{count}"
-            # This creates the layer
-            self.ufoManager.getGlyphSetWriter(ufoPath, ufoLayerName)
-        elif glyphName is not None:
-            # getGlyphSetWriter() will create the layer if it doesn't already exist
-            while glyphName in self.ufoManager.getGlyphSetWriter(ufoPath, ufoLayerName):
-                # TODO: THIS IS NOT COVERED BY TESTS
-                # The glyph already exists in the layer, which means there is
-                # a conflict. Let's make up a layer name in which the glyph
-                # does not exist.
-                count += 1
-                ufoLayerName = f"{suggestedLayerName}#{count}"
-
-        if ufoLayerName not in existingLayerNames:
-            glyphSet = self.ufoManager.getGlyphSetWriter(ufoPath, ufoLayerName)
-            glyphSet.writeContents()
-            writer.writeLayerContents()
-
+        ufoLayerName = await runBlockingIO(
+            createUFOLayer,
+            self.ufoManager,
+            glyphName,
+            ufoPath,
+            suggestedLayerName,
+            mustCreateNewLayer,
+        )
         assert ufoLayerName, repr(ufoLayerName)
 
         ufoLayer = UFOLayer(
@@ -1166,6 +1238,13 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         }
         return {**self.defaultLocation, **globalLocation}
 
+    async def putGlyphs(
+        self, glyphs: list[tuple[str, VariableGlyph, list[int]]]
+    ) -> None:
+        async with self._batchGlyphWrites():
+            for glyphName, glyph, codePoints in glyphs:
+                await self.putGlyph(glyphName, glyph, codePoints)
+
     async def deleteGlyph(self, glyphName: str) -> None:
         if glyphName not in self.glyphMap:
             logger.debug(f"Can't delete unknown glyph '{glyphName}'")
@@ -1174,18 +1253,30 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
         for ufoLayer in self.ufoLayers:
             glyphSet = ufoLayer.glyphSetWriter
             if glyphName in glyphSet:
-                glyphSet.deleteGlyph(glyphName)
-                # FIXME: this is inefficient if we write many glyphs
-                glyphSet.writeContents()
+                if (
+                    self._glyphDependencyCache is not None
+                    and ufoLayer == self.defaultUFOLayer
+                ):
+                    self._glyphDependencyCache.glyphDeleted(
+                        glyphSet.contents[glyphName]
+                    )
+                await runBlockingIO(deleteUFOLayerGlyph, ufoLayer, glyphName)
+                await self.updateGlyphSetContents(ufoLayer)
                 if ufoLayer.isDefaultLayer:
-                    self.ensureGlyphNotInGlyphOrder(ufoLayer, glyphName)
+                    await self.ensureGlyphNotInGlyphOrder(ufoLayer, glyphName)
         del self.glyphMap[glyphName]
         self.savedGlyphModificationTimes[glyphName] = {None}
+        self.parsedGlyphCache.discardGlyph(glyphName)
         if self._glyphDependencies is not None:
             self._glyphDependencies.update(glyphName, ())
 
         self.resetGlyphDirections()
 
+    async def deleteGlyphs(self, glyphNames: list[str]) -> None:
+        async with self._batchGlyphWrites():
+            for glyphName in glyphNames:
+                await self.deleteGlyph(glyphName)
+
     async def getFontInfo(self) -> FontInfo:
         ufoInfo = self.defaultFontInfo
         info = {}
@@ -1308,13 +1399,13 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             else:
                 if not fontSource.isSparse:
                     # Create a whole new UFO
-                    ufoLayer = self._createUFO(fontSource.name, sourceIdentifier)
+                    ufoLayer = await self._createUFO(fontSource.name, sourceIdentifier)
                 else:
                     # Create a new layer in the appropriate existing UFO
                     poleDSSource = self._findDSSourceForSparseSource(
                         denseSourceLocation, newDSSources
                     )
-                    ufoLayer = self._createUFOLayer(
+                    ufoLayer = await self._createUFOLayer(
                         None, poleDSSource.layer.path, fontSource.name, sourceIdentifier
                     )
 
@@ -1487,6 +1578,91 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
                         "kerning types other than 'kern' are not yet implemented for UFO"
                     )
 
+    async def putKerningPairs(
+        self,
+        kernType: str,
+        sourceIdentifiers: list[str],
+        pairs: dict[tuple[str, str], list[float | None]],
+    ) -> None:
+        await self._updateKerningPairs(kernType, sourceIdentifiers, pairs)
+
+    async def deleteKerningPairs(
+        self, kernType: str, pairs: list[tuple[str, str]]
+    ) -> None:
+        await self._updateKerningPairs(kernType, [], dict.fromkeys(pairs))
+
+    async def _updateKerningPairs(
+        self,
+        kernType: str,
+        sourceIdentifiers: list[str],
+        pairs: Mapping[tuple[str, str], list[float | None] | None],
+    ) -> None:
+        if kernType != "kern":
+            # TODO: store in lib
+            logger.error(
+                "kerning types other than 'kern' are not yet implemented for UFO"
+            )
+            return
+
+        ufoVersionMajor, _ = self.defaultReader.formatVersionTuple
+        if ufoVersionMajor == 3 and self.rtlGlyphs:
+            # Which pairs need to be flipped depends on the entire kerning
+            # table, so we fall back to writing all of it
+            kerning = await self.getKerning()
+            kerningTable = kerning[kernType]
+            for (left, right), values in pairs.items():
+                rightDict = kerningTable.values.setdefault(left, {})
+                if values is None:
+                    rightDict.pop(right, None)
+                else:
+                    rightDict[right] = [
+                        (
+                            values[sourceIdentifiers.index(sourceIdentifier)]
+                            if sourceIdentifier in sourceIdentifiers
+                            else None
+                        )
+                        for sourceIdentifier in kerningTable.sourceIdentifiers
+                    ]
+            await self.putKerning(kerning)
+            return
+
+        sourceIndices = {
+            sourceIdentifier: index
+            for index, sourceIdentifier in enumerate(sourceIdentifiers)
+        }
+        for dsSource in self.dsSources:
+            if dsSource.isSparse:
+                if dsSource.identifier in sourceIndices:
+                    raise ValueError(
+                        f"can't write kerning to sparse source: {dsSource.identifier}"
+                    )
+                continue
+            sourceIndex = sourceIndices.get(dsSource.identifier)
+            ufoKerning = dsSource.layer.reader.readKerning()
+            changed = False
+            for (left, right), values in pairs.items():
+                ufoPair = (
+                    "public.kern1." + left[1:] if left.startswith("@") else left,
+                    "public.kern2." + right[1:] if right.startswith("@") else right,
+                )
+                value = (
+                    values[sourceIndex]
+                    if values is not None and sourceIndex is not None
+                    else None
+                )
+                if value is None:
+                    if ufoPair in ufoKerning:
+                        del ufoKerning[ufoPair]
+                        changed = True
+                elif ufoKerning.get(ufoPair) != value:
+                    ufoKerning[ufoPair] = value
+                    changed = True
+            if changed:
+                dsSource.layer.writer.writeKerning(ufoKerning)
+                self.fileWatcherIgnoreNextChange(
+                    os.path.join(dsSource.layer.path, KERNING_FILENAME)
+                )
+
     def _flipRTLKerning(self, kerning: Kerning) -> Kerning:
         ufoVersionMajor, _ = self.defaultReader.formatVersionTuple
 
@@ -1840,6 +2016,7 @@ class DesignspaceBackend(WatchableBackend, WritableBaseBackend):
             if rebuildGlyphSetContents:
                 changedItems.rebuildGlyphSetContents = True
             changedItems.changedGlyphs.add(glyphName)
+            self.parsedGlyphCache.discardGlyph(glyphName)
 
 
 @singledispatch
@@ -2097,6 +2274,7 @@ class UFOManager:
         self._glyphSetWriters: dict[str, dict[str, UFOGlyphSetWriter]] = defaultdict(
             dict
         )
+        self._layerLocks: dict[tuple[str, str], threading.Lock] = {}
 
     def getReader(self, path: str) -> UFOReader:
         reader = self._readerWriters.get(path)
@@ -2131,6 +2309,14 @@ class UFOManager:
 
         return glyphSet
 
+    def getLayerLock(self, path: str, layerName: str) -> threading.Lock:
+        # Reading and writing the files of a UFO layer happens in the I/O
+        # threads, and must be serialized with this lock
+        lock = self._layerLocks.get((path, layerName))
+        if lock is None:
+            lock = self._layerLocks.setdefault((path, layerName), threading.Lock())
+        return lock
+
     def getGlyphSetWriter(self, path: str, layerName: str) -> UFOGlyphSetWriter:
         glyphSet = self._glyphSetWriters[path].get(layerName)
 
@@ -2270,6 +2456,10 @@ class UFOLayer:
     def glyphSetWriter(self) -> UFOGlyphSetWriter:
         return self.manager.getGlyphSetWriter(self.path, self.name)
 
+    @property
+    def lock(self) -> threading.Lock:
+        return self.manager.getLayerLock(self.path, self.name)
+
     @cached_property
     def isDefaultLayer(self) -> bool:
         return self.name == self.reader.getDefaultLayerName()
@@ -2343,6 +2533,222 @@ class DoubleDict(dict):
         raise NotImplementedError()
 
 
+def readUFOLayerGlyphs(ufoLayers, glyphName, parsedGlyphCache=None):
+    # Parse the glyph from all given layers. This is called via runBlockingIO(),
+    # so it must not modify the backend's state, except for the parsed glyph
+    # cache, which is thread-safe.
+    parsedLayers = []
+    for ufoLayer in ufoLayers:
+        with ufoLayer.lock:
+            parsedLayers.append(
+                _readUFOLayerGlyph(ufoLayer, glyphName, parsedGlyphCache)
+            )
+    return parsedLayers
+
+
+def _readUFOLayerGlyph(ufoLayer, glyphName, parsedGlyphCache):
+    glyphSet = ufoLayer.glyphSetReader
+    if parsedGlyphCache is None:
+        return ufoLayerToStaticGlyph(glyphSet, glyphName)
+    layerKey = (ufoLayer.path, ufoLayer.name)
+    modTime = getGLIFModificationTimeNs(ufoLayer.path, glyphSet, glyphName)
+    parsedGlyph = parsedGlyphCache.get(layerKey, glyphName, modTime)
+    if parsedGlyph is None:
+        parsedGlyph = ufoLayerToStaticGlyph(glyphSet, glyphName)
+        if modTime is not None:
+            parsedGlyphCache.put(layerKey, glyphName, modTime, parsedGlyph)
+    return copyParsedGlyph(parsedGlyph)
+
+
+# The functions below write UFO files, and are called via runBlockingIO(). Like
+# readUFOLayerGlyphs(), they hold the layer's lock while using its glyph set.
+
+
+def readUFOLayerGlyphOrCreate(
+    ufoLayer: UFOLayer, glyphName: str, codePoints: list[int]
+) -> UFOGlyph:
+    with ufoLayer.lock:
+        return readGlyphOrCreate(ufoLayer.glyphSetWriter, glyphName, codePoints)
+
+
+def writeUFOLayerGlyph(
+    ufoLayer: UFOLayer, glyphName: str, layerGlyph: UFOGlyph, drawPointsFunc
+) -> tuple[str, float | None]:
+    # Return the .glif file name and its modification time
+    with ufoLayer.lock:
+        glyphSet = ufoLayer.glyphSetWriter
+        glyphSet.writeGlyph(glyphName, layerGlyph, drawPointsFunc=drawPointsFunc)
+        return (
+            glyphSet.contents[glyphName],
+            glyphSet.getGLIFModificationTime(glyphName),
+        )
+
+
+def deleteUFOLayerGlyph(ufoLayer: UFOLayer, glyphName: str) -> None:
+    with ufoLayer.lock:
+        ufoLayer.glyphSetWriter.deleteGlyph(glyphName)
+
+
+def writeUFOLayerContents(ufoLayer: UFOLayer) -> dict[str, str]:
+    # Write contents.plist, and return a copy of the contents
+    with ufoLayer.lock:
+        glyphSet = ufoLayer.glyphSetWriter
+        glyphSet.writeContents()
+        return dict(glyphSet.contents)
+
+
+def createUFO(ufoManager: UFOManager, ufoPath: str, info: UFOFontInfo) -> str:
+    # Create a UFO with an empty default layer, and return the layer's name
+    writer = ufoManager.getWriter(ufoPath)  # this creates the UFO
+    writer.writeInfo(info)
+    glyphSet = writer.getGlyphSet()  # this creates the default layer
+    glyphSet.writeContents()
+    writer.writeLayerContents()
+    return writer.getDefaultLayerName()
+
+
+def createUFOLayer(
+    ufoManager: UFOManager,
+    glyphName: str | None,
+    ufoPath: str,
+    suggestedLayerName: str,
+    mustCreateNewLayer: bool,
+) -> str:
+    # Create a layer in an existing UFO, unless a suitable one exists, and
+    # return the layer's name
+    writer = ufoManager.getWriter(ufoPath)
+    existingLayerNames = set(writer.getLayerNames())
+    ufoLayerName = suggestedLayerName
+    count = 0
+
+    if mustCreateNewLayer:
+        while ufoLayerName in existingLayerNames:
+            count += 1
+            ufoLayerName = f"{suggestedLayerName}#{count}"
+        # This creates the layer
+        ufoManager.getGlyphSetWriter(ufoPath, ufoLayerName)
+    elif glyphName is not None:
+        # getGlyphSetWriter() will create the layer if it doesn't already exist
+        while glyphName in ufoManager.getGlyphSetWriter(ufoPath, ufoLayerName):
+            # TODO: THIS IS NOT COVERED BY TESTS
+            # The glyph already exists in the layer, which means there is
+            # a conflict. Let's make up a layer name in which the glyph
+            # does not exist.
+            count += 1
+            ufoLayerName = f"{suggestedLayerName}#{count}"
+
+    if ufoLayerName not in existingLayerNames:
+        with ufoManager.getLayerLock(ufoPath, ufoLayerName):
+            glyphSet = ufoManager.getGlyphSetWriter(ufoPath, ufoLayerName)
+            glyphSet.writeContents()
+        writer.writeLayerContents()
+
+    return ufoLayerName
+
+
+class ParsedGlyphCache:
+    """The parsed .glif files per UFO layer, as (StaticGlyph, UFOGlyph) tuples,
+    so that getGlyph() only needs to parse .glif files that changed. Entries are
+    validated by the modification time of the .glif file, and each layer keeps
+    at most `maxGlyphsPerLayer` glyphs. The cache is used from the I/O threads,
+    so all access is guarded by a lock.
+    """
+
+    def __init__(self, maxGlyphsPerLayer: int = 500):
+        self.maxGlyphsPerLayer = maxGlyphsPerLayer
+        self._layers: dict[tuple[str, str], LRUCache] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, layerKey: tuple[str, str], glyphName: str, modTime: int | None
+    ) -> tuple[StaticGlyph, UFOGlyph] | None:
+        with self._lock:
+            layerCache = self._layers.get(layerKey)
+            entry = None
+            if layerCache is not None and glyphName in layerCache:
+                entry = layerCache[glyphName]
+                if modTime is None or entry[0] != modTime:
+                    # The .glif file changed, or is gone
+                    del layerCache[glyphName]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self,
+        layerKey: tuple[str, str],
+        glyphName: str,
+        modTime: int,
+        parsedGlyph: tuple[StaticGlyph, UFOGlyph],
+    ) -> None:
+        with self._lock:
+            layerCache = self._layers.get(layerKey)
+            if layerCache is None:
+                layerCache = self._layers[layerKey] = LRUCache(self.maxGlyphsPerLayer)
+            layerCache[glyphName] = (modTime, parsedGlyph)
+
+    def discardGlyph(self, glyphName: str) -> None:
+        with self._lock:
+            for layerCache in self._layers.values():
+                layerCache.pop(glyphName, None)
+
+    def getStats(self) -> dict[str, int | None]:
+        with self._lock:
+            return dict(
+                size=sum(len(layerCache) for layerCache in self._layers.values()),
+                maxSize=self.maxGlyphsPerLayer * max(len(self._layers), 1),
+                bytes=None,
+                maxBytes=None,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=sum(
+                    layerCache.evictions for layerCache in self._layers.values()
+                ),
+            )
+
+
+def getGLIFModificationTimeNs(
+    ufoPath: str, glyphSet: UFOGlyphSetReader, glyphName: str
+) -> int | None:
+    fileName = glyphSet.contents.get(glyphName)
+    if fileName is None:
+        return None
+    try:
+        return os.stat(os.path.join(ufoPath, glyphSet.dirName, fileName)).st_mtime_ns
+    except NotADirectoryError:
+        # .ufoz: take the time from the zip file
+        modTime = glyphSet.getGLIFModificationTime(glyphName)
+        return None if modTime is None else int(modTime * 1_000_000_000)
+    except OSError:
+        return None
+
+
+def copyParsedGlyph(
+    parsedGlyph: tuple[StaticGlyph, UFOGlyph],
+) -> tuple[StaticGlyph, UFOGlyph]:
+    # getGlyph() and its callers modify the parsed glyph, so the cache hands
+    # out copies. The packed path holds only immutable items, except for the
+    # point attributes, so it can be copied much faster than with deepcopy().
+    staticGlyph, ufoGlyph = parsedGlyph
+    path = staticGlyph.path
+    if isinstance(path, PackedPath):
+        staticGlyph = deepcopy(replace(staticGlyph, path=PackedPath()))
+        staticGlyph.path = PackedPath(
+            coordinates=list(path.coordinates),
+            pointTypes=list(path.pointTypes),
+            contourInfo=copyContourInfo(path.contourInfo),
+            pointAttributes=deepcopy(path.pointAttributes),
+        )
+    else:
+        staticGlyph = deepcopy(staticGlyph)
+    return staticGlyph, deepcopy(ufoGlyph)
+
+
 def ufoLayerToStaticGlyph(glyphSet, glyphName, penClass=PackedPathPointPen):
     glyph = UFOGlyph()
     pen = penClass()
@@ -2648,28 +3054,45 @@ class ComponentsOnlyPointPen(PackedPathPointPen):
 
 
 async def extractGlyphDependenciesFromUFO(
-    ufoPath: str, layerName: str
-) -> GlyphDependencies:
-    componentInfo = await runInSubProcess(
-        _extractComponentInfoFromUFO, ufoPath, layerName
+    ufoPath: str, layerName: str, dependencyCache: GlyphDependencyCache | None = None
+) -> tuple[GlyphDependencies, GlyphDependencyCache | None]:
+    # The cache is updated in the subprocess, so we continue with the copy it
+    # sends back
+    componentInfo, dependencyCache = await runInSubProcess(
+        _extractComponentInfoFromUFO, ufoPath, layerName, dependencyCache
     )
+    if dependencyCache is not None:
+        logger.info(
+            f"glyph dependencies: parsed {dependencyCache.numParsed} of "
+            f"{len(dependencyCache.entries)} glyph files in {ufoPath}"
+        )
     dependencies = GlyphDependencies()
     for glyphName, componentNames in componentInfo.items():
         dependencies.update(glyphName, componentNames)
-    return dependencies
+    return dependencies, dependencyCache
 
 
-def _extractComponentInfoFromUFO(ufoPath: str, layerName: str) -> dict[str, set[str]]:
+def _extractComponentInfoFromUFO(
+    ufoPath: str, layerName: str, dependencyCache: GlyphDependencyCache | None
+) -> tuple[dict[str, set[str]], GlyphDependencyCache | None]:
     reader = UFOReader(ufoPath)
     glyphSet = reader.getGlyphSet(layerName=layerName)
-    componentInfo = {}
-    for glyphName in glyphSet.keys():
+
+    def parseComponentNames(glyphName, glyphPath=None):
         glyph, _ = ufoLayerToStaticGlyph(
             glyphSet, glyphName, penClass=ComponentsOnlyPointPen
         )
-        if glyph.components:
-            componentInfo[glyphName] = {compo.name for compo in glyph.components}
-    return componentInfo
+        return {compo.name for compo in glyph.components}
+
+    if dependencyCache is not None:
+        componentInfo = dependencyCache.scan(glyphSet.contents, parseComponentNames)
+    else:
+        componentInfo = {}
+        for glyphName in glyphSet.keys():
+            componentNames = parseComponentNames(glyphName)
+            if componentNames:
+                componentInfo[glyphName] = componentNames
+    return componentInfo, dependencyCache
 
 
 def componentNamesFromGlyph(glyph):
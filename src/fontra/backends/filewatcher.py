@@ -13,6 +13,8 @@ logger = logging.getLogger(__name__)
 @dataclass
 class FileWatcher:
     callback: Callable[[set[tuple[Change, str]]], Awaitable[None]]
+    # If False, only changes to the direct children of the paths are reported
+    recursive: bool = True
     paths: set[str] = field(init=False, default_factory=set)
     _stopEvent: asyncio.Event = field(init=False, default=asyncio.Event())
     _task: asyncio.Task | None = field(init=False, default=None)
@@ -55,7 +57,9 @@ class FileWatcher:
 
     async def _watchFiles(self) -> None:
         self._stopEvent = asyncio.Event()
-        async for changes in awatch(*sorted(self.paths), stop_event=self._stopEvent):
+        async for changes in awatch(
+            *sorted(self.paths), stop_event=self._stopEvent, recursive=self.recursive
+        ):
             changes = cleanupWatchFilesChanges(changes)
             changes = self._filterIgnores(changes)
             if changes:
@@ -1,10 +1,12 @@
 import asyncio
 import csv
+import io
 import json
 import logging
 import os
 import pathlib
 import shutil
+from bisect import bisect_left, insort
 from collections import defaultdict
 from copy import deepcopy
 from dataclasses import dataclass, field
@@ -26,11 +28,17 @@ from ..core.classes import (
     unstructure,
 )
 from ..core.glyphdependencies import GlyphDependencies
+from ..core.glyphdependencycache import (
+    GlyphDependencyCache,
+    getGlyphDependencyCachePath,
+)
 from ..core.protocols import WritableFontBackend
 from ..core.subprocess import runInSubProcess
+from ..core.threading import runBlockingIO
 from .base import WritableBaseBackend
 from .filenames import fileNameToString, stringToFileName
 from .filewatcher import Change
+from .glyphjson import UnsupportedGlyphData, decodeGlyph, encodeGlyph, loadJSON
 from .watchable import WatchableBackend
 
 logger = logging.getLogger(__name__)
@@ -68,6 +76,12 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
         self.glyphsDir.mkdir(exist_ok=True)
         self.glyphMap: dict[str, list[int]] = {}
         self.glyphInfos: dict[str, Any] = {}
+        # glyph-info.csv gets rewritten after every code point change, so its
+        # rows are kept in order and formatted, and only the rows of changed
+        # glyphs get formatted again
+        self._sortedGlyphNames: list[str] = []
+        self._glyphInfoKeys: list[str] = []
+        self._glyphInfoRows: dict[str, str] = {}
         self.fontData = Font()
         if not create:
             self._readGlyphInfo()
@@ -81,6 +95,7 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
 
         self._glyphDependenciesTask: asyncio.Task[GlyphDependencies] | None = None
         self._glyphDependencies: GlyphDependencies | None = None
+        self._glyphDependencyCache: GlyphDependencyCache | None = None
         self._backgroundTasksTask: asyncio.Task | None = None
 
     @property
@@ -130,6 +145,9 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
     async def getGlyph(self, glyphName: str) -> VariableGlyph | None:
         if glyphName not in self.glyphMap:
             return None
+        return await runBlockingIO(self._readGlyph, glyphName)
+
+    def _readGlyph(self, glyphName: str) -> VariableGlyph | None:
         try:
             jsonSource = self.getGlyphData(glyphName)
         except KeyError:
@@ -139,17 +157,37 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
     async def putGlyph(
         self, glyphName: str, glyph: VariableGlyph, codePoints: list[int]
     ) -> None:
-        jsonSource = serializeGlyph(glyph, glyphName)
         filePath = self.getGlyphFilePath(glyphName)
-        filePath.write_text(jsonSource, encoding="utf=8")
+        await runBlockingIO(_writeGlyph, filePath, glyph, glyphName)
         self.fileWatcherIgnoreNextChange(filePath)
 
         if codePoints != self.glyphMap.get(glyphName):
+            if glyphName not in self.glyphMap:
+                insort(self._sortedGlyphNames, glyphName)
             self.glyphMap[glyphName] = codePoints
+            self._glyphInfoRows.pop(glyphName, None)
             self._scheduler.schedule(self._writeGlyphInfo)
 
         if self._glyphDependencies is not None:
-            self._glyphDependencies.update(glyphName, componentNamesFromGlyph(glyph))
+            componentNames = componentNamesFromGlyph(glyph)
+            self._glyphDependencies.update(glyphName, componentNames)
+            if self._glyphDependencyCache is not None:
+                self._glyphDependencyCache.glyphWritten(
+                    glyphName, filePath.name, componentNames
+                )
+                self._scheduler.schedule(self._writeGlyphDependencyCache)
+
+    async def putGlyphs(
+        self, glyphs: list[tuple[str, VariableGlyph, list[int]]]
+    ) -> None:
+        # The glyph files are written concurrently in the I/O thread pool, the
+        # glyph info is written once, by the scheduler
+        await asyncio.gather(
+            *(
+                self.putGlyph(glyphName, glyph, codePoints)
+                for glyphName, glyph, codePoints in glyphs
+            )
+        )
 
     async def deleteGlyph(self, glyphName: str) -> None:
         if glyphName not in self.glyphMap:
@@ -161,9 +199,18 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
         self.fileWatcherIgnoreNextChange(filePath)
 
         del self.glyphMap[glyphName]
+        del self._sortedGlyphNames[bisect_left(self._sortedGlyphNames, glyphName)]
+        self._glyphInfoRows.pop(glyphName, None)
         self._scheduler.schedule(self._writeGlyphInfo)
         if self._glyphDependencies is not None:
             self._glyphDependencies.update(glyphName, ())
+            if self._glyphDependencyCache is not None:
+                self._glyphDependencyCache.glyphDeleted(filePath.name)
+                self._scheduler.schedule(self._writeGlyphDependencyCache)
+
+    async def deleteGlyphs(self, glyphNames: list[str]) -> None:
+        for glyphName in glyphNames:
+            await self.deleteGlyph(glyphName)
 
     async def getFontInfo(self) -> FontInfo:
         return deepcopy(self.fontData.fontInfo)
@@ -194,6 +241,32 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
         self.fontData.kerning = deepcopy(kerning)
         self._scheduler.schedule(self._writeKerning)
 
+    async def putKerningPairs(
+        self,
+        kernType: str,
+        sourceIdentifiers: list[str],
+        pairs: dict[tuple[str, str], list[float | None]],
+    ) -> None:
+        kerningTable = self.fontData.kerning[kernType]
+        if sourceIdentifiers != kerningTable.sourceIdentifiers:
+            raise ValueError("kerning source identifiers don't match")
+        for (left, right), values in pairs.items():
+            kerningTable.values.setdefault(left, {})[right] = list(values)
+        self._scheduler.schedule(self._writeKerning)
+
+    async def deleteKerningPairs(
+        self, kernType: str, pairs: list[tuple[str, str]]
+    ) -> None:
+        kerningTable = self.fontData.kerning[kernType]
+        for left, right in pairs:
+            rightDict = kerningTable.values.get(left)
+            if rightDict is None:
+                continue
+            rightDict.pop(right, None)
+            if not rightDict:
+                del kerningTable.values[left]
+        self._scheduler.schedule(self._writeKerning)
+
     async def getFeatures(self) -> OpenTypeFeatures:
         return deepcopy(self.fontData.features)
 
@@ -238,7 +311,17 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
         return deepcopy(self.glyphInfos)
 
     async def putGlyphInfos(self, glyphInfos: dict[str, Any]) -> None:
-        self.glyphInfos = deepcopy(glyphInfos)
+        glyphInfos = deepcopy(glyphInfos)
+        infoKeys = _collectGlyphInfoKeys(glyphInfos)
+        if infoKeys != self._glyphInfoKeys:
+            # The columns changed, all rows need to be formatted again
+            self._glyphInfoKeys = infoKeys
+            self._glyphInfoRows = {}
+        else:
+            for glyphName in self.glyphInfos.keys() | glyphInfos.keys():
+                if glyphInfos.get(glyphName) != self.glyphInfos.get(glyphName):
+                    self._glyphInfoRows.pop(glyphName, None)
+        self.glyphInfos = glyphInfos
         self._scheduler.schedule(self._writeGlyphInfo)
 
     def _readGlyphInfo(self) -> None:
@@ -263,46 +346,50 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
                     codePoints = []
                 self.glyphMap[glyphName] = codePoints
 
-    def _writeGlyphInfo(self) -> None:
-        infoKeys = set()
-        for info in self.glyphInfos.values():
-            infoKeys.update(info)
+        self._sortedGlyphNames = sorted(self.glyphMap)
+        self._glyphInfoKeys = _collectGlyphInfoKeys(self.glyphInfos)
+        self._glyphInfoRows = {}
 
-        infoKeyList = sorted(infoKeys)
+    def _writeGlyphInfo(self) -> None:
+        glyphInfoRows = self._glyphInfoRows
+        lines = [_formatCSVRow(["glyph name", "code points"] + self._glyphInfoKeys)]
+        for glyphName in self._sortedGlyphNames:
+            line = glyphInfoRows.get(glyphName)
+            if line is None:
+                line = glyphInfoRows[glyphName] = self._formatGlyphInfoRow(glyphName)
+            lines.append(line)
 
         with self.glyphInfoPath.open("w", encoding="utf-8", newline="") as file:
-            writer = csv.writer(file, delimiter=";")
-            writer.writerow(["glyph name", "code points"] + infoKeyList)
-            for glyphName, codePoints in sorted(self.glyphMap.items()):
-                assert glyphName
-                codePointsString = ",".join(f"U+{cp:04X}" for cp in codePoints)
-                row = [glyphName, codePointsString]
-
-                info = self.glyphInfos.get(glyphName)
-                if info:
-                    for key in infoKeyList:
-                        infoValue = info.get(key)
-                        cellValue = (
-                            ""
-                            if infoValue is None
-                            else (
-                                json.dumps(
-                                    infoValue, separators=(",", ":"), ensure_ascii=False
-                                )
-                                if not isinstance(infoValue, str)
-                                else infoValue
-                            )
-                        )
-
-                        row.append(cellValue)
-
-                while len(row) > 2 and not row[-1]:
-                    del row[-1]
-
-                writer.writerow(row)
+            file.write("".join(lines))
 
         self.fileWatcherIgnoreNextChange(self.glyphInfoPath)
 
+    def _formatGlyphInfoRow(self, glyphName: str) -> str:
+        assert glyphName
+        codePointsString = ",".join(f"U+{cp:04X}" for cp in self.glyphMap[glyphName])
+        row = [glyphName, codePointsString]
+
+        info = self.glyphInfos.get(glyphName)
+        if info:
+            for key in self._glyphInfoKeys:
+                infoValue = info.get(key)
+                cellValue = (
+                    ""
+                    if infoValue is None
+                    else (
+                        json.dumps(infoValue, separators=(",", ":"), ensure_ascii=False)
+                        if not isinstance(infoValue, str)
+                        else infoValue
+                    )
+                )
+
+                row.append(cellValue)
+
+        while len(row) > 2 and not row[-1]:
+            del row[-1]
+
+        return _formatCSVRow(row)
+
     def _readFontData(self) -> None:
         kerning = self.fontData.kerning
         features = self.fontData.features
@@ -383,7 +470,7 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
 
         if self._glyphDependenciesTask is None:
             self._glyphDependenciesTask = asyncio.create_task(
-                extractGlyphDependenciesFromFontra(self.glyphsDir)
+                self._extractGlyphDependencies()
             )
 
             def setResult(task):
@@ -394,6 +481,21 @@ class FontraBackend(WatchableBackend, WritableBaseBackend):
 
         return await self._glyphDependenciesTask
 
+    async def _extractGlyphDependencies(self) -> GlyphDependencies:
+        dependencies, self._glyphDependencyCache = (
+            await extractGlyphDependenciesFromFontra(
+                self.glyphsDir,
+                GlyphDependencyCache(
+                    self.glyphsDir, getGlyphDependencyCachePath(self.glyphsDir)
+                ),
+            )
+        )
+        return dependencies
+
+    def _writeGlyphDependencyCache(self):
+        if self._glyphDependencyCache is not None:
+            self._glyphDependencyCache.save()
+
     def startOptionalBackgroundTasks(self) -> None:
         self._backgroundTasksTask = asyncio.create_task(self.glyphDependencies)
 
@@ -471,7 +573,24 @@ def _parseCodePoints(cell: str) -> list[int]:
     return codePoints
 
 
+def _collectGlyphInfoKeys(glyphInfos: dict[str, Any]) -> list[str]:
+    infoKeys: set[str] = set()
+    for info in glyphInfos.values():
+        infoKeys.update(info)
+    return sorted(infoKeys)
+
+
+def _formatCSVRow(row: list[str]) -> str:
+    file = io.StringIO()
+    csv.writer(file, delimiter=";").writerow(row)
+    return file.getvalue()
+
+
 def serializeGlyph(glyph, glyphName=None):
+    try:
+        return encodeGlyph(glyph, glyphName) + "\n"
+    except UnsupportedGlyphData:
+        pass
     glyph = glyph.convertToPaths()
     jsonGlyph = unstructure(glyph)
     if glyphName is not None:
@@ -479,10 +598,18 @@ def serializeGlyph(glyph, glyphName=None):
     return serialize(jsonGlyph) + "\n"
 
 
+def _writeGlyph(filePath: pathlib.Path, glyph: VariableGlyph, glyphName: str) -> None:
+    filePath.write_text(serializeGlyph(glyph, glyphName), encoding="utf=8")
+
+
 def deserializeGlyph(jsonSource: str, glyphName: str | None = None) -> VariableGlyph:
-    jsonGlyph = json.loads(jsonSource)
+    jsonGlyph = loadJSON(jsonSource)
     if glyphName is not None:
         jsonGlyph["name"] = glyphName
+    try:
+        return decodeGlyph(jsonGlyph)
+    except UnsupportedGlyphData:
+        pass
     glyph = structure(jsonGlyph, VariableGlyph)
     return glyph.convertToPackedPaths()
 
@@ -671,29 +798,46 @@ class Scheduler:
 
 
 async def extractGlyphDependenciesFromFontra(
-    glyphsDir: pathlib.Path,
-) -> GlyphDependencies:
-    componentInfo = await runInSubProcess(_extractComponentInfoFromFontra, glyphsDir)
+    glyphsDir: pathlib.Path, dependencyCache: GlyphDependencyCache
+) -> tuple[GlyphDependencies, GlyphDependencyCache]:
+    # The cache is updated in the subprocess, so we continue with the copy it
+    # sends back
+    componentInfo, dependencyCache = await runInSubProcess(
+        _extractComponentInfoFromFontra, glyphsDir, dependencyCache
+    )
+    logger.info(
+        f"glyph dependencies: parsed {dependencyCache.numParsed} of "
+        f"{len(dependencyCache.entries)} glyph files in {os.fspath(glyphsDir)}"
+    )
 
     dependencies = GlyphDependencies()
     for glyphName, componentNames in componentInfo.items():
         dependencies.update(glyphName, componentNames)
-    return dependencies
+    return dependencies, dependencyCache
 
 
-def _extractComponentInfoFromFontra(glyphsDir: pathlib.Path) -> dict[str, set[str]]:
-    componentInfo = {}
-    for glyphPath in glyphsDir.glob("*.json"):
-        glyphName = fileNameToString(glyphPath.stem)
-        try:
-            glyphData = json.loads(glyphPath.read_text(encoding="utf-8"))
-        except json.JSONDecodeError as e:
-            logger.error(
-                f"error while extracting component info from {glyphName}: {e!r}",
-            )
-        else:
-            componentInfo[glyphName] = componentNamesFromGlyphData(glyphData)
-    return componentInfo
+def _extractComponentInfoFromFontra(
+    glyphsDir: pathlib.Path, dependencyCache: GlyphDependencyCache
+) -> tuple[dict[str, set[str]], GlyphDependencyCache]:
+    glyphFileNames = {
+        fileNameToString(glyphPath.stem): glyphPath.name
+        for glyphPath in glyphsDir.glob("*.json")
+    }
+    componentInfo = dependencyCache.scan(glyphFileNames, _parseComponentNamesFromFontra)
+    return componentInfo, dependencyCache
+
+
+def _parseComponentNamesFromFontra(
+    glyphName: str, glyphPath: pathlib.Path
+) -> set[str] | None:
+    try:
+        glyphData = loadJSON(glyphPath.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        logger.error(
+            f"error while extracting component info from {glyphName}: {e!r}",
+        )
+        return None
+    return componentNamesFromGlyphData(glyphData)
 
 
 def componentNamesFromGlyph(glyph):
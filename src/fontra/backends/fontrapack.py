@@ -0,0 +1,497 @@
+import asyncio
+import json
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+from collections import deque
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, get_type_hints
+
+from ..core.async_property import async_property
+from ..core.classes import (
+    Axes,
+    ConditionalSubstitutions,
+    Font,
+    FontInfo,
+    FontSource,
+    ImageData,
+    ImageType,
+    Kerning,
+    OpenTypeFeatures,
+    VariableGlyph,
+    structure,
+    unstructure,
+)
+from ..core.glyphdependencies import GlyphDependencies
+from ..core.protocols import WritableFontBackend
+from ..core.threading import runBlockingIO
+from .base import WritableBaseBackend
+from .fontra import Scheduler, componentNamesFromGlyph, deserializeGlyph, serializeGlyph
+
+logger = logging.getLogger(__name__)
+
+
+# A .fontrapack file is a single-file variant of the .fontra format: an SQLite
+# database with a row per glyph (containing the same JSON as a .fontra glyph
+# file), a row per glyph in the glyph info table, and a row per top-level field
+# of the font data. Glyphs are only read when requested. Writes are collected
+# by the write scheduler, and committed in a single transaction in the I/O
+# thread pool, so writing many glyphs doesn't mean many transactions, nor a
+# stalled event loop. Collected changes are committed in order, and before
+# anything is read from the database, so reads never see stale data.
+
+FORMAT_VERSION = 1
+
+_schema = """
+CREATE TABLE IF NOT EXISTS fontData (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS glyphs (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    components TEXT NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS glyphInfo (
+    name TEXT PRIMARY KEY,
+    codePoints TEXT NOT NULL,
+    info TEXT
+);
+CREATE TABLE IF NOT EXISTS backgroundImages (
+    identifier TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+# The font data fields that are stored in the fontData table, each as a JSON
+# value. The glyphs, the glyph map and the glyph infos have their own tables.
+_fontDataFieldTypes = {
+    fieldName: fieldType
+    for fieldName, fieldType in get_type_hints(Font).items()
+    if fieldName not in {"glyphs", "glyphMap", "glyphInfos"}
+}
+
+
+class FontraPackFormatError(Exception):
+    pass
+
+
+@dataclass(kw_only=True)
+class _CollectedChanges:
+    # glyph name -> (serialized glyph, component names), or None for a
+    # deleted glyph
+    glyphs: dict[str, tuple[str, list[str]] | None]
+    # glyph name -> (code points, glyph info), or None for a deleted glyph
+    glyphInfos: dict[str, tuple[list[int], Any] | None]
+    fontData: dict[str, Any]
+
+
+class FontraPackBackend(WritableBaseBackend):
+    @classmethod
+    def fromPath(cls, path) -> WritableFontBackend:
+        return cls(path=path)
+
+    @classmethod
+    def createFromPath(cls, path) -> WritableFontBackend:
+        return cls(path=path, create=True)
+
+    def __init__(self, *, path: Any, create: bool = False):
+        super().__init__()
+        self.path = pathlib.Path(path).resolve()
+        if create and self.path.exists():
+            self.path.unlink()
+        # The connection is used from the event loop and from the I/O thread
+        # pool, one at a time
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        if create:
+            with self._lock, self._connection:
+                self._connection.executescript(_schema)
+                self._connection.execute(f"PRAGMA user_version = {FORMAT_VERSION}")
+        else:
+            self._checkFormatVersion()
+
+        self.glyphMap: dict[str, list[int]] = {}
+        self.glyphInfos: dict[str, Any] = {}
+        self.fontData = Font()
+        if not create:
+            self._readGlyphInfo()
+            self._readFontData()
+
+        # glyph name -> (serialized glyph, component names), or None for a
+        # deleted glyph
+        self._glyphsToWrite: dict[str, tuple[str, list[str]] | None] = {}
+        self._glyphInfoToWrite: set[str] = set()
+        self._fontDataToWrite: set[str] = set()
+        self._scheduler = Scheduler()
+        # Changes collected by the scheduler, waiting to be committed
+        self._changesToCommit: deque[_CollectedChanges] = deque()
+        self._commitTasks: set[asyncio.Task] = set()
+
+        self._glyphDependenciesTask: asyncio.Task[GlyphDependencies] | None = None
+        self._glyphDependencies: GlyphDependencies | None = None
+        self._backgroundTasksTask: asyncio.Task | None = None
+
+    async def aclose(self) -> None:
+        try:
+            await self.flush()
+        finally:
+            await asyncio.gather(*self._commitTasks, return_exceptions=True)
+            for task in [self._backgroundTasksTask, self._glyphDependenciesTask]:
+                if task is not None:
+                    task.cancel()
+            await runBlockingIO(self._closeConnection)
+
+    async def flush(self) -> None:
+        # Commit all changes before returning. If that fails, the error is
+        # raised, and the changes are kept for the next attempt.
+        self._scheduler.flush()
+        await runBlockingIO(self._commitChangesLocked)
+
+    def _closeConnection(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _checkFormatVersion(self) -> None:
+        with self._lock:
+            try:
+                (formatVersion,) = self._connection.execute(
+                    "PRAGMA user_version"
+                ).fetchone()
+            except sqlite3.DatabaseError as e:
+                raise FontraPackFormatError(f"not a .fontrapack file: {e}")
+        if formatVersion != FORMAT_VERSION:
+            raise FontraPackFormatError(
+                f"unsupported .fontrapack format version: {formatVersion}"
+            )
+
+    async def getUnitsPerEm(self) -> int:
+        return self.fontData.unitsPerEm
+
+    async def putUnitsPerEm(self, unitsPerEm: int) -> None:
+        self._putFontData("unitsPerEm", unitsPerEm)
+
+    async def getGlyphMap(self) -> dict[str, list[int]]:
+        return dict(self.glyphMap)
+
+    async def putGlyphMap(self, value: dict[str, list[int]]) -> None:
+        pass
+
+    async def getGlyph(self, glyphName: str) -> VariableGlyph | None:
+        if glyphName not in self.glyphMap:
+            return None
+        pendingWrite = self._glyphsToWrite.get(glyphName)
+        if pendingWrite is not None:
+            jsonSource, _ = pendingWrite
+            return deserializeGlyph(jsonSource, glyphName)
+        return await runBlockingIO(self._readGlyph, glyphName)
+
+    def _readGlyph(self, glyphName: str) -> VariableGlyph | None:
+        with self._lock:
+            self._commitChangesBeforeReading()
+            row = self._connection.execute(
+                "SELECT data FROM glyphs WHERE name = ?", (glyphName,)
+            ).fetchone()
+        if row is None:
+            return None
+        return deserializeGlyph(row[0], glyphName)
+
+    async def putGlyph(
+        self, glyphName: str, glyph: VariableGlyph, codePoints: list[int]
+    ) -> None:
+        jsonSource = await runBlockingIO(serializeGlyph, glyph, glyphName)
+        componentNames = componentNamesFromGlyph(glyph)
+        self._glyphsToWrite[glyphName] = (jsonSource, sorted(componentNames))
+
+        if codePoints != self.glyphMap.get(glyphName):
+            self.glyphMap[glyphName] = codePoints
+            self._glyphInfoToWrite.add(glyphName)
+
+        if self._glyphDependencies is not None:
+            self._glyphDependencies.update(glyphName, componentNames)
+
+        self._scheduler.schedule(self._writeChanges)
+
+    async def putGlyphs(
+        self, glyphs: list[tuple[str, VariableGlyph, list[int]]]
+    ) -> None:
+        # All writes end up in the same transaction anyway
+        for glyphName, glyph, codePoints in glyphs:
+            await self.putGlyph(glyphName, glyph, codePoints)
+
+    async def deleteGlyph(self, glyphName: str) -> None:
+        if glyphName not in self.glyphMap:
+            logger.debug(f"Can't delete unknown glyph '{glyphName}'")
+            return
+
+        self._glyphsToWrite[glyphName] = None
+        del self.glyphMap[glyphName]
+        self._glyphInfoToWrite.add(glyphName)
+
+        if self._glyphDependencies is not None:
+            self._glyphDependencies.update(glyphName, ())
+
+        self._scheduler.schedule(self._writeChanges)
+
+    async def deleteGlyphs(self, glyphNames: list[str]) -> None:
+        for glyphName in glyphNames:
+            await self.deleteGlyph(glyphName)
+
+    async def getFontInfo(self) -> FontInfo:
+        return deepcopy(self.fontData.fontInfo)
+
+    async def putFontInfo(self, fontInfo: FontInfo):
+        self._putFontData("fontInfo", fontInfo)
+
+    async def getAxes(self) -> Axes:
+        return deepcopy(self.fontData.axes)
+
+    async def putAxes(self, axes: Axes) -> None:
+        self._putFontData("axes", axes)
+
+    async def getSources(self) -> dict[str, FontSource]:
+        return deepcopy(self.fontData.sources)
+
+    async def putSources(self, sources: dict[str, FontSource]) -> None:
+        self._putFontData("sources", sources)
+
+    async def getKerning(self) -> dict[str, Kerning]:
+        return deepcopy(self.fontData.kerning)
+
+    async def putKerning(self, kerning: dict[str, Kerning]) -> None:
+        assert all(isinstance(table, Kerning) for table in kerning.values())
+        self._putFontData("kerning", kerning)
+
+    async def getFeatures(self) -> OpenTypeFeatures:
+        return deepcopy(self.fontData.features)
+
+    async def putFeatures(self, features: OpenTypeFeatures) -> None:
+        assert isinstance(features, OpenTypeFeatures)
+        self._putFontData("features", features)
+
+    async def getConditionalSubstitutions(self) -> ConditionalSubstitutions:
+        return deepcopy(self.fontData.conditionalSubstitutions)
+
+    async def putConditionalSubstitutions(
+        self, substitutions: ConditionalSubstitutions
+    ) -> None:
+        self._putFontData("conditionalSubstitutions", substitutions)
+
+    async def getCustomData(self) -> dict[str, Any]:
+        return deepcopy(self.fontData.customData)
+
+    async def putCustomData(self, customData: dict[str, Any]) -> None:
+        self._putFontData("customData", customData)
+
+    async def getGlyphInfos(self) -> dict[str, Any]:
+        return deepcopy(self.glyphInfos)
+
+    async def putGlyphInfos(self, glyphInfos: dict[str, Any]) -> None:
+        self._glyphInfoToWrite.update(self.glyphInfos)
+        self._glyphInfoToWrite.update(glyphInfos)
+        self.glyphInfos = deepcopy(glyphInfos)
+        self._scheduler.schedule(self._writeChanges)
+
+    async def getBackgroundImage(self, imageIdentifier: str) -> ImageData | None:
+        return await runBlockingIO(self._readBackgroundImage, imageIdentifier)
+
+    def _readBackgroundImage(self, imageIdentifier: str) -> ImageData | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT type, data FROM backgroundImages WHERE identifier = ?",
+                (imageIdentifier,),
+            ).fetchone()
+        if row is None:
+            return None  # Image not found
+        imageType, data = row
+        return ImageData(type=ImageType(imageType), data=data)
+
+    async def putBackgroundImage(self, imageIdentifier: str, data: ImageData) -> None:
+        await runBlockingIO(self._writeBackgroundImage, imageIdentifier, data)
+
+    def _writeBackgroundImage(self, imageIdentifier: str, data: ImageData) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO backgroundImages VALUES (?, ?, ?)",
+                (imageIdentifier, data.type.value, data.data),
+            )
+
+    async def findGlyphsThatUseGlyph(self, glyphName):
+        return sorted((await self.glyphDependencies).usedBy.get(glyphName, []))
+
+    @async_property[GlyphDependencies]
+    async def glyphDependencies(self) -> GlyphDependencies:
+        if self._glyphDependencies is not None:
+            return self._glyphDependencies
+
+        if self._glyphDependenciesTask is None:
+            self._glyphDependenciesTask = asyncio.create_task(
+                self._extractGlyphDependencies()
+            )
+
+            def setResult(task):
+                if not task.cancelled() and task.exception() is None:
+                    self._glyphDependencies = task.result()
+
+            self._glyphDependenciesTask.add_done_callback(setResult)
+
+        return await self._glyphDependenciesTask
+
+    async def _extractGlyphDependencies(self) -> GlyphDependencies:
+        # The component names are stored in their own column, so we don't need
+        # to parse the glyphs
+        componentInfo = await runBlockingIO(self._readComponentInfo)
+        for glyphName, pendingWrite in self._glyphsToWrite.items():
+            if pendingWrite is None:
+                componentInfo.pop(glyphName, None)
+            else:
+                componentInfo[glyphName] = pendingWrite[1]
+
+        dependencies = GlyphDependencies()
+        for glyphName, componentNames in componentInfo.items():
+            dependencies.update(glyphName, componentNames)
+        return dependencies
+
+    def _readComponentInfo(self) -> dict[str, list[str]]:
+        with self._lock:
+            self._commitChangesBeforeReading()
+            rows = self._connection.execute(
+                "SELECT name, components FROM glyphs WHERE components != '[]'"
+            ).fetchall()
+        return {glyphName: json.loads(components) for glyphName, components in rows}
+
+    def startOptionalBackgroundTasks(self) -> None:
+        self._backgroundTasksTask = asyncio.create_task(self.glyphDependencies)
+
+    def _putFontData(self, key: str, value: Any) -> None:
+        setattr(self.fontData, key, deepcopy(value))
+        self._fontDataToWrite.add(key)
+        self._scheduler.schedule(self._writeChanges)
+
+    def _readGlyphInfo(self) -> None:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT name, codePoints, info FROM glyphInfo ORDER BY name"
+            ).fetchall()
+        self.glyphMap = {}
+        self.glyphInfos = {}
+        for glyphName, codePoints, info in rows:
+            self.glyphMap[glyphName] = json.loads(codePoints)
+            if info is not None:
+                self.glyphInfos[glyphName] = json.loads(info)
+
+    def _readFontData(self) -> None:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, value FROM fontData"
+            ).fetchall()
+        for key, value in rows:
+            fieldType = _fontDataFieldTypes.get(key)
+            if fieldType is None:
+                logger.warning(f"ignoring unknown font data field: {key}")
+                continue
+            setattr(self.fontData, key, structure(json.loads(value), fieldType))
+
+    def _writeChanges(self) -> None:
+        # Called by the scheduler, on the event loop: collect the changes, and
+        # commit them in the I/O thread pool. The font data and glyph info
+        # values are replaced, never modified, so they can be serialized there.
+        changes = _CollectedChanges(
+            glyphs=self._glyphsToWrite,
+            glyphInfos={
+                glyphName: (
+                    (self.glyphMap[glyphName], self.glyphInfos.get(glyphName))
+                    if glyphName in self.glyphMap
+                    else None
+                )
+                for glyphName in self._glyphInfoToWrite
+            },
+            fontData={
+                key: getattr(self.fontData, key) for key in self._fontDataToWrite
+            },
+        )
+        self._glyphsToWrite = {}
+        self._glyphInfoToWrite = set()
+        self._fontDataToWrite = set()
+        self._changesToCommit.append(changes)
+
+        task = asyncio.create_task(runBlockingIO(self._commitChangesLocked))
+        self._commitTasks.add(task)
+        task.add_done_callback(self._commitTaskDone)
+
+    def _commitTaskDone(self, task: asyncio.Task) -> None:
+        # The failed changes are still queued: they are retried by the next
+        # commit, and flush() raises the error if they keep failing
+        self._commitTasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"error while writing to {self.path.name}: {task.exception()!r}"
+            )
+
+    def _commitChangesLocked(self) -> None:
+        with self._lock:
+            self._commitChanges()
+
+    def _commitChanges(self) -> None:
+        # Must be called with self._lock held. The changes may already have
+        # been committed by an earlier call.
+        while self._changesToCommit:
+            changes = self._changesToCommit.popleft()
+            try:
+                with self._connection:
+                    self._commitCollectedChanges(changes)
+            except BaseException:
+                # Keep the changes, in order, for the next attempt
+                self._changesToCommit.appendleft(changes)
+                raise
+
+    def _commitChangesBeforeReading(self) -> None:
+        # Must be called with self._lock held. A failing commit shouldn't make
+        # reading fail, too: flush() reports the error.
+        try:
+            self._commitChanges()
+        except Exception as e:
+            logger.error(f"error while writing to {self.path.name}: {e!r}")
+
+    def _commitCollectedChanges(self, changes: _CollectedChanges) -> None:
+        mtime = time.time()
+        execute = self._connection.execute
+        for glyphName, pendingWrite in changes.glyphs.items():
+            if pendingWrite is None:
+                execute("DELETE FROM glyphs WHERE name = ?", (glyphName,))
+            else:
+                jsonSource, componentNames = pendingWrite
+                execute(
+                    "INSERT OR REPLACE INTO glyphs VALUES (?, ?, ?, ?)",
+                    (glyphName, jsonSource, json.dumps(componentNames), mtime),
+                )
+
+        for glyphName, glyphInfo in changes.glyphInfos.items():
+            if glyphInfo is None:
+                execute("DELETE FROM glyphInfo WHERE name = ?", (glyphName,))
+                continue
+            codePoints, info = glyphInfo
+            execute(
+                "INSERT OR REPLACE INTO glyphInfo VALUES (?, ?, ?)",
+                (glyphName, json.dumps(codePoints), serialize(info) if info else None),
+            )
+
+        for key, value in changes.fontData.items():
+            execute(
+                "INSERT OR REPLACE INTO fontData VALUES (?, ?)",
+                (key, serialize(unstructure(value))),
+            )
+
+        logger.debug(
+            f"wrote {len(changes.glyphs)} glyphs, {len(changes.glyphInfos)} glyph "
+            f"infos and {len(changes.fontData)} font data fields to {self.path.name}"
+        )
+
+
+def serialize(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,698 @@
+from __future__ import annotations
+
+import json
+from dataclasses import fields
+from json.encoder import encode_basestring
+from typing import Any, Callable, Optional
+
+from fontTools.misc.transform import DecomposedTransform
+
+from ..core.classes import (
+    Anchor,
+    BackgroundImage,
+    Component,
+    GlyphAxis,
+    GlyphSource,
+    Guideline,
+    Layer,
+    RGBAColor,
+    StaticGlyph,
+    VariableGlyph,
+    structure,
+)
+from ..core.path import (
+    Contour,
+    ContourInfo,
+    PackedPath,
+    Path,
+    PointType,
+    packPointType,
+)
+
+loadJSON: Callable[[str], Any]
+try:
+    import orjson
+except ImportError:
+    loadJSON = json.loads
+else:
+
+    def loadJSON(jsonSource: str) -> Any:
+        try:
+            return orjson.loads(jsonSource)
+        except orjson.JSONDecodeError:
+            # orjson is stricter than json, for example it rejects NaN and
+            # Infinity, which json writes for non-finite floats
+            return json.loads(jsonSource)
+
+
+# Glyph files are written with json.dumps(indent=0), after unstructuring the
+# glyph with cattrs, and with its packed paths converted to unpacked paths. The
+# json module can't use its C encoder when indenting, and the unpacked paths are
+# only needed to be written out, so that is a slow way to go about it.
+#
+# encodeGlyph() and decodeGlyph() know the VariableGlyph schema and the cattrs
+# hooks from fontra.core.classes, and encode and decode glyphs directly,
+# writing packed paths as unpacked paths on the fly, and vice versa. The output
+# is exactly the same as that of the generic route. Data that doesn't fit the
+# schema raises UnsupportedGlyphData, and is left to the generic route. The
+# same goes for all glyphs if a class gained a field this module doesn't know
+# about (see _schemaFields at the end of the module).
+
+
+class UnsupportedGlyphData(Exception):
+    pass
+
+
+def encodeGlyph(glyph: VariableGlyph, glyphName: str | None = None) -> str:
+    """Return the glyph file contents for `glyph`, without the trailing newline.
+    Raise UnsupportedGlyphData if the glyph contains data outside the schema.
+    """
+    _checkSchema()
+    try:
+        return _encodeVariableGlyph(glyph, glyphName)
+    except (TypeError, AttributeError) as e:
+        raise UnsupportedGlyphData(e) from e
+
+
+def decodeGlyph(jsonGlyph: dict) -> VariableGlyph:
+    """Return a VariableGlyph with packed paths from the loaded JSON data of a
+    glyph file. Raise UnsupportedGlyphData if the data doesn't fit the schema.
+    """
+    _checkSchema()
+    try:
+        return _decodeVariableGlyph(jsonGlyph)
+    except (TypeError, KeyError, ValueError, AttributeError) as e:
+        raise UnsupportedGlyphData(e) from e
+
+
+# Encoding
+
+
+def _encodeVariableGlyph(glyph: VariableGlyph, glyphName: str | None) -> str:
+    members = [
+        '"name": '
+        + _encodeOptionalString(glyph.name if glyphName is None else glyphName)
+    ]
+    if glyph.axes:
+        members.append('"axes": ' + _encodeArray(_encodeGlyphAxis, glyph.axes))
+    if glyph.sources:
+        members.append('"sources": ' + _encodeArray(_encodeGlyphSource, glyph.sources))
+    if glyph.layers:
+        members.append(
+            '"layers": '
+            + _encodeObject(
+                [
+                    _encodeString(layerName) + ": " + _encodeLayer(layer)
+                    for layerName, layer in sorted(glyph.layers.items())
+                ]
+            )
+        )
+    _appendCustomData(members, glyph.customData)
+    return _encodeObject(members)
+
+
+_intRepr = int.__repr__
+_floatRepr = float.__repr__
+_encodeString = encode_basestring
+
+
+def _encodeObject(members: list[str]) -> str:
+    return "{\n" + ",\n".join(members) + "\n}" if members else "{}"
+
+
+def _encodeArray(encodeItem: Callable[[Any], str], items) -> str:
+    return "[\n" + ",\n".join(map(encodeItem, items)) + "\n]" if items else "[]"
+
+
+def _encodeFloat(value: float) -> str:
+    if value != value:
+        return "NaN"
+    elif value == _infinity:
+        return "Infinity"
+    elif value == -_infinity:
+        return "-Infinity"
+    return _floatRepr(value)
+
+
+_infinity = float("inf")
+
+
+def _encodeNumber(value: float) -> str:
+    # Numbers are unstructured with _unstructureFloat: floats with an integer
+    # value are written as ints
+    if value.__class__ is float:
+        return _intRepr(int(value)) if value.is_integer() else _encodeFloat(value)
+    elif value.__class__ is int:
+        return _intRepr(value)
+    raise UnsupportedGlyphData(f"unexpected number type: {type(value)}")
+
+
+def _encodeOptionalString(value: str | None) -> str:
+    if value is None:
+        return "null"
+    elif value.__class__ is str:
+        return _encodeString(value)
+    raise UnsupportedGlyphData(f"unexpected string type: {type(value)}")
+
+
+def _encodeBool(value: bool) -> str:
+    if value is True:
+        return "true"
+    elif value is False:
+        return "false"
+    raise UnsupportedGlyphData(f"unexpected bool type: {type(value)}")
+
+
+def _encodeValue(value: Any, sortKeys: bool, convertFloats: bool) -> str:
+    cls = value.__class__
+    if cls is str:
+        return _encodeString(value)
+    elif cls is float:
+        if convertFloats and value.is_integer():
+            return _intRepr(int(value))
+        return _encodeFloat(value)
+    elif value is None:
+        return "null"
+    elif value is True:
+        return "true"
+    elif value is False:
+        return "false"
+    elif cls is int:
+        return _intRepr(value)
+    elif cls is dict:
+        items = sorted(value.items(), key=_itemKey) if sortKeys else value.items()
+        members = []
+        for k, v in items:
+            if k.__class__ is not str:
+                raise UnsupportedGlyphData(f"unexpected key type: {type(k)}")
+            members.append(
+                _encodeString(k) + ": " + _encodeValue(v, sortKeys, convertFloats)
+            )
+        return _encodeObject(members)
+    elif cls is list or cls is tuple:
+        if not value:
+            return "[]"
+        return (
+            "[\n"
+            + ",\n".join(_encodeValue(v, sortKeys, convertFloats) for v in value)
+            + "\n]"
+        )
+    raise UnsupportedGlyphData(f"unexpected value type: {cls}")
+
+
+def _itemKey(item):
+    return item[0]
+
+
+def _appendCustomData(members: list[str], customData: dict) -> None:
+    if customData:
+        members.append('"customData": ' + _encodeValue(customData, True, True))
+
+
+def _appendLocation(members: list[str], location: dict, sortKeys: bool) -> None:
+    if location:
+        members.append('"location": ' + _encodeValue(location, sortKeys, True))
+
+
+def _encodeGlyphAxis(axis: GlyphAxis) -> str:
+    members = [
+        '"name": ' + _encodeOptionalString(axis.name),
+        '"minValue": ' + _encodeNumber(axis.minValue),
+        '"defaultValue": ' + _encodeNumber(axis.defaultValue),
+        '"maxValue": ' + _encodeNumber(axis.maxValue),
+    ]
+    _appendCustomData(members, axis.customData)
+    return _encodeObject(members)
+
+
+def _encodeGlyphSource(source: GlyphSource) -> str:
+    members = [
+        '"name": ' + _encodeOptionalString(source.name),
+        '"layerName": ' + _encodeOptionalString(source.layerName),
+    ]
+    _appendLocation(members, source.location, True)
+    if source.locationBase is not None:
+        members.append('"locationBase": ' + _encodeOptionalString(source.locationBase))
+    if source.inactive:
+        members.append('"inactive": ' + _encodeBool(source.inactive))
+    _appendCustomData(members, source.customData)
+    return _encodeObject(members)
+
+
+def _encodeLayer(layer: Layer) -> str:
+    members = ['"glyph": ' + _encodeStaticGlyph(layer.glyph)]
+    _appendCustomData(members, layer.customData)
+    return _encodeObject(members)
+
+
+def _encodeStaticGlyph(glyph: StaticGlyph) -> str:
+    members = []
+    path = glyph.path
+    if path.__class__ is PackedPath:
+        if path.contourInfo:
+            members.append(
+                '"path": {\n"contours": ' + _encodePackedContours(path) + "\n}"
+            )
+    elif path.__class__ is Path:
+        if path.contours:
+            members.append(
+                '"path": {\n"contours": '
+                + _encodeArray(_encodeContour, path.contours)
+                + "\n}"
+            )
+    else:
+        raise UnsupportedGlyphData(f"unexpected path type: {type(path)}")
+    if glyph.components:
+        members.append(
+            '"components": ' + _encodeArray(_encodeComponent, glyph.components)
+        )
+    if glyph.xAdvance is not None:
+        members.append('"xAdvance": ' + _encodeNumber(glyph.xAdvance))
+    if glyph.yAdvance is not None:
+        members.append('"yAdvance": ' + _encodeNumber(glyph.yAdvance))
+    if glyph.verticalOrigin is not None:
+        members.append('"verticalOrigin": ' + _encodeNumber(glyph.verticalOrigin))
+    if glyph.anchors:
+        members.append('"anchors": ' + _encodeArray(_encodeAnchor, glyph.anchors))
+    if glyph.guidelines:
+        members.append(
+            '"guidelines": ' + _encodeArray(_encodeGuideline, glyph.guidelines)
+        )
+    if glyph.backgroundImage is not None:
+        members.append(
+            '"backgroundImage": ' + _encodeBackgroundImage(glyph.backgroundImage)
+        )
+    return _encodeObject(members)
+
+
+_pointTypeMembers = {
+    PointType.ON_CURVE: "",
+    PointType.OFF_CURVE_QUAD: ',\n"type": "quad"',
+    PointType.OFF_CURVE_CUBIC: ',\n"type": "cubic"',
+    PointType.ON_CURVE_SMOOTH: ',\n"smooth": true',
+}
+
+
+def _encodePackedContours(path: PackedPath) -> str:
+    # This writes the points the way PackedPath.asPath() unpacks them
+    coordinates = path.coordinates
+    pointTypes = path.pointTypes
+    pointAttributes = path.pointAttributes
+    contours = []
+    startIndex = 0
+    for contourInfo in path.contourInfo:
+        endIndex = contourInfo.endPoint + 1
+        points = []
+        for i in range(startIndex, endIndex):
+            point = (
+                '{\n"x": '
+                + _encodeNumber(coordinates[i * 2])
+                + ',\n"y": '
+                + _encodeNumber(coordinates[i * 2 + 1])
+                + _pointTypeMembers.get(pointTypes[i], "")
+            )
+            if pointAttributes is not None:
+                attrs = pointAttributes[i]
+                if attrs:
+                    point += ',\n"attrs": ' + _encodeValue(attrs, False, False)
+            points.append(point + "\n}")
+        contours.append(
+            '{\n"points": '
+            + (("[\n" + ",\n".join(points) + "\n]") if points else "[]")
+            + ',\n"isClosed": '
+            + _encodeBool(contourInfo.isClosed)
+            + "\n}"
+        )
+        startIndex = endIndex
+    return "[\n" + ",\n".join(contours) + "\n]"
+
+
+def _encodeContour(contour) -> str:
+    return (
+        '{\n"points": '
+        + _encodeValue(contour.points, False, False)
+        + ',\n"isClosed": '
+        + _encodeBool(contour.isClosed)
+        + "\n}"
+    )
+
+
+_defaultTransformation = DecomposedTransform()
+_transformationFields = [
+    ("translateX", 0),
+    ("translateY", 0),
+    ("rotation", 0),
+    ("scaleX", 1),
+    ("scaleY", 1),
+    ("skewX", 0),
+    ("skewY", 0),
+    ("tCenterX", 0),
+    ("tCenterY", 0),
+]
+
+
+def _appendTransformation(
+    members: list[str], transformation: DecomposedTransform
+) -> None:
+    if transformation.__class__ is not DecomposedTransform:
+        raise UnsupportedGlyphData(
+            f"unexpected transformation type: {type(transformation)}"
+        )
+    if transformation == _defaultTransformation:
+        return
+    transformationMembers = []
+    for fieldName, defaultValue in _transformationFields:
+        value = getattr(transformation, fieldName)
+        if value != defaultValue:
+            transformationMembers.append(f'"{fieldName}": ' + _encodeNumber(value))
+    members.append('"transformation": ' + _encodeObject(transformationMembers))
+
+
+def _encodeComponent(component: Component) -> str:
+    members = ['"name": ' + _encodeOptionalString(component.name)]
+    _appendTransformation(members, component.transformation)
+    # Unlike GlyphSource.location, Component.location is written unsorted
+    _appendLocation(members, component.location, False)
+    _appendCustomData(members, component.customData)
+    return _encodeObject(members)
+
+
+def _encodeAnchor(anchor: Anchor) -> str:
+    members = [
+        '"name": ' + _encodeOptionalString(anchor.name),
+        '"x": ' + _encodeNumber(anchor.x),
+        '"y": ' + _encodeNumber(anchor.y),
+    ]
+    _appendCustomData(members, anchor.customData)
+    return _encodeObject(members)
+
+
+def _encodeGuideline(guideline: Guideline) -> str:
+    members = []
+    if guideline.name is not None:
+        members.append('"name": ' + _encodeOptionalString(guideline.name))
+    if guideline.x != 0:
+        members.append('"x": ' + _encodeNumber(guideline.x))
+    if guideline.y != 0:
+        members.append('"y": ' + _encodeNumber(guideline.y))
+    if guideline.angle != 0:
+        members.append('"angle": ' + _encodeNumber(guideline.angle))
+    if guideline.locked:
+        members.append('"locked": ' + _encodeBool(guideline.locked))
+    _appendCustomData(members, guideline.customData)
+    return _encodeObject(members)
+
+
+def _encodeBackgroundImage(image: BackgroundImage) -> str:
+    members = ['"identifier": ' + _encodeOptionalString(image.identifier)]
+    _appendTransformation(members, image.transformation)
+    if image.opacity != 1.0:
+        members.append('"opacity": ' + _encodeNumber(image.opacity))
+    if image.color is not None:
+        color = image.color
+        members.append(
+            '"color": '
+            + _encodeObject(
+                [
+                    '"red": ' + _encodeNumber(color.red),
+                    '"green": ' + _encodeNumber(color.green),
+                    '"blue": ' + _encodeNumber(color.blue),
+                    '"alpha": ' + _encodeNumber(color.alpha),
+                ]
+            )
+        )
+    _appendCustomData(members, image.customData)
+    return _encodeObject(members)
+
+
+# Decoding
+
+
+def _checkKeys(d: dict, fieldNames: frozenset[str]) -> None:
+    if d.__class__ is not dict or not d.keys() <= fieldNames:
+        raise UnsupportedGlyphData(f"unexpected data: {d!r:.100}")
+
+
+def _checkNumber(value):
+    if not isinstance(value, (float, int)):
+        raise UnsupportedGlyphData(f"unexpected number: {value!r}")
+    return value
+
+
+def _checkOptionalNumber(value):
+    return None if value is None else _checkNumber(value)
+
+
+def _checkString(value):
+    if value.__class__ is not str:
+        raise UnsupportedGlyphData(f"unexpected string: {value!r}")
+    return value
+
+
+def _checkOptionalString(value):
+    return None if value is None else _checkString(value)
+
+
+def _decodeDict(value) -> dict:
+    if value.__class__ is not dict:
+        raise UnsupportedGlyphData(f"unexpected dict: {value!r:.100}")
+    return dict(value)
+
+
+def _decodeLocation(value) -> dict[str, float]:
+    location = _decodeDict(value)
+    for axisValue in location.values():
+        _checkNumber(axisValue)
+    return location
+
+
+def _decodeList(decodeItem: Callable[[Any], Any], value) -> list:
+    if value.__class__ is not list:
+        raise UnsupportedGlyphData(f"unexpected list: {value!r:.100}")
+    return [decodeItem(item) for item in value]
+
+
+_variableGlyphFields = frozenset(["name", "axes", "sources", "layers", "customData"])
+
+
+def _decodeVariableGlyph(d) -> VariableGlyph:
+    _checkKeys(d, _variableGlyphFields)
+    return VariableGlyph(
+        name=_checkString(d["name"]),
+        axes=_decodeList(_decodeGlyphAxis, d.get("axes", [])),
+        sources=_decodeList(_decodeGlyphSource, d.get("sources", [])),
+        layers={
+            _checkString(layerName): _decodeLayer(layer)
+            for layerName, layer in _decodeDict(d.get("layers", {})).items()
+        },
+        customData=_decodeDict(d.get("customData", {})),
+    )
+
+
+_glyphAxisFields = frozenset(
+    ["name", "minValue", "defaultValue", "maxValue", "customData"]
+)
+
+
+def _decodeGlyphAxis(d) -> GlyphAxis:
+    _checkKeys(d, _glyphAxisFields)
+    return GlyphAxis(
+        name=_checkString(d["name"]),
+        minValue=_checkNumber(d["minValue"]),
+        defaultValue=_checkNumber(d["defaultValue"]),
+        maxValue=_checkNumber(d["maxValue"]),
+        customData=_decodeDict(d.get("customData", {})),
+    )
+
+
+_glyphSourceFields = frozenset(
+    ["name", "layerName", "location", "locationBase", "inactive", "customData"]
+)
+
+
+def _decodeGlyphSource(d) -> GlyphSource:
+    _checkKeys(d, _glyphSourceFields)
+    return GlyphSource(
+        name=_checkString(d["name"]),
+        layerName=_checkString(d["layerName"]),
+        location=_decodeLocation(d.get("location", {})),
+        locationBase=_checkOptionalString(d.get("locationBase")),
+        inactive=d.get("inactive", False),
+        customData=_decodeDict(d.get("customData", {})),
+    )
+
+
+_layerFields = frozenset(["glyph", "customData"])
+
+
+def _decodeLayer(d) -> Layer:
+    _checkKeys(d, _layerFields)
+    return Layer(
+        glyph=_decodeStaticGlyph(d["glyph"]),
+        customData=_decodeDict(d.get("customData", {})),
+    )
+
+
+_staticGlyphFields = frozenset(
+    [
+        "path",
+        "components",
+        "xAdvance",
+        "yAdvance",
+        "verticalOrigin",
+        "anchors",
+        "guidelines",
+        "backgroundImage",
+    ]
+)
+
+
+def _decodeStaticGlyph(d) -> StaticGlyph:
+    _checkKeys(d, _staticGlyphFields)
+    glyph = StaticGlyph(
+        path=_decodePath(d.get("path", {})),
+        components=_decodeList(_decodeComponent, d.get("components", [])),
+        xAdvance=_checkOptionalNumber(d.get("xAdvance")),
+        yAdvance=_checkOptionalNumber(d.get("yAdvance")),
+        verticalOrigin=_checkOptionalNumber(d.get("verticalOrigin")),
+        anchors=_decodeList(_decodeAnchor, d.get("anchors", [])),
+    )
+    # Guidelines and background images are rare enough to leave to cattrs
+    if "guidelines" in d:
+        glyph.guidelines = structure(d["guidelines"], list[Guideline])
+    if "backgroundImage" in d:
+        glyph.backgroundImage = structure(
+            d["backgroundImage"], Optional[BackgroundImage]
+        )
+    return glyph
+
+
+_pathFields = frozenset(["contours"])
+_contourFields = frozenset(["points", "isClosed"])
+
+
+def _decodePath(d) -> PackedPath:
+    if "pointTypes" in d:
+        return structure(d, PackedPath)
+    _checkKeys(d, _pathFields)
+    # This packs the points the way Path.asPackedPath() does, after the points
+    # got structured with _structurePoint
+    coordinates: list[float] = []
+    pointTypes: list[PointType] = []
+    pointAttributes: list[dict | None] = []
+    contourInfo = []
+    for contour in _decodeList(_identity, d.get("contours", [])):
+        _checkKeys(contour, _contourFields)
+        for point in _decodeList(_identity, contour.get("points", [])):
+            coordinates.append(_decodeCoordinate(point["x"]))
+            coordinates.append(_decodeCoordinate(point["y"]))
+            pointTypes.append(packPointType(point.get("type"), point.get("smooth")))
+            pointAttributes.append(point.get("attrs") or None)
+        contourInfo.append(
+            ContourInfo(
+                endPoint=len(pointTypes) - 1, isClosed=contour.get("isClosed", False)
+            )
+        )
+    return PackedPath(
+        coordinates=coordinates,
+        pointTypes=pointTypes,
+        contourInfo=contourInfo,
+        pointAttributes=pointAttributes,
+    )
+
+
+def _identity(value):
+    return value
+
+
+def _decodeCoordinate(value):
+    if value.__class__ is float:
+        return int(value) if value.is_integer() else value
+    elif value.__class__ is int:
+        return value
+    raise UnsupportedGlyphData(f"unexpected coordinate: {value!r}")
+
+
+_componentFields = frozenset(["name", "transformation", "location", "customData"])
+
+
+def _decodeComponent(d) -> Component:
+    _checkKeys(d, _componentFields)
+    return Component(
+        name=_checkString(d["name"]),
+        transformation=_decodeTransformation(d.get("transformation", {})),
+        location=_decodeLocation(d.get("location", {})),
+        customData=_decodeDict(d.get("customData", {})),
+    )
+
+
+_transformationFieldNames = frozenset(name for name, _ in _transformationFields)
+
+
+def _decodeTransformation(d) -> DecomposedTransform:
+    _checkKeys(d, _transformationFieldNames)
+    for value in d.values():
+        _checkNumber(value)
+    return DecomposedTransform(**d)
+
+
+_anchorFields = frozenset(["name", "x", "y", "customData"])
+
+
+def _decodeAnchor(d) -> Anchor:
+    _checkKeys(d, _anchorFields)
+    return Anchor(
+        name=_checkOptionalString(d["name"]),
+        x=_checkNumber(d["x"]),
+        y=_checkNumber(d["y"]),
+        customData=_decodeDict(d.get("customData", {})),
+    )
+
+
+# Schema check
+
+_guidelineFields = frozenset(["name", "x", "y", "angle", "locked", "customData"])
+_backgroundImageFields = frozenset(
+    ["identifier", "transformation", "opacity", "color", "customData"]
+)
+_colorFields = frozenset(["red", "green", "blue", "alpha"])
+_packedPathFields = frozenset(
+    ["coordinates", "pointTypes", "contourInfo", "pointAttributes"]
+)
+_contourInfoFields = frozenset(["endPoint", "isClosed"])
+
+# The fields the encoders and decoders above handle, per class
+_schemaFields: dict[type, frozenset[str]] = {
+    VariableGlyph: _variableGlyphFields,
+    GlyphAxis: _glyphAxisFields,
+    GlyphSource: _glyphSourceFields,
+    Layer: _layerFields,
+    StaticGlyph: _staticGlyphFields,
+    Path: _pathFields,
+    Contour: _contourFields,
+    PackedPath: _packedPathFields,
+    ContourInfo: _contourInfoFields,
+    Component: _componentFields,
+    DecomposedTransform: _transformationFieldNames,
+    Anchor: _anchorFields,
+    Guideline: _guidelineFields,
+    BackgroundImage: _backgroundImageFields,
+    RGBAColor: _colorFields,
+}
+
+
+def _findSchemaMismatches() -> dict[str, set[str]]:
+    mismatches = {}
+    for cls, fieldNames in _schemaFields.items():
+        classFieldNames = {field.name for field in fields(cls)}
+        if classFieldNames != fieldNames:
+            mismatches[cls.__name__] = classFieldNames ^ fieldNames
+    return mismatches
+
+
+_schemaMismatches = _findSchemaMismatches()
+
+
+def _checkSchema() -> None:
+    if _schemaMismatches:
+        raise UnsupportedGlyphData(f"glyph schema mismatch: {_schemaMismatches}")
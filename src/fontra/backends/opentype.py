@@ -1,6 +1,8 @@
+import asyncio
 import io
+import os
 import uuid
-from copy import copy, deepcopy
+from copy import deepcopy
 from itertools import product
 from os import PathLike
 from typing import Any, Generator
@@ -33,6 +35,7 @@ from ..core.classes import (
 from ..core.instancer import FontSourcesInstancer
 from ..core.path import PackedPath, PackedPathPointPen
 from ..core.protocols import ReadableFontBackend
+from ..core.threading import runBlockingIO
 from ..core.varutils import locationToTuple, unnormalizeLocation, unnormalizeValue
 from .base import ReadableBaseBackend
 from .filewatcher import Change
@@ -59,6 +62,7 @@ class OTFBackend(WatchableBackend, ReadableBaseBackend):
 
     def __init__(self, *, path: PathLike) -> None:
         super().__init__()
+        self._shaperFontDataTask: tuple[tuple, asyncio.Task] | None = None
         self._initializeFromPath(path)
 
     def _initializeFromPath(self, path: PathLike) -> None:
@@ -99,6 +103,7 @@ class OTFBackend(WatchableBackend, ReadableBaseBackend):
         self.variationGlyphSets: dict[str, Any] = {}
 
     async def aclose(self) -> None:
+        await self._cancelShaperFontDataTask()
         self.font.close()
 
     async def getGlyphMap(self) -> dict[str, list[int]]:
@@ -239,7 +244,39 @@ class OTFBackend(WatchableBackend, ReadableBaseBackend):
     async def getCustomData(self) -> dict[str, Any]:
         return {}
 
+    def startOptionalBackgroundTasks(self) -> None:
+        # Build the shaper font in the background, so it's ready by the time
+        # the first client asks for it
+        _ = self._getShaperFontDataTask()
+
     async def getShaperFontData(self) -> ShaperFontData | None:
+        # The stripped font is cached, as building it is expensive. The cache is
+        # keyed by the file's modification time and size, in case the file
+        # changes without the file watcher noticing.
+        return await asyncio.shield(self._getShaperFontDataTask())
+
+    def _getShaperFontDataTask(self) -> asyncio.Task:
+        stat = os.stat(self.path)
+        cacheKey = (stat.st_mtime_ns, stat.st_size)
+        if self._shaperFontDataTask is not None:
+            taskCacheKey, task = self._shaperFontDataTask
+            failed = task.done() and (task.cancelled() or task.exception() is not None)
+            if taskCacheKey == cacheKey and not failed:
+                return task
+        task = asyncio.create_task(runBlockingIO(self._buildShaperFontData))
+        self._shaperFontDataTask = (cacheKey, task)
+        return task
+
+    async def _cancelShaperFontDataTask(self) -> None:
+        if self._shaperFontDataTask is None:
+            return
+        _, task = self._shaperFontDataTask
+        self._shaperFontDataTask = None
+        task.cancel()
+        # The build itself can't be interrupted, but nobody waits for it anymore
+        await asyncio.gather(task, return_exceptions=True)
+
+    def _buildShaperFontData(self) -> ShaperFontData:
         with self._getShaperFont() as font:
             for tableTag in font.keys():
                 if tableTag not in shaperFontTables:
@@ -261,6 +298,7 @@ class OTFBackend(WatchableBackend, ReadableBaseBackend):
         self, changes: set[tuple[Change, str]]
     ) -> dict[str, Any] | None:
         self._initializeFromPath(self.path)
+        await self._cancelShaperFontDataTask()
         return None  # Reload all
 
     def fileWatcherWasInstalled(self) -> None:
@@ -273,11 +311,6 @@ class TTXBackend(OTFBackend):
         font.importXML(path)
         return font
 
-    def _getShaperFont(self):
-        font = copy(self.font)  # shallow copy
-        font.tables = dict(font.tables)  # shallow copy tables dict for table subsetting
-        return font
-
 
 def getLocationsFromVarstore(
     varStore, fvarAxes, varDataIndex: int | None = None
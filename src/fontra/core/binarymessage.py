@@ -0,0 +1,217 @@
+import json
+import struct
+import sys
+from array import array
+from typing import Any, Iterator
+
+# Binary websocket message framing.
+#
+# A binary message is a JSON message in which the number lists of packed paths
+# (the "coordinates" arrays of objects that also have "pointTypes") are moved
+# out of the JSON text, and are stored as typed arrays instead. This avoids the
+# costly float <-> text conversions for large glyphs, and often makes the
+# message smaller.
+#
+# Frame layout (all numbers are little-endian):
+#
+# - uint32: the byte length of the header
+# - header: UTF-8 encoded JSON: {"m": message, "a": arrayInfos}
+# - zero padding, so the array data starts at a multiple of 8
+# - array data: each array starts at a multiple of 8, relative to the start
+#   of the array data
+#
+# In the message, each extracted array is replaced by a placeholder object
+# {BINARY_ARRAY_KEY: arrayIndex}. `arrayInfos` is a list of
+# [arrayType, byteOffset, numItems] lists, where arrayType is one of "i16",
+# "i32" or "f64".
+#
+# A large message, text or binary, can be sent as a series of chunk frames, so
+# that other messages can be sent in between. A chunk frame is a binary frame
+# that starts with CHUNK_MARKER instead of a header length:
+#
+# - uint32: CHUNK_MARKER
+# - uint32: the chunked message ID
+# - uint32: the chunk index
+# - uint32: the chunk count
+# - uint32: MESSAGE_KIND_TEXT or MESSAGE_KIND_BINARY
+# - the chunk: a slice of the UTF-8 encoded JSON text, or of the binary frame
+#
+
+BINARY_ARRAY_KEY = "__fontra-binary-array__"
+
+MIN_BINARY_ARRAY_LENGTH = 8
+
+CHUNK_MARKER = 0xFFFFFFFF
+
+MESSAGE_KIND_TEXT = 0
+MESSAGE_KIND_BINARY = 1
+
+_headerLengthStruct = struct.Struct("<I")
+
+_chunkHeaderStruct = struct.Struct("<IIIII")
+
+_arrayTypeCodes = {"i16": "h", "i32": "i", "f64": "d"}
+
+_needsByteSwap = sys.byteorder != "little"
+
+_numberTypes = {int, float}
+
+
+def encodeBinaryMessage(message: Any) -> bytes | None:
+    """Encode `message` as a binary frame. Return `None` if the message contains
+    no arrays that are worth moving out of the JSON, so the caller can send it
+    as a text frame instead.
+    """
+    arrays: list[tuple[str, array]] = []
+    message = _extractArrays(message, arrays)
+    if not arrays:
+        return None
+
+    arrayInfos = []
+    dataParts = []
+    offset = 0
+    for arrayType, arrayData in arrays:
+        arrayInfos.append([arrayType, offset, len(arrayData)])
+        if _needsByteSwap:
+            arrayData.byteswap()
+        dataBytes = arrayData.tobytes()
+        dataParts.append(dataBytes)
+        padding = _padding(len(dataBytes))
+        if padding:
+            dataParts.append(bytes(padding))
+        offset += len(dataBytes) + padding
+
+    header = json.dumps({"m": message, "a": arrayInfos}, separators=(",", ":")).encode(
+        "utf-8"
+    )
+    headerPadding = bytes(_padding(_headerLengthStruct.size + len(header)))
+
+    return b"".join(
+        [_headerLengthStruct.pack(len(header)), header, headerPadding, *dataParts]
+    )
+
+
+def decodeBinaryMessage(data: bytes) -> Any:
+    (headerLength,) = _headerLengthStruct.unpack_from(data)
+    headerEnd = _headerLengthStruct.size + headerLength
+    header = json.loads(data[_headerLengthStruct.size : headerEnd].decode("utf-8"))
+    dataStart = headerEnd + _padding(headerEnd)
+
+    arrays = []
+    for arrayType, offset, numItems in header["a"]:
+        arrayData = array(_arrayTypeCodes[arrayType])
+        start = dataStart + offset
+        arrayData.frombytes(data[start : start + numItems * arrayData.itemsize])
+        if _needsByteSwap:
+            arrayData.byteswap()
+        arrays.append(arrayData.tolist())
+
+    return _insertArrays(header["m"], arrays)
+
+
+def encodeMessageChunks(
+    data: bytes, messageKind: int, chunkedMessageID: int, chunkSize: int
+) -> Iterator[bytes]:
+    """Split an encoded message into chunk frames of at most `chunkSize` bytes
+    of message data each.
+    """
+    view = memoryview(data)
+    chunkCount = max(1, (len(view) + chunkSize - 1) // chunkSize)
+    chunkedMessageID &= 0xFFFFFFFF
+    for chunkIndex in range(chunkCount):
+        header = _chunkHeaderStruct.pack(
+            CHUNK_MARKER, chunkedMessageID, chunkIndex, chunkCount, messageKind
+        )
+        yield b"".join(
+            [header, view[chunkIndex * chunkSize : (chunkIndex + 1) * chunkSize]]
+        )
+
+
+def isMessageChunk(data: bytes) -> bool:
+    return (
+        len(data) >= _chunkHeaderStruct.size
+        and _headerLengthStruct.unpack_from(data)[0] == CHUNK_MARKER
+    )
+
+
+def decodeMessageChunk(data: bytes) -> tuple[int, int, int, int, bytes]:
+    """Return (chunkedMessageID, chunkIndex, chunkCount, messageKind, chunk)."""
+    _, chunkedMessageID, chunkIndex, chunkCount, messageKind = (
+        _chunkHeaderStruct.unpack_from(data)
+    )
+    return (
+        chunkedMessageID,
+        chunkIndex,
+        chunkCount,
+        messageKind,
+        data[_chunkHeaderStruct.size :],
+    )
+
+
+def _padding(length: int) -> int:
+    return -length % 8
+
+
+def _extractArrays(obj: Any, arrays: list[tuple[str, array]]) -> Any:
+    # The message is not modified: only the containers on the way to an
+    # extracted array are copied. If nothing is extracted, `obj` is returned.
+    if isinstance(obj, dict):
+        replacedItems = {}
+        for key, value in obj.items():
+            if key == "coordinates" and "pointTypes" in obj:
+                typedArray = _toTypedArray(value)
+                if typedArray is not None:
+                    replacedItems[key] = {BINARY_ARRAY_KEY: len(arrays)}
+                    arrays.append(typedArray)
+                    continue
+            newValue = _extractArrays(value, arrays)
+            if newValue is not value:
+                replacedItems[key] = newValue
+        return {**obj, **replacedItems} if replacedItems else obj
+    elif isinstance(obj, (list, tuple)):
+        newList = None
+        for index, item in enumerate(obj):
+            newItem = _extractArrays(item, arrays)
+            if newItem is not item:
+                if newList is None:
+                    newList = list(obj)
+                newList[index] = newItem
+        return newList if newList is not None else obj
+    return obj
+
+
+def _toTypedArray(values: Any) -> tuple[str, array] | None:
+    if not isinstance(values, list) or len(values) < MIN_BINARY_ARRAY_LENGTH:
+        return None
+    if not all(type(value) in _numberTypes for value in values):
+        # For example bools, which would come back as ints
+        return None
+    try:
+        # This fails with a TypeError if any of the values is not an int
+        intArray = array("q", values)
+    except TypeError:
+        pass
+    except OverflowError:
+        return None
+    else:
+        minValue = min(intArray)
+        maxValue = max(intArray)
+        if -0x8000 <= minValue and maxValue < 0x8000:
+            return "i16", array("h", intArray)
+        elif -0x80000000 <= minValue and maxValue < 0x80000000:
+            return "i32", array("i", intArray)
+
+    try:
+        return "f64", array("d", values)
+    except TypeError:
+        return None
+
+
+def _insertArrays(obj: Any, arrays: list[list]) -> Any:
+    if isinstance(obj, dict):
+        if len(obj) == 1 and BINARY_ARRAY_KEY in obj:
+            return arrays[obj[BINARY_ARRAY_KEY]]
+        return {key: _insertArrays(value, arrays) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [_insertArrays(item, arrays) for item in obj]
+    return obj
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+# Change functions that overwrite a single item of their target. When a live
+# change consists solely of such setters, a later live change that sets (at
+# least) the same items makes it obsolete.
+_setterFunctions = {"=", "=xy"}
+
+
+class OutboundChangeQueue:
+    """Queue of external changes to be sent to a single connection.
+
+    Changes are sent by a single drain task, one frame at a time: the next
+    frame is only sent after the previous one has been sent (or, for clients
+    that don't support notifications, after the client has responded to it).
+    While waiting, live changes that are superseded by a newer live change
+    (for example successive `=xy` changes to the same point while dragging)
+    are dropped, and whatever is queued at the next tick is sent as a single
+    combined change. This way a slow client receives fewer, more up-to-date
+    changes, instead of falling further and further behind.
+    """
+
+    def __init__(self, sendChange: Callable[[Any, bool], Awaitable[Any]]):
+        self._sendChange = sendChange
+        self._queue: list[_QueuedChange] = []
+        self._drainTask: asyncio.Task | None = None
+        self.numQueued = 0
+        self.numSent = 0
+        self.numCoalesced = 0
+        self.maxDepth = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, change: Any, isLiveChange: bool) -> None:
+        self.numQueued += 1
+        setterKeys = _getSetterKeys(change) if isLiveChange else None
+        if setterKeys is not None:
+            self._removeSupersededChanges(setterKeys)
+        self._queue.append(_QueuedChange(change, isLiveChange, setterKeys))
+        self.maxDepth = max(self.maxDepth, len(self._queue))
+        if self._drainTask is None:
+            self._drainTask = asyncio.create_task(self._drain())
+            self._drainTask.add_done_callback(self._drainTaskDone)
+
+    def _removeSupersededChanges(self, setterKeys: frozenset) -> None:
+        # Walk back from the end of the queue, for as long as we see pure live
+        # setter changes: these can be reordered relative to each other.
+        # Anything else (a non-live change or a structural change, which could
+        # for example shift point indices) acts as a barrier.
+        index = len(self._queue) - 1
+        while index >= 0:
+            queued = self._queue[index]
+            if queued.setterKeys is None:
+                break
+            if queued.setterKeys <= setterKeys:
+                del self._queue[index]
+                self.numCoalesced += 1
+            index -= 1
+
+    async def _drain(self) -> None:
+        while self._queue:
+            # Yield, so that changes coming in during this tick can be coalesced
+            await asyncio.sleep(0)
+            isLiveChange = self._queue[0].isLiveChange
+            batch = []
+            while self._queue and self._queue[0].isLiveChange == isLiveChange:
+                batch.append(self._queue.pop(0).change)
+            change = batch[0] if len(batch) == 1 else {"c": batch}
+            self.numSent += 1
+            await self._sendChange(change, isLiveChange)
+
+    def _drainTaskDone(self, task: asyncio.Task) -> None:
+        self._drainTask = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "error while sending external changes", exc_info=task.exception()
+            )
+            # The connection is most likely gone, don't bother with the rest
+            self._queue.clear()
+        elif self._queue:
+            # Changes were queued after the drain loop ended
+            self._drainTask = asyncio.create_task(self._drain())
+            self._drainTask.add_done_callback(self._drainTaskDone)
+
+    def close(self) -> None:
+        self._queue.clear()
+        if self._drainTask is not None:
+            self._drainTask.cancel()
+
+    def getStats(self) -> dict[str, int]:
+        return dict(
+            depth=len(self._queue),
+            maxDepth=self.maxDepth,
+            queued=self.numQueued,
+            sent=self.numSent,
+            coalesced=self.numCoalesced,
+        )
+
+
+class _QueuedChange:
+    __slots__ = ["change", "isLiveChange", "setterKeys"]
+
+    def __init__(self, change, isLiveChange, setterKeys):
+        self.change = change
+        self.isLiveChange = isLiveChange
+        self.setterKeys = setterKeys
+
+
+def _getSetterKeys(change, path=()) -> frozenset | None:
+    """Return the set of `(path, function, key)` items that `change` overwrites,
+    or `None` if `change` does anything other than overwriting items.
+    """
+    keys: set = set()
+    if not _collectSetterKeys(change, path, keys):
+        return None
+    return frozenset(keys) if keys else None
+
+
+def _collectSetterKeys(change, path, keys) -> bool:
+    path = path + tuple(change.get("p", ()))
+    functionName = change.get("f")
+    if functionName is not None:
+        if functionName not in _setterFunctions:
+            return False
+        key = change["a"][0]
+        if not isinstance(key, (str, int)):
+            return False
+        keys.add((path, functionName, key))
+    return all(
+        _collectSetterKeys(childChange, path, keys)
+        for childChange in change.get("c", ())
+    )
@@ -1,4 +1,4 @@
-from copy import deepcopy
+from copy import copy, deepcopy
 from typing import (
     Any,
     Callable,
@@ -100,40 +100,152 @@ def applyChange(subject, change):
 
 
 def _applyChange(subject: Any, change: dict[str, Any], *, itemCast=None) -> None:
-    path = change.get("p", [])
+    path = change.get("p")
     functionName = change.get("f")
-    children = change.get("c", [])
-
-    for pathElement in path:
-        itemCast = None
-        if isinstance(subject, (Mapping, Sequence)):
-            subject = subject[pathElement]
-        else:
-            itemCast = getItemCast(subject, pathElement, "subtype")
-            subject = getattr(subject, pathElement)
+    children = change.get("c")
+
+    if path:
+        for pathElement in path:
+            subjectType = type(subject)
+            if _isItemContainerType(subjectType):
+                itemCast = None
+                subject = subject[pathElement]
+            else:
+                itemCast = _getItemCastForType(subjectType, pathElement, "subtype")
+                subject = getattr(subject, pathElement)
 
     if functionName is not None:
         changeFunc: Callable[..., None] = changeFunctions[functionName]
-        args = deepcopy(change.get("a", []))
+        args = _copyArguments(change.get("a", ()))
         if functionName in baseChangeFunctions:
             if itemCast is None and args:
-                itemCast = getItemCast(subject, args[0], "type")
+                itemCast = _getItemCastForType(type(subject), args[0], "type")
             changeFunc(subject, *args, itemCast=itemCast)
         else:
             changeFunc(subject, *args)
 
-    for subChange in children:
-        _applyChange(subject, subChange, itemCast=itemCast)
+    if children:
+        for subChange in children:
+            _applyChange(subject, subChange, itemCast=itemCast)
+
+
+_scalarTypes = frozenset([str, int, float, bool, type(None)])
+
+
+def _copyArguments(args):
+    # Change arguments are applied to the subject, so they must be copied to
+    # prevent the subject and the change from sharing mutable data. Most changes
+    # only have scalar arguments though, for which we can skip the deepcopy.
+    for arg in args:
+        if type(arg) not in _scalarTypes:
+            return deepcopy(args)
+    return args
+
+
+# Applying many small changes is a hot path while editing, so we avoid doing
+# relatively slow isinstance() checks against abstract base classes and schema
+# lookups for every path element, by caching the outcome per type.
+
+_itemContainerTypes: dict[type, bool] = {}
+
+
+def _isItemContainerType(subjectType: type) -> bool:
+    isItemContainer = _itemContainerTypes.get(subjectType)
+    if isItemContainer is None:
+        isItemContainer = issubclass(subjectType, (Mapping, Sequence))
+        _itemContainerTypes[subjectType] = isItemContainer
+    return isItemContainer
+
+
+_itemCasts: dict[tuple[type, str, str], Callable | None] = {}
+
+
+def _getItemCastForType(subjectType: type, attrName, fieldKey: str):
+    classFields = classSchema.get(subjectType)
+    if classFields is None:
+        return None
+    cacheKey = (subjectType, attrName, fieldKey)
+    try:
+        return _itemCasts[cacheKey]
+    except KeyError:
+        pass
+    itemCast = None
+    subtype = classFields[attrName].get(fieldKey)
+    if subtype is not None:
+        itemCast = classCastFuncs.get(subtype)
+    _itemCasts[cacheKey] = itemCast
+    return itemCast
 
 
 def getItemCast(subject, attrName, fieldKey):
-    classFields = classSchema.get(type(subject))
-    if classFields is not None:
-        fieldDef = classFields[attrName]
-        subtype = fieldDef.get(fieldKey)
-        if subtype is not None:
-            return classCastFuncs.get(subtype)
-    return None
+    return _getItemCastForType(type(subject), attrName, fieldKey)
+
+
+def copyChangeTargets(subject: Any, change: dict[str, Any]) -> None:
+    """Replace all objects inside `subject` that would be modified by applying
+    `change` by copies, so `change` can be applied to `subject` without
+    modifying the original objects. `subject` itself is modified in place.
+
+    Containers along the change paths are copied shallowly, so all objects that
+    are not touched by the change are shared between the old and the new
+    version. Only the targets of non-base change functions (such as "=xy" on a
+    path) are copied deeply, as they may modify nested objects.
+    """
+    _copyChangeTargets(subject, change, {id(subject): False})
+
+
+def _copyChangeTargets(
+    subject: Any, change: dict[str, Any], copied: dict[int, bool]
+) -> Any:
+    # `copied` maps the ids of objects that are already copies, made in this
+    # operation, to whether they were copied deeply. All copies can be modified
+    # in place, but the nested objects of shallow copies are still shared with
+    # the original.
+    path = change.get("p")
+    if path:
+        return _copyAlongPath(subject, path, change, copied)
+
+    functionName = change.get("f")
+    children = change.get("c")
+    if functionName is not None and functionName not in baseChangeFunctions:
+        if not copied.get(id(subject)):
+            subject = deepcopy(subject)
+            copied[id(subject)] = True
+    elif functionName is not None or children:
+        subject = _copyOnce(subject, copied)
+
+    if children:
+        for subChange in children:
+            # A child change without a path may replace `subject` by a deep copy
+            subject = _copyChangeTargets(subject, subChange, copied)
+
+    return subject
+
+
+def _copyAlongPath(subject, path, change, copied):
+    pathElement, *path = path
+    subject = _copyOnce(subject, copied)
+    if _isItemContainerType(type(subject)):
+        child = subject[pathElement]
+    else:
+        child = getattr(subject, pathElement)
+    if path:
+        child = _copyAlongPath(child, path, change, copied)
+    else:
+        child = _copyChangeTargets(child, {**change, "p": None}, copied)
+    if _isItemContainerType(type(subject)):
+        subject[pathElement] = child
+    else:
+        setattr(subject, pathElement, child)
+    return subject
+
+
+def _copyOnce(subject, copied):
+    if id(subject) in copied:
+        return subject
+    subject = copy(subject)
+    copied[id(subject)] = False
+    return subject
 
 
 _MISSING = object()
@@ -174,6 +286,144 @@ def matchChangePattern(
     return False
 
 
+class ChangePatternIndex:
+    """An index of the match patterns of many subscribers, to quickly find all
+    subscribers whose pattern matches a change. The result of `match()` is the
+    same as calling `matchChangePattern()` for each subscriber's pattern, but
+    the cost depends on the number of subscribers for the changed paths, rather
+    than on the total number of subscribers.
+
+    Subscriber patterns are updated incrementally with `setPattern()`: only the
+    parts that differ between the old and the new pattern are visited. This
+    relies on `patternUnion()` and `patternDifference()` reusing unchanged
+    sub-patterns.
+    """
+
+    def __init__(self):
+        self._root = _PatternIndexNode()
+        self._patterns: dict[Any, dict] = {}
+
+    def getPattern(self, subscriber) -> dict[str | int, Any]:
+        return self._patterns.get(subscriber, {})
+
+    def setPattern(self, subscriber, pattern: dict[str | int, Any]) -> None:
+        oldPattern = self._patterns.pop(subscriber, {})
+        if pattern:
+            self._patterns[subscriber] = pattern
+        _updatePatternIndex(self._root, oldPattern, pattern, subscriber)
+
+    def removeSubscriber(self, subscriber) -> None:
+        self.setPattern(subscriber, {})
+
+    def match(self, change: dict[str, Any]) -> set:
+        """Return the set of subscribers whose pattern matches `change`."""
+        return _matchPatternIndex(change, self._root, None)
+
+
+class _PatternIndexNode:
+    __slots__ = ["children", "members", "leaves"]
+
+    def __init__(self):
+        self.children: dict[str | int, _PatternIndexNode] = {}
+        # The subscribers whose pattern contains this node
+        self.members: set = set()
+        # The subscribers for whose pattern this node is a leaf node
+        self.leaves: set = set()
+
+
+def _updatePatternIndex(node, oldPattern, newPattern, subscriber):
+    for key in oldPattern.keys() | newPattern.keys():
+        oldValue = oldPattern.get(key, _MISSING)
+        newValue = newPattern.get(key, _MISSING)
+        if oldValue is newValue:
+            continue
+        childNode = node.children.get(key)
+        if childNode is None:
+            childNode = node.children[key] = _PatternIndexNode()
+
+        if newValue is _MISSING:
+            childNode.members.discard(subscriber)
+        else:
+            childNode.members.add(subscriber)
+
+        if newValue is None:
+            childNode.leaves.add(subscriber)
+        else:
+            childNode.leaves.discard(subscriber)
+
+        _updatePatternIndex(
+            childNode,
+            oldValue if isinstance(oldValue, dict) else {},
+            newValue if isinstance(newValue, dict) else {},
+            subscriber,
+        )
+
+        if not childNode.members:
+            del node.children[key]
+
+
+def _matchPatternIndex(change, node, candidates):
+    # This follows the logic of matchChangePattern(), but for all candidate
+    # subscribers at once. Note that for each subscriber, a wildcard is only
+    # used if its pattern doesn't contain the path element itself.
+    # `candidates` is None for all subscribers: the candidates are then the
+    # members of the nodes that are reached, so subscribers that are not
+    # affected by the change are never visited. The member sets of the index
+    # nodes must not be modified here.
+    matched = set()
+    states = [(node, candidates)]
+
+    for pathElement in change.get("p", []):
+        newStates = []
+        for node, candidates in states:
+            childNode = node.children.get(pathElement)
+            wildcardNode = node.children.get(wildcard)
+            if childNode is not None:
+                childCandidates = _intersectCandidates(candidates, childNode.members)
+                if childCandidates:
+                    newStates.append((childNode, childCandidates))
+            if wildcardNode is not None:
+                wildcardCandidates = _intersectCandidates(
+                    candidates, wildcardNode.members
+                )
+                if childNode is not None:
+                    wildcardCandidates = wildcardCandidates - childNode.members
+                if wildcardCandidates:
+                    newStates.append((wildcardNode, wildcardCandidates))
+
+        states = []
+        for node, candidates in newStates:
+            # Leaf node: match
+            matched |= candidates & node.leaves
+            candidates = candidates - node.leaves
+            if candidates:
+                states.append((node, candidates))
+
+        if not states:
+            return matched
+
+    for node, candidates in states:
+        if change.get("f") in baseChangeFunctions:
+            args = change.get("a")
+            if args:
+                childNode = node.children.get(args[0])
+                if childNode is not None:
+                    matched |= _intersectCandidates(candidates, childNode.members)
+
+        for childChange in change.get("c", []):
+            if candidates is not None:
+                candidates = candidates - matched
+                if not candidates:
+                    break
+            matched |= _matchPatternIndex(childChange, node, candidates)
+
+    return matched
+
+
+def _intersectCandidates(candidates, members):
+    return members if candidates is None else candidates & members
+
+
 def filterChangePattern(
     change: dict[str, Any], matchPattern: dict[str | int, Any], inverse: bool = False
 ) -> dict[str, Any] | None:
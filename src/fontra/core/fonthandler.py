@@ -1,33 +1,56 @@
 import asyncio
 import base64
 import functools
+import inspect
 import logging
+import pathlib
 import traceback
 from collections import UserDict, defaultdict
 from contextlib import asynccontextmanager
-from copy import deepcopy
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import cached_property
-from typing import Any, AsyncGenerator, Awaitable, Callable, Optional
+from itertools import groupby
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Iterator,
+    Optional,
+    get_type_hints,
+)
 
+from .changequeue import OutboundChangeQueue
 from .changes import (
+    ChangePatternIndex,
     applyChange,
     collectChangePaths,
+    copyChangeTargets,
     filterChangePattern,
-    matchChangePattern,
     patternDifference,
     patternFromPath,
     patternIntersect,
     patternUnion,
 )
-from .classes import Font, FontInfo, FontSource, ImageData, VariableGlyph
-from .lrucache import LRUCache
+from .classes import (
+    Font,
+    FontInfo,
+    FontSource,
+    ImageData,
+    Kerning,
+    VariableGlyph,
+    structure,
+)
+from .journal import EditJournal
+from .lrucache import LRUCache, approximateSize
 from .protocols import (
     ExportManager,
     MetaInfoProvider,
     ReadableFontBackend,
     WatchableFontBackend,
     WritableFontBackend,
+    WriteGlyphs,
+    WriteKerningPairs,
 )
 
 logger = logging.getLogger(__name__)
@@ -42,6 +65,72 @@ def remoteMethod(method):
     return method
 
 
+@dataclass(kw_only=True)
+class LocalDataCacheLimits:
+    maxGlyphs: int = 2000
+    maxGlyphBytes: int | None = 256 * 1024 * 1024
+    maxFontDataItems: int = 128
+    maxFontDataBytes: int | None = None
+    # Size the cached values even without a byte limit, so the cache statistics
+    # report how much memory is used
+    sizeValues: bool = False
+
+
+class LocalDataCache:
+    """The FontHandler's cache for data loaded from the backend.
+
+    Glyphs (keyed by `("glyphs", glyphName)`) and font-level data such as
+    kerning, features and the glyph map (keyed by a root key string) are kept
+    in separate LRU pools, each with their own item count and byte size limits,
+    so that browsing many glyphs can't evict the font-level data, and vice versa.
+    """
+
+    def __init__(self, limits: LocalDataCacheLimits):
+        # Values are only sized when there is a byte limit to enforce, unless
+        # sizes are asked for
+        sizeFunc = approximateSize if limits.sizeValues else None
+        self.glyphs = LRUCache(
+            limits.maxGlyphs, maxBytes=limits.maxGlyphBytes, sizeFunc=sizeFunc
+        )
+        self.fontData = LRUCache(
+            limits.maxFontDataItems,
+            maxBytes=limits.maxFontDataBytes,
+            sizeFunc=sizeFunc,
+        )
+
+    def _getPool(self, key) -> LRUCache:
+        return self.glyphs if isinstance(key, tuple) else self.fontData
+
+    def get(self, key, default=None):
+        return self._getPool(key).get(key, default)
+
+    def __getitem__(self, key):
+        return self._getPool(key)[key]
+
+    def __setitem__(self, key, value):
+        self._getPool(key)[key] = value
+
+    def __contains__(self, key) -> bool:
+        return key in self._getPool(key)
+
+    def __iter__(self) -> Iterator:
+        yield from list(self.fontData)
+        yield from list(self.glyphs)
+
+    def __len__(self) -> int:
+        return len(self.fontData) + len(self.glyphs)
+
+    def pop(self, key, *args):
+        return self._getPool(key).pop(key, *args)
+
+    def clear(self) -> None:
+        self.glyphs.clear()
+        self.fontData.clear()
+
+    def getStats(self) -> dict[str, dict]:
+        return dict(glyphs=self.glyphs.getStats(), fontData=self.fontData.getStats())
+
+
 @dataclass(kw_only=True)
 class FontHandler:
     backend: ReadableFontBackend
@@ -51,14 +140,42 @@ class FontHandler:
     readOnly: bool = False
     dummyEditor: bool = False  # allow editing in read-only mode, don't write to backend
     allConnectionsClosedCallback: Optional[Callable[[], Awaitable[Any]]] = None
+    cacheLimits: LocalDataCacheLimits = field(default_factory=LocalDataCacheLimits)
+    # If given, edits are recorded in this file before they are acknowledged, and
+    # replayed when the FontHandler starts, if the previous one didn't get to
+    # write them to the backend
+    journalPath: pathlib.Path | None = None
+    journalCheckpointDelay: float = 1.0
 
     def __post_init__(self):
         if self.writableBackend is None:
             self.readOnly = True
+        self._journal = (
+            EditJournal(self.journalPath)
+            if self.journalPath is not None and not self.readOnly
+            else None
+        )
+        self._journalCheckpointHandle: asyncio.TimerHandle | None = None
         self.connections = set()
-        self.clientData = defaultdict(dict)
-        self.localData = LRUCache()
+        self._connectionsByClientUUID = defaultdict(set)
+        self._outboundChangeQueues: dict[Any, OutboundChangeQueue] = {}
+        # Change subscriptions are indexed by client UUID, as a client may have
+        # more than one connection. They are removed when the last connection
+        # of the client closes: a reconnecting client subscribes again.
+        self._subscriptionIndexes = {
+            LIVE_CHANGES_PATTERN_KEY: ChangePatternIndex(),
+            CHANGES_PATTERN_KEY: ChangePatternIndex(),
+        }
+        self.localData = LocalDataCache(self.cacheLimits)
         self._dataScheduledForWriting = {}
+        # kernType -> set of (left, right) pairs, or None if the entire kerning
+        # needs to be written
+        self._kerningPairsScheduledForWriting: dict[str, set] | None = {}
+        # Pending loads from the backend, keyed like localData
+        self._loadTasks: dict[Any, asyncio.Task] = {}
+        self._numLoads = 0
+        self._numSharedLoads = 0
+        self._encodedShaperFontData: tuple[Any, dict] | None = None
         self.glyphMap = {}
 
     @cached_property
@@ -79,13 +196,105 @@ class FontHandler:
         self._writingInProgressEvent = asyncio.Event()
         self._writingInProgressEvent.set()
 
+        if self._journal is not None:
+            await self._replayJournal()
+
     async def aclose(self) -> None:
         await self.backend.aclose()
         if hasattr(self, "_watcherTask"):
             self._watcherTask.cancel()
+        if self._journalCheckpointHandle is not None:
+            self._journalCheckpointHandle.cancel()
         if hasattr(self, "_processWritesTask"):
             await self.finishWriting()  # shield for cancel?
             self._processWritesTask.cancel()
+            if self._journal is not None:
+                await self._flushBackend()
+                await self._journal.clear(self._journal.numEntries)
+
+    async def _replayJournal(self) -> None:
+        assert self._journal is not None
+        entries = await self._journal.read()
+        if not entries:
+            return
+        logger.warning(
+            f"replaying {len(entries)} journaled edits for {self.projectIdentifier}"
+        )
+        for records in entries:
+            for record in records:
+                await self._replayJournalRecord(record)
+        await self._flushBackend()
+        await self._journal.clear(len(entries))
+
+    async def _replayJournalRecord(self, record: list) -> None:
+        backend = self.writableBackend
+        assert backend is not None
+        match record:
+            case ["putGlyph", glyphName, glyph, codePoints]:
+                await backend.putGlyph(
+                    glyphName, structure(glyph, VariableGlyph), codePoints
+                )
+            case ["deleteGlyph", glyphName]:
+                if glyphName in await backend.getGlyphMap():
+                    await backend.deleteGlyph(glyphName)
+            case ["putData", rootKey, value]:
+                await self._putData(rootKey, structure(value, _fontFieldTypes[rootKey]))
+            case ["putKerningPairs", kernType, sourceIdentifiers, pairs] if isinstance(
+                backend, WriteKerningPairs
+            ):
+                pairsToPut = {
+                    (left, right): values
+                    for left, right, values in pairs
+                    if values is not None
+                }
+                pairsToDelete = [
+                    (left, right) for left, right, values in pairs if values is None
+                ]
+                if pairsToPut:
+                    await backend.putKerningPairs(
+                        kernType, sourceIdentifiers, pairsToPut
+                    )
+                if pairsToDelete:
+                    await backend.deleteKerningPairs(kernType, pairsToDelete)
+            case _:
+                raise ValueError(f"invalid journal record: {record!r}")
+
+    def _scheduleJournalCheckpoint(self) -> None:
+        if self._journalCheckpointHandle is None:
+            loop = asyncio.get_running_loop()
+            self._journalCheckpointHandle = loop.call_later(
+                self.journalCheckpointDelay, self._startJournalCheckpoint
+            )
+
+    def _startJournalCheckpoint(self) -> None:
+        self._journalCheckpointHandle = None
+        scheduleTaskAndLogException(self._checkpointJournal())
+
+    async def _checkpointJournal(self) -> None:
+        # The journaled edits can be forgotten once all their writes are done,
+        # including the writes the backend may have postponed
+        assert self._journal is not None
+        numEntries = self._journal.numEntries
+        if self._dataScheduledForWriting or not self._writingInProgressEvent.is_set():
+            self._scheduleJournalCheckpoint()
+            return
+        try:
+            await self._flushBackend()
+        except Exception as e:
+            # The journal is all we have of the edits that were not written
+            logger.error("exception while flushing the backend: %r", e)
+            self._scheduleJournalCheckpoint()
+            return
+        if not await self._journal.clear(numEntries):
+            # Edits came in while we were clearing the journal
+            self._scheduleJournalCheckpoint()
+
+    async def _flushBackend(self) -> None:
+        # Backends may flush synchronously, or asynchronously
+        if hasattr(self.backend, "flush"):
+            result = self.backend.flush()
+            if inspect.isawaitable(result):
+                await result
 
     async def processExternalChanges(self, reloadPattern) -> None:
         if reloadPattern is not None and "glyphMap" in reloadPattern:
@@ -124,40 +333,155 @@ class FontHandler:
                 self._writingInProgressEvent.set()
 
     async def _processWritesOneCycle(self) -> None:
+        while self._dataScheduledForWriting:
+            # Take all pending writes, so that consecutive glyph writes can be
+            # passed to the backend as a single batch
+            pendingWrites = list(self._dataScheduledForWriting.items())
+            self._dataScheduledForWriting.clear()
+            for batchFuncName, writes in groupby(pendingWrites, key=_getBatchFuncName):
+                await self._performWrites(batchFuncName, list(writes))
+                await asyncio.sleep(0)
+
+    async def _performWrites(self, batchFuncName, writes) -> None:
         writeFunc: Callable[
             [], Awaitable[None]
         ]  # inferencing with partial() goes wrong
-        while self._dataScheduledForWriting:
-            writeKey, (writeFunc, connection, reloadPattern) = popFirstItem(
-                self._dataScheduledForWriting
+        if (
+            batchFuncName is None
+            or len(writes) == 1
+            or not isinstance(self.backend, WriteGlyphs)
+        ):
+            for writeKey, (writeFunc, connection, reloadPattern, _) in writes:
+                logger.info(f"write to backend -- {funcName(writeFunc)} {writeKey}")
+                await self._performWrite(writeFunc, [(connection, reloadPattern)])
+            return
+
+        batchArguments = [batchItem[1] for _, (_, _, _, batchItem) in writes]
+        writeFunc = functools.partial(
+            getattr(self.backend, batchFuncName), batchArguments
+        )
+        logger.info(f"write to backend -- {batchFuncName} {len(writes)} glyphs")
+        await self._performWrite(
+            writeFunc,
+            [
+                (connection, reloadPattern)
+                for _, (_, connection, reloadPattern, _) in writes
+            ],
+        )
+
+    async def _performWrite(self, writeFunc, writeSources) -> None:
+        try:
+            await writeFunc()
+        except Exception as e:
+            logger.error("exception while writing data: %r", e)
+            traceback.print_exc()
+            reloadPattern: dict = {}
+            for _, sourceReloadPattern in writeSources:
+                reloadPattern = patternUnion(reloadPattern, sourceReloadPattern)
+            await self.reloadData(reloadPattern)
+            connections = []
+            for connection, _ in writeSources:
+                if connection is not None and connection not in connections:
+                    connections.append(connection)
+            for connection in connections:
+                await self._messageFromServer(
+                    connection,
+                    "The data could not be saved due to an error.",
+                    f"The edit has been reverted.\n\n{e!r}",
+                )
+            if any(connection is None for connection, _ in writeSources):
+                # No connection to inform, let's error
+                raise
+
+    async def _messageFromServer(self, connection, headline, msg) -> None:
+        # A client that doesn't respond in time, or whose connection closes,
+        # must not abort the write we're in: log the failure instead. The call
+        # runs in a task of its own, so that its cancellation can be told apart
+        # from the cancellation of the current task.
+        messageTask = asyncio.ensure_future(
+            connection.proxy.messageFromServer(headline, msg)
+        )
+        try:
+            await asyncio.wait([messageTask])
+        except asyncio.CancelledError:
+            messageTask.cancel()
+            raise
+        if messageTask.cancelled():
+            logger.warning("message to client was cancelled: %r", headline)
+        elif messageTask.exception() is not None:
+            logger.warning(
+                "could not send message to client: %r", messageTask.exception()
             )
-            logger.info(f"write to backend -- {funcName(writeFunc)} {writeKey}")
-            try:
-                await writeFunc()
-            except Exception as e:
-                logger.error("exception while writing data: %r", e)
-                traceback.print_exc()
-                await self.reloadData(reloadPattern)
-                if connection is not None:
-                    await connection.proxy.messageFromServer(
-                        "The data could not be saved due to an error.",
-                        f"The edit has been reverted.\n\n{e!r}",
-                    )
-                else:
-                    # No connection to inform, let's error
-                    raise
-            await asyncio.sleep(0)
 
     @asynccontextmanager
     async def useConnection(self, connection) -> AsyncGenerator[None, None]:
         self.connections.add(connection)
+        self._connectionsByClientUUID[connection.clientUUID].add(connection)
+        self._outboundChangeQueues[connection] = OutboundChangeQueue(
+            connection.proxy.externalChange
+        )
         try:
             yield
         finally:
             self.connections.remove(connection)
+            self._outboundChangeQueues.pop(connection).close()
+            clientConnections = self._connectionsByClientUUID[connection.clientUUID]
+            clientConnections.discard(connection)
+            if not clientConnections:
+                del self._connectionsByClientUUID[connection.clientUUID]
+                for index in self._subscriptionIndexes.values():
+                    index.removeSubscriber(connection.clientUUID)
             if not self.connections and self.allConnectionsClosedCallback is not None:
                 await self.allConnectionsClosedCallback()
 
+    def getCacheStats(self) -> dict[str, dict]:
+        stats = self.localData.getStats()
+        if hasattr(self.backend, "getCacheStats"):
+            # Backends may have caches of their own, with the same statistics
+            stats.update(self.backend.getCacheStats())
+        return stats
+
+    async def warmCache(self, *, loadGlyphs: bool = False) -> None:
+        """Load font-level data, the glyph dependency graph and optionally the
+        glyphs into the cache, before the first connection asks for them.
+
+        Glyphs are loaded one at a time, so at most one I/O thread is busy with
+        warming, and loading stops when the glyph cache is full.
+        """
+        glyphMap = await self.getGlyphMap()
+        for key in ["axes", "sources", "fontInfo", "unitsPerEm"]:
+            await self.getData(key)
+
+        if glyphMap and hasattr(self.backend, "findGlyphsThatUseGlyph"):
+            # The first query builds the dependency graph
+            await self.backend.findGlyphsThatUseGlyph(next(iter(glyphMap)))
+
+        if not loadGlyphs:
+            return
+
+        for glyphName in list(glyphMap):
+            stats = self.localData.glyphs.getStats()
+            if stats["size"] >= stats["maxSize"] or (
+                stats["maxBytes"] is not None and stats["bytes"] >= stats["maxBytes"]
+            ):
+                logger.info(
+                    f"glyph cache full, stopped warming {self.projectIdentifier}"
+                )
+                break
+            if ("glyphs", glyphName) not in self.localData:
+                await self.getGlyph(glyphName)
+
+    def getOutboundQueueStats(self) -> dict[str, int]:
+        queueStats = [queue.getStats() for queue in self._outboundChangeQueues.values()]
+        return dict(
+            connections=len(queueStats),
+            depth=sum(stats["depth"] for stats in queueStats),
+            maxDepth=max((stats["maxDepth"] for stats in queueStats), default=0),
+            queued=sum(stats["queued"] for stats in queueStats),
+            sent=sum(stats["sent"] for stats in queueStats),
+            coalesced=sum(stats["coalesced"] for stats in queueStats),
+        )
+
     @remoteMethod
     async def isReadOnly(self, *, connection=None) -> bool:
         return self.readOnly and not self.dummyEditor
@@ -185,14 +509,23 @@ class FontHandler:
     async def getGlyph(
         self, glyphName: str, *, connection=None
     ) -> VariableGlyph | None:
-        glyph = self.localData.get(("glyphs", glyphName))
+        key = ("glyphs", glyphName)
+        glyph = self.localData.get(key)
         if glyph is None:
-            glyph = await self._getGlyph(glyphName)
-            self.localData[("glyphs", glyphName)] = glyph
+            glyph = await self._load(
+                key, functools.partial(self._getGlyphFromBackend, glyphName)
+            )
         return glyph
 
-    def _getGlyph(self, glyphName) -> Awaitable[VariableGlyph | None]:
-        return asyncio.create_task(self._getGlyphFromBackend(glyphName))
+    @remoteMethod
+    async def getGlyphs(
+        self, glyphNames: list[str], *, connection=None
+    ) -> dict[str, VariableGlyph | None]:
+        # Uncached glyphs are loaded from the backend concurrently
+        glyphs = await asyncio.gather(
+            *(self.getGlyph(glyphName) for glyphName in glyphNames)
+        )
+        return dict(zip(glyphNames, glyphs))
 
     async def _getGlyphFromBackend(self, glyphName) -> VariableGlyph | None:
         return await self.backend.getGlyph(glyphName)
@@ -200,10 +533,59 @@ class FontHandler:
     async def getData(self, key: str, connection=None) -> Any:
         data = self.localData.get(key)
         if data is None:
-            data = await self._getData(key, connection)
-            self.localData[key] = data
+            data = await self._load(
+                key, functools.partial(self._getData, key, connection)
+            )
         return data
 
+    def _load(self, key, loadFunc: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+        # Single-flight loading: if the data for `key` is already being loaded,
+        # share the result with the pending request, so concurrent requests
+        # don't read and parse the same data more than once
+        task = self._loadTasks.get(key)
+        if task is None:
+            self._numLoads += 1
+            task = asyncio.create_task(self._loadAndStore(key, loadFunc))
+            self._loadTasks[key] = task
+            task.add_done_callback(functools.partial(self._loadTaskDone, key))
+        else:
+            self._numSharedLoads += 1
+        # Shield the shared task, so a cancelled request doesn't cancel the
+        # load for other requests
+        return asyncio.shield(task)
+
+    async def _loadAndStore(self, key, loadFunc: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loadFunc()
+        # Don't store the result if the key got invalidated while loading, or if
+        # an edit stored newer data in the meantime
+        if self._loadTasks.get(key) is asyncio.current_task() and (
+            key not in self.localData
+        ):
+            self.localData[key] = value
+        return value
+
+    def _loadTaskDone(self, key, task: asyncio.Task) -> None:
+        if self._loadTasks.get(key) is task:
+            del self._loadTasks[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved: it has been (or will be) raised
+            # to the requests that were waiting for it, if any
+            task.exception()
+
+    def _forgetLoads(self, keys=None) -> None:
+        if keys is None:
+            self._loadTasks.clear()
+        else:
+            for key in keys:
+                self._loadTasks.pop(key, None)
+
+    def getLoadStats(self) -> dict[str, int]:
+        return dict(
+            loads=self._numLoads,
+            shared=self._numSharedLoads,
+            inFlight=len(self._loadTasks),
+        )
+
     async def _getData(self, key: str, connection=None) -> Any:
         value: Any
 
@@ -326,16 +708,18 @@ class FontHandler:
         shaperFontData = await self.backend.getShaperFontData()
         if shaperFontData is None:
             return None
-        return dict(
+        # Backends may cache their shaper font data: if we get the same object
+        # as last time, we can reuse its base64-encoded form
+        if self._encodedShaperFontData is not None:
+            cachedShaperFontData, encoded = self._encodedShaperFontData
+            if cachedShaperFontData is shaperFontData:
+                return encoded
+        encoded = dict(
             type=shaperFontData.glyphOrderSorting,
             data=base64.b64encode(shaperFontData.data).decode("ascii"),
         )
-
-    def _getClientData(self, connection, key, default=None):
-        return self.clientData[connection.clientUUID].get(key, default)
-
-    def _setClientData(self, connection, key, value):
-        self.clientData[connection.clientUUID][key] = value
+        self._encodedShaperFontData = (shaperFontData, encoded)
+        return encoded
 
     @remoteMethod
     async def putBackgroundImage(
@@ -369,8 +753,9 @@ class FontHandler:
 
     def _adjustMatchPattern(self, func, pathOrPattern, wantLiveChanges, connection):
         key = LIVE_CHANGES_PATTERN_KEY if wantLiveChanges else CHANGES_PATTERN_KEY
-        matchPattern = self._getClientData(connection, key, {})
-        self._setClientData(connection, key, func(matchPattern, pathOrPattern))
+        index = self._subscriptionIndexes[key]
+        matchPattern = index.getPattern(connection.clientUUID)
+        index.setPattern(connection.clientUUID, func(matchPattern, pathOrPattern))
 
     @remoteMethod
     async def editIncremental(self, liveChange, *, connection) -> None:
@@ -399,20 +784,21 @@ class FontHandler:
         else:
             matchPatternKeys = [LIVE_CHANGES_PATTERN_KEY, CHANGES_PATTERN_KEY]
 
+        clientUUIDs = set()
+        for key in matchPatternKeys:
+            clientUUIDs |= self._subscriptionIndexes[key].match(change)
+
         connections = [
             connection
-            for connection in self.connections
+            for clientUUID in clientUUIDs
+            for connection in self._connectionsByClientUUID.get(clientUUID, ())
             if connection != sourceConnection
-            and any(
-                matchChangePattern(change, self._getClientData(connection, k, {}))
-                for k in matchPatternKeys
-            )
         ]
 
         for connection in connections:
-            scheduleTaskAndLogException(
-                connection.proxy.externalChange(change, isLiveChange)
-            )
+            queue = self._outboundChangeQueues.get(connection)
+            if queue is not None:
+                queue.put(change, isLiveChange)
 
     async def updateLocalDataWithExternalChange(self, change):
         await self._updateLocalDataAndWriteToBackend(change, None, True)
@@ -441,6 +827,7 @@ class FontHandler:
             rootObject,
             sourceConnection,
             not isExternalChange and not self.readOnly,
+            change,
         )
 
     def _getLocalDataPattern(self):
@@ -464,42 +851,56 @@ class FontHandler:
                     for key, glyphName in collectChangePaths(change, 2)
                     if key == "glyphs"
                 ]
-                glyphSet = {
+                rootObject.glyphs = {
                     glyphName: await self.getGlyph(glyphName)
                     for glyphName in glyphNames
                 }
-                glyphSet = DictSetDelTracker(glyphSet)
-                rootObject.glyphs = glyphSet
             else:
                 setattr(rootObject, rootKey, await self.getData(rootKey))
 
+        # The local data is never modified in place: the objects it contains
+        # may be shared with writes that are scheduled or in progress. Instead,
+        # we copy everything the change will touch, sharing the rest. This makes
+        # each version of the local data an immutable snapshot for the writer.
+        copyChangeTargets(rootObject, change)
+        if "glyphs" in rootKeys:
+            rootObject.glyphs = DictSetDelTracker(rootObject.glyphs)
+
         rootObject._trackAssignedAttributeNames()
         return rootKeys, rootObject
 
     async def _updateLocalData(
-        self, rootKeys, rootObject, sourceConnection, writeToBackEnd
+        self, rootKeys, rootObject, sourceConnection, writeToBackEnd, change=None
     ) -> None:
         writeFunc: Callable[
             [], Awaitable[None]
         ]  # inferencing with partial() goes wrong
+        journalRecords: list[list] = []
         for rootKey in rootKeys + sorted(rootObject._assignedAttributeNames):
             if rootKey == "glyphs":
                 glyphSet = rootObject.glyphs
                 glyphMap = await self.getData("glyphMap")
                 for glyphName in sorted(glyphSet.keys()):
                     writeKey = ("glyphs", glyphName)
-                    if glyphName in glyphSet.newKeys:
-                        self.localData[writeKey] = glyphSet[glyphName]
+                    self.localData[writeKey] = glyphSet[glyphName]
                     if not writeToBackEnd:
                         continue
                     assert self.writableBackend is not None
-                    writeFunc = functools.partial(
-                        self.writableBackend.putGlyph,
+                    putGlyphArguments = (
                         glyphName,
-                        deepcopy(glyphSet[glyphName]),
+                        glyphSet[glyphName],
                         glyphMap.get(glyphName, []),
                     )
-                    await self.scheduleDataWrite(writeKey, writeFunc, sourceConnection)
+                    writeFunc = functools.partial(
+                        self.writableBackend.putGlyph, *putGlyphArguments
+                    )
+                    journalRecords.append(["putGlyph", *putGlyphArguments])
+                    await self.scheduleDataWrite(
+                        writeKey,
+                        writeFunc,
+                        sourceConnection,
+                        batchItem=("putGlyphs", putGlyphArguments),
+                    )
                 for glyphName in sorted(glyphSet.deletedKeys):
                     writeKey = ("glyphs", glyphName)
                     _ = self.localData.pop(writeKey, None)
@@ -509,6 +910,7 @@ class FontHandler:
                     writeFunc = functools.partial(
                         self.writableBackend.deleteGlyph, glyphName
                     )
+                    journalRecords.append(["deleteGlyph", glyphName])
                     # When deleting a glyph goes wrong, the glyphMap should *also* be reloaded
                     reloadPattern = {"glyphMap": None} | _writeKeyToPattern(writeKey)
                     await self.scheduleDataWrite(
@@ -516,28 +918,101 @@ class FontHandler:
                         writeFunc,
                         sourceConnection,
                         reloadPattern=reloadPattern,
+                        batchItem=("deleteGlyphs", glyphName),
                     )
             else:
-                if rootKey in rootObject._assignedAttributeNames:
-                    self.localData[rootKey] = getattr(rootObject, rootKey)
+                previousValue = self.localData.get(rootKey)
+                value = getattr(rootObject, rootKey)
+                self.localData[rootKey] = value
+                if rootKey == "glyphMap":
+                    self.glyphMap = value
                 if not writeToBackEnd:
                     continue
                 assert self.writableBackend is not None
-                writeFunc = functools.partial(
-                    self._putData,
-                    rootKey,
-                    deepcopy(self.localData[rootKey]),
-                    sourceConnection,
-                )
+                changedPairs = None
+                if rootKey == "kerning":
+                    changedPairs = self._collectChangedKerningPairs(
+                        change, previousValue, value
+                    )
+                    self._scheduleKerningPairs(changedPairs)
+                    writeFunc = functools.partial(self._writeKerning, value)
+                else:
+                    writeFunc = functools.partial(
+                        self._putData, rootKey, value, sourceConnection
+                    )
+                if changedPairs is not None:
+                    journalRecords.extend(
+                        _kerningPairsJournalRecords(value, changedPairs)
+                    )
+                elif rootKey != "metaInfo":
+                    journalRecords.append(["putData", rootKey, value])
                 await self.scheduleDataWrite(rootKey, writeFunc, sourceConnection)
 
+        if (
+            journalRecords
+            and self._journal is not None
+            and self._dataScheduledForWriting is not None
+        ):
+            # The edit is acknowledged when we return, so it must be on disk by then
+            await self._journal.append(journalRecords)
+            self._scheduleJournalCheckpoint()
+
+    def _collectChangedKerningPairs(
+        self, change, previousKerning, kerning
+    ) -> dict[str, set[tuple[str, str]]] | None:
+        # Pair-level writes are only possible if the backend supports them
+        if change is None or not isinstance(self.writableBackend, WriteKerningPairs):
+            return None
+        return collectChangedKerningPairs(change, previousKerning, kerning)
+
+    def _scheduleKerningPairs(
+        self, changedPairs: dict[str, set[tuple[str, str]]] | None
+    ) -> None:
+        if self._kerningPairsScheduledForWriting is None:
+            # The entire kerning is already scheduled for writing
+            return
+        if changedPairs is None:
+            self._kerningPairsScheduledForWriting = None
+            return
+        for kernType, pairs in changedPairs.items():
+            self._kerningPairsScheduledForWriting.setdefault(kernType, set()).update(
+                pairs
+            )
+
+    async def _writeKerning(self, kerning: dict[str, Kerning]) -> None:
+        scheduledPairs = self._kerningPairsScheduledForWriting
+        self._kerningPairsScheduledForWriting = {}
+        if scheduledPairs is None:
+            await self._putData("kerning", kerning)
+            return
+
+        backend = self.writableBackend
+        assert isinstance(backend, WriteKerningPairs)
+        for kernType, pairs in scheduledPairs.items():
+            kerningTable = kerning[kernType]
+            pairsToPut = {}
+            pairsToDelete = []
+            for left, right in sorted(pairs):
+                values = kerningTable.values.get(left, {}).get(right)
+                if values is None:
+                    pairsToDelete.append((left, right))
+                else:
+                    pairsToPut[left, right] = values
+            if pairsToPut:
+                await backend.putKerningPairs(
+                    kernType, kerningTable.sourceIdentifiers, pairsToPut
+                )
+            if pairsToDelete:
+                await backend.deleteKerningPairs(kernType, pairsToDelete)
+
     async def scheduleDataWrite(
-        self, writeKey, writeFunc, connection, reloadPattern=None
+        self, writeKey, writeFunc, connection, reloadPattern=None, batchItem=None
     ):
         if self._dataScheduledForWriting is None:
             # The write-"thread" is no longer running
             await self.reloadData(_writeKeyToPattern(writeKey))
-            await connection.proxy.messageFromServer(
+            await self._messageFromServer(
+                connection,
                 "The data could not be saved.",
                 "The edit has been reverted.\n\n"  # no trailing comma
                 "The Fontra server got itself into trouble, please contact an admin.",
@@ -546,7 +1021,14 @@ class FontHandler:
         shouldSignal = not self._dataScheduledForWriting
         if reloadPattern is None:
             reloadPattern = _writeKeyToPattern(writeKey)
-        self._dataScheduledForWriting[writeKey] = (writeFunc, connection, reloadPattern)
+        # batchItem is a (batchFuncName, argument) tuple for writes that can be
+        # batched with similar writes, if the backend supports it
+        self._dataScheduledForWriting[writeKey] = (
+            writeFunc,
+            connection,
+            reloadPattern,
+            batchItem,
+        )
         if shouldSignal:
             self._processWritesEvent.set()  # write: go!
             self._writingInProgressEvent.clear()
@@ -555,16 +1037,20 @@ class FontHandler:
         if reloadPattern is None:
             # A reloadPattern being None means: reload everything
             self.localData.clear()
+            self._forgetLoads()
         else:
-            # Drop local data to ensure it gets reloaded from the backend
+            # Drop local data to ensure it gets reloaded from the backend. Loads
+            # in progress may have read stale data: forget them, too.
             for rootKey, value in reloadPattern.items():
                 if rootKey == "glyphs":
                     if value is None:
                         value = sorted(self.glyphMap)
                     for glyphName in value:
                         self.localData.pop(("glyphs", glyphName), None)
+                        self._forgetLoads([("glyphs", glyphName)])
                 else:
                     self.localData.pop(rootKey, None)
+                    self._forgetLoads([rootKey])
 
         connections = []
         for connection in self.connections:
@@ -585,16 +1071,21 @@ class FontHandler:
             f"clients: {reloadPattern if reloadPattern is not None else 'reload everything'}"
         )
 
-        await asyncio.gather(
+        results = await asyncio.gather(
             *[
                 connection.proxy.reloadData(connReloadPattern)
                 for connection, connReloadPattern in connections
-            ]
+            ],
+            return_exceptions=True,
         )
+        for result in results:
+            # Clients that time out or disconnect must not abort the others
+            if isinstance(result, BaseException):
+                logger.warning("could not send reloadData to client: %r", result)
 
     def _getCombinedSubscribePattern(self, connection):
         patternA, patternB = [
-            self._getClientData(connection, key, {})
+            self._subscriptionIndexes[key].getPattern(connection.clientUUID)
             for key in [LIVE_CHANGES_PATTERN_KEY, CHANGES_PATTERN_KEY]
         ]
         return patternUnion(patternA, patternB)
@@ -605,9 +1096,12 @@ class FontHandler:
             return await self.exportManager.exportAs(self.projectIdentifier, options)
 
 
-def popFirstItem(d):
-    key = next(iter(d))
-    return (key, d.pop(key))
+_fontFieldTypes = get_type_hints(Font)
+
+
+def _getBatchFuncName(scheduledWrite):
+    _, (_, _, _, batchItem) = scheduledWrite
+    return batchItem[0] if batchItem is not None else None
 
 
 _tasks: set[asyncio.Task] = set()
@@ -661,6 +1155,70 @@ class DictSetDelTracker(UserDict):
         self.newKeys.discard(key)
 
 
+def collectChangedKerningPairs(
+    change, kerningBefore, kerningAfter
+) -> dict[str, set[tuple[str, str]]] | None:
+    """Return the kerning pairs that `change` modifies, as a
+    `{kernType: {(left, right), ...}}` dict. Return None if the change also
+    modifies anything other than kerning values, such as groups or source
+    identifiers, or if it replaces entire kerning tables.
+    """
+    changedPairs: dict[str, set[tuple[str, str]]] = defaultdict(set)
+    for targetPath in _iterChangeTargetPaths(change):
+        if targetPath[:1] != ("kerning",):
+            continue
+        if len(targetPath) < 4 or targetPath[2] != "values":
+            return None
+        kernType, left = targetPath[1], targetPath[3]
+        if len(targetPath) >= 5:
+            changedPairs[kernType].add((left, targetPath[4]))
+        else:
+            # An entire "left" dict was replaced or deleted
+            for kerning in [kerningBefore, kerningAfter]:
+                kerningTable = (kerning or {}).get(kernType)
+                if kerningTable is None:
+                    return None
+                changedPairs[kernType].update(
+                    (left, right) for right in kerningTable.values.get(left, {})
+                )
+    return dict(changedPairs)
+
+
+def _kerningPairsJournalRecords(
+    kerning: dict[str, Kerning], changedPairs: dict[str, set[tuple[str, str]]]
+) -> list[list]:
+    records: list[list] = []
+    for kernType, pairs in sorted(changedPairs.items()):
+        kerningTable = kerning[kernType]
+        records.append(
+            [
+                "putKerningPairs",
+                kernType,
+                kerningTable.sourceIdentifiers,
+                [
+                    [left, right, kerningTable.values.get(left, {}).get(right)]
+                    for left, right in sorted(pairs)
+                ],
+            ]
+        )
+    return records
+
+
+def _iterChangeTargetPaths(change, prefix=()):
+    # Yield the paths of the items that are modified by `change`: the change
+    # path, plus the key or index for the base change functions
+    path = prefix + tuple(change.get("p", ()))
+    functionName = change.get("f")
+    if functionName is not None:
+        args = change.get("a", ())
+        if functionName in ("=", "d") and args:
+            yield path + (args[0],)
+        else:
+            yield path
+    for childChange in change.get("c", ()):
+        yield from _iterChangeTargetPaths(childChange, path)
+
+
 def computeGlyphMapChange(glyphMapA, glyphMapB):
     itemsA = sorted(glyphMapA.items())
     itemsB = sorted(glyphMapB.items())
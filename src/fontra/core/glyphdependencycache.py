@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+# Finding the glyph dependencies of a font means parsing every glyph file, which
+# can take a long time for big fonts. The component names found in each glyph
+# file are therefore cached on disk, keyed by the file's name, and validated by
+# its modification time and size, so that next time only glyph files that
+# changed need to be parsed.
+
+CACHE_FORMAT_VERSION = 1
+
+_cacheDir: pathlib.Path | None = (
+    pathlib.Path(os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache")
+    / "fontra"
+    / "glyph-dependencies"
+)
+
+
+def configureGlyphDependencyCache(*, cacheDir: pathlib.Path | None) -> None:
+    """Set the folder in which glyph dependency caches are stored. If `cacheDir`
+    is None, the caches are not stored, and all glyph files get parsed.
+    """
+    global _cacheDir
+    _cacheDir = cacheDir
+
+
+def getGlyphDependencyCachePath(glyphsDir: os.PathLike | str) -> pathlib.Path | None:
+    if _cacheDir is None:
+        return None
+    glyphsDir = pathlib.Path(glyphsDir).resolve()
+    pathHash = hashlib.sha256(os.fspath(glyphsDir).encode("utf-8")).hexdigest()
+    return _cacheDir / f"{glyphsDir.parent.name}-{pathHash[:16]}.json"
+
+
+class GlyphDependencyCache:
+    """The component names per glyph file for a single glyphs folder. The cache
+    is plain data, so it can be passed to and returned from a subprocess.
+    """
+
+    def __init__(self, glyphsDir: os.PathLike | str, cachePath: pathlib.Path | None):
+        self.glyphsDir = pathlib.Path(glyphsDir)
+        self.cachePath = cachePath
+        # fileName -> [mtimeNs, size, glyphName, componentNames]
+        self.entries: dict[str, list] = {}
+        self.numParsed = 0
+        self._dirty = False
+
+    def scan(
+        self,
+        glyphFileNames: dict[str, str],
+        parseComponentNames: Callable[[str, pathlib.Path], set[str] | None],
+    ) -> dict[str, set[str]]:
+        """Return the component names for each glyph in `glyphFileNames` (a
+        glyph name -> file name mapping). Only glyph files that are not in the
+        cache, or that changed, are parsed with `parseComponentNames(glyphName,
+        path)`, which returns None if the file could not be parsed.
+        """
+        cachedEntries = self._read()
+        self.entries = {}
+        componentInfo = {}
+        for glyphName, fileName in glyphFileNames.items():
+            path = self.glyphsDir / fileName
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            fileKey = [stat.st_mtime_ns, stat.st_size, glyphName]
+            entry = cachedEntries.get(fileName)
+            if entry is not None and entry[:3] == fileKey:
+                componentNames = entry[3]
+            else:
+                parsedComponentNames = parseComponentNames(glyphName, path)
+                self.numParsed += 1
+                if parsedComponentNames is None:
+                    continue
+                componentNames = sorted(parsedComponentNames)
+                self._dirty = True
+            self.entries[fileName] = fileKey + [componentNames]
+            if componentNames:
+                componentInfo[glyphName] = set(componentNames)
+        if len(self.entries) != len(cachedEntries):
+            self._dirty = True
+        self.save()
+        return componentInfo
+
+    def glyphWritten(
+        self, glyphName: str, fileName: str, componentNames: set[str]
+    ) -> None:
+        try:
+            stat = (self.glyphsDir / fileName).stat()
+        except FileNotFoundError:
+            self.glyphDeleted(fileName)
+            return
+        self.entries[fileName] = [
+            stat.st_mtime_ns,
+            stat.st_size,
+            glyphName,
+            sorted(componentNames),
+        ]
+        self._dirty = True
+
+    def glyphDeleted(self, fileName: str) -> None:
+        if self.entries.pop(fileName, None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty or self.cachePath is None:
+            return
+        data = dict(
+            version=CACHE_FORMAT_VERSION,
+            glyphsDir=os.fspath(self.glyphsDir),
+            entries=self.entries,
+        )
+        try:
+            self.cachePath.parent.mkdir(parents=True, exist_ok=True)
+            tempPath = self.cachePath.with_name(f".{self.cachePath.name}.tmp")
+            tempPath.write_text(json.dumps(data, separators=(",", ":")), "utf-8")
+            os.replace(tempPath, self.cachePath)
+        except OSError as e:
+            logger.warning(f"can't write glyph dependency cache: {e!r}")
+            return
+        self._dirty = False
+
+    def _read(self) -> dict[str, list]:
+        if self.cachePath is None:
+            return {}
+        try:
+            data = json.loads(self.cachePath.read_text("utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"ignoring unreadable glyph dependency cache: {e!r}")
+            return {}
+        if data.get("version") != CACHE_FORMAT_VERSION:
+            return {}
+        if data.get("glyphsDir") != os.fspath(self.glyphsDir):
+            return {}
+        return data["entries"]
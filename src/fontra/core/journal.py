@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import pathlib
+
+from .classes import unstructure
+from .threading import runBlockingIO
+
+logger = logging.getLogger(__name__)
+
+
+# An edit journal is an append-only file with one JSON line per edit. Each line
+# is a list of write records, describing the *result* of the edit, rather than
+# the change itself:
+#
+#     ["putGlyph", glyphName, glyph, codePoints]
+#     ["deleteGlyph", glyphName]
+#     ["putData", rootKey, value]
+#     ["putKerningPairs", kernType, sourceIdentifiers, [[left, right, values], ...]]
+#
+# Kerning edits that only modify kerning values are journaled as the resulting
+# values of the modified pairs (None for a deleted pair), so that a small edit
+# of a large kerning table doesn't journal the entire table.
+#
+# Writing a record more than once has the same effect as writing it once, so
+# the journal can be replayed without knowing which of its edits already made
+# it to the backend before the server went down.
+
+
+class EditJournal:
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        # The number of entries appended since the journal was last cleared
+        self.numEntries = 0
+        self._lock = asyncio.Lock()
+        # The entries that are waiting for the write in progress to finish,
+        # and the task that writes them
+        self._pendingBatch: tuple[list[list[list]], asyncio.Task] | None = None
+
+    async def read(self) -> list[list]:
+        entries = await runBlockingIO(self._readEntries)
+        self.numEntries = len(entries)
+        return entries
+
+    async def append(self, records: list[list]) -> None:
+        """Append an entry, and return when it is on disk. Entries that are
+        appended while an earlier write is in progress are written together,
+        with a single fsync.
+        """
+        if self._pendingBatch is not None:
+            entries, written = self._pendingBatch
+            entries.append(records)
+        else:
+            entries = [records]
+            written = asyncio.create_task(self._appendBatch(entries))
+            self._pendingBatch = (entries, written)
+        # The batch is written by its own task, so cancelling one caller
+        # doesn't stop the records of the other callers from being written
+        await asyncio.shield(written)
+
+    async def _appendBatch(self, entries: list[list]) -> None:
+        async with self._lock:
+            # No more entries can join this batch once it is being written
+            self._pendingBatch = None
+            # The records are immutable snapshots (see
+            # FontHandler._prepareRootObject) so they can be serialized in
+            # the I/O thread
+            await runBlockingIO(self._appendEntries, entries)
+            self.numEntries += len(entries)
+
+    async def clear(self, numEntries: int) -> bool:
+        """Remove all entries, but only if no entries were appended since the
+        journal had `numEntries` entries. Return True if the journal was cleared.
+        """
+        async with self._lock:
+            if self.numEntries != numEntries:
+                return False
+            if self.numEntries:
+                await runBlockingIO(self._removeFile)
+                self.numEntries = 0
+            return True
+
+    def _readEntries(self) -> list[list]:
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for lineNumber, line in enumerate(lines, 1):
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                if lineNumber == len(lines):
+                    # The write of the last entry got interrupted: that edit was
+                    # never acknowledged
+                    logger.warning(f"ignoring incomplete journal entry in {self.path}")
+                    break
+                raise
+        return entries
+
+    def _appendEntries(self, entries: list[list[list]]) -> None:
+        lines = [
+            json.dumps(
+                [[unstructure(item) for item in record] for record in records],
+                separators=(",", ":"),
+            )
+            for records in entries
+        ]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _removeFile(self) -> None:
+        self.path.unlink(missing_ok=True)
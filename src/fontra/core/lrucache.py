@@ -1,32 +1,147 @@
+import sys
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable
+
+
 class LRUCache(dict):
     """A quick and dirty Least Recently Used cache, which leverages the fact
     that dictionaries keep their insertion order.
+
+    Optionally, the cache can also be bounded by the approximate total size of
+    its values: pass `maxBytes` and a `sizeFunc` that returns the size of a value.
+    Values are sized lazily: replacing the value of an existing key only marks
+    it as unsized, so that a value that is stored again after each edit is sized
+    once, when a new key is inserted or when `totalSize` is needed.
+    Hits, misses and evictions are counted, see `getStats()`.
     """
 
-    def __init__(self, maxSize=128):
+    def __init__(
+        self,
+        maxSize: int = 128,
+        *,
+        maxBytes: int | None = None,
+        sizeFunc: Callable[[Any], int] | None = None,
+    ):
         assert isinstance(maxSize, int)
         assert maxSize > 0
+        assert maxBytes is None or maxBytes > 0
         self._maxSize = maxSize
+        self._maxBytes = maxBytes
+        self._sizeFunc = (
+            sizeFunc
+            if sizeFunc is not None
+            else (approximateSize if maxBytes is not None else None)
+        )
+        self._sizes: dict[Any, int] = {}
+        self._unsizedKeys: set[Any] = set()
+        self._totalSize = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     def get(self, key, default=None):
         # Override so we get our custom __getitem__ behavior
         try:
             value = self[key]
         except KeyError:
+            self.misses += 1
             value = default
+        else:
+            self.hits += 1
         return value
 
     def __getitem__(self, key):
         value = super().__getitem__(key)
-        # Move key/value to the end
-        del self[key]
-        self[key] = value
+        # Move key/value to the end, without recomputing its size
+        super().__delitem__(key)
+        super().__setitem__(key, value)
         return value
 
     def __setitem__(self, key, value):
-        if key in self:
+        isNewKey = key not in self
+        if not isNewKey:
             # Ensure key/value get inserted at the end
             del self[key]
         super().__setitem__(key, value)
-        while len(self) > self._maxSize:
-            del self[next(iter(self))]
+        if self._sizeFunc is not None:
+            self._unsizedKeys.add(key)
+        if isNewKey:
+            self._evict(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._unsizedKeys.discard(key)
+        self._totalSize -= self._sizes.pop(key, 0)
+
+    def pop(self, key, *args):
+        if key not in self:
+            return super().pop(key, *args)
+        value = super().__getitem__(key)
+        del self[key]
+        return value
+
+    def clear(self):
+        super().clear()
+        self._sizes.clear()
+        self._unsizedKeys.clear()
+        self._totalSize = 0
+
+    @property
+    def totalSize(self) -> int:
+        if self._unsizedKeys:
+            assert self._sizeFunc is not None
+            for key in self._unsizedKeys:
+                size = self._sizeFunc(super().__getitem__(key))
+                self._totalSize += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+            self._unsizedKeys.clear()
+        return self._totalSize
+
+    def _evict(self, newKey):
+        while len(self) > self._maxSize or (
+            self._maxBytes is not None
+            and self.totalSize > self._maxBytes
+            and len(self) > 1
+        ):
+            oldestKey = next(iter(self))
+            if oldestKey == newKey:
+                # Never evict the item that was just inserted
+                break
+            del self[oldestKey]
+            self.evictions += 1
+
+    def getStats(self) -> dict[str, int | None]:
+        return dict(
+            size=len(self),
+            maxSize=self._maxSize,
+            bytes=self.totalSize if self._sizeFunc is not None else None,
+            maxBytes=self._maxBytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+
+
+def approximateSize(obj: Any) -> int:
+    """Return the approximate number of bytes used by `obj`, including the
+    objects it refers to. Shared objects are counted once.
+    """
+    seen: set[int] = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif is_dataclass(obj) and not isinstance(obj, type):
+            stack.extend(getattr(obj, f.name, None) for f in fields(obj))
+    return size
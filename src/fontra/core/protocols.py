@@ -129,6 +129,39 @@ class WriteBackgroundImage(Protocol):
     #     pass
 
 
+@runtime_checkable
+class WriteGlyphs(Protocol):
+    # Optional batched glyph write API. The FontHandler passes all pending glyph
+    # writes at once, so the backend can write them concurrently, and update
+    # shared metadata (such as a glyph set's contents) once per batch.
+    async def putGlyphs(
+        self, glyphs: list[tuple[str, VariableGlyph, list[int]]]
+    ) -> None:
+        pass
+
+    async def deleteGlyphs(self, glyphNames: list[str]) -> None:
+        pass
+
+
+@runtime_checkable
+class WriteKerningPairs(Protocol):
+    # Optional pair-level kerning write API, so a small kerning edit doesn't
+    # require the entire kerning table to be written. The values lists are in
+    # the order of `sourceIdentifiers`.
+    async def putKerningPairs(
+        self,
+        kernType: str,
+        sourceIdentifiers: list[str],
+        pairs: dict[tuple[str, str], list[float | None]],
+    ) -> None:
+        pass
+
+    async def deleteKerningPairs(
+        self, kernType: str, pairs: list[tuple[str, str]]
+    ) -> None:
+        pass
+
+
 @runtime_checkable
 class ProjectManagerFactory(Protocol):
     @staticmethod
@@ -1,17 +1,29 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 import traceback
 from typing import Any, AsyncGenerator, Generator
 
 from aiohttp import WSMsgType, web
 
+from .binarymessage import (
+    MESSAGE_KIND_BINARY,
+    MESSAGE_KIND_TEXT,
+    decodeBinaryMessage,
+    encodeBinaryMessage,
+    encodeMessageChunks,
+)
 from .classes import unstructure
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CALL_TIMEOUT = 60
+
+
 class RemoteObjectConnectionException(Exception):
     pass
 
@@ -24,14 +36,24 @@ class RemoteObjectConnection:
         subject: Any,
         verboseErrors: bool,
         authorizationToken: str = "",
+        allowBinaryMessages: bool = True,
+        chunkSize: int = DEFAULT_CHUNK_SIZE,
+        callTimeout: float | None = DEFAULT_CALL_TIMEOUT,
     ):
         self.websocket = websocket
         self.path = path
         self.subject = subject
         self.verboseErrors = verboseErrors
         self.authorizationToken = authorizationToken
+        self.allowBinaryMessages = allowBinaryMessages
+        self.useBinaryMessages = False
+        self.chunkSize = chunkSize
+        self.useChunkedMessages = False
+        self.getNextChunkedMessageID = _genNextServerCallID()
+        self.useNotifications = False
+        self.callTimeout = callTimeout
         self.clientUUID = None
-        self.callReturnFutures: dict[str, asyncio.Future] = {}
+        self.callReturnFutures: dict[int, asyncio.Future] = {}
         self.getNextServerCallID = _genNextServerCallID()
 
     @property
@@ -44,6 +66,15 @@ class RemoteObjectConnection:
         self.clientUUID = messageObj.get("client-uuid")
         if self.clientUUID is None:
             raise RemoteObjectConnectionException("unrecognized message")
+        # The client tells us whether it can decode binary messages, we decide
+        # whether to use them. Incoming messages can be either text or binary.
+        self.useBinaryMessages = self.allowBinaryMessages and bool(
+            messageObj.get("supports-binary-messages")
+        )
+        self.useChunkedMessages = self.chunkSize > 0 and bool(
+            messageObj.get("supports-chunked-messages")
+        )
+        self.useNotifications = bool(messageObj.get("supports-notifications"))
         try:
             await self._handleConnection()
         except Exception as e:
@@ -65,6 +96,11 @@ class RemoteObjectConnection:
             for task in tasks:
                 if not task.done():
                     task.cancel()
+            # Likewise, server -> client calls will never receive a response
+            for fut in self.callReturnFutures.values():
+                if not fut.done():
+                    fut.cancel()
+            self.callReturnFutures.clear()
 
     async def _iterCallTasks(self) -> AsyncGenerator[asyncio.Task, None]:
         async for message in self.websocket:
@@ -73,7 +109,11 @@ class RemoteObjectConnection:
                 # message.json() will fail with a TypeError.
                 # https://github.com/aio-libs/aiohttp/issues/7313#issuecomment-1586150267
                 raise message.data
-            messageObj = message.json()
+            messageObj = (
+                decodeBinaryMessage(message.data)
+                if message.type == WSMsgType.BINARY
+                else message.json()
+            )
 
             if messageObj.get("connection") == "close":
                 logger.info("client requested connection close")
@@ -83,7 +123,11 @@ class RemoteObjectConnection:
                 yield asyncio.create_task(self._performCall(messageObj, self.subject))
             elif "server-call-id" in messageObj:
                 # this is a response to a server -> client call
-                fut = self.callReturnFutures[messageObj["server-call-id"]]
+                fut = self.callReturnFutures.get(messageObj["server-call-id"])
+                if fut is None or fut.done():
+                    # The call timed out or was cancelled, nobody is waiting
+                    # for this response anymore
+                    continue
                 returnValue = messageObj.get("return-value")
                 error = messageObj.get("error")
                 if error is None:
@@ -120,7 +164,32 @@ class RemoteObjectConnection:
         await self.sendMessage(response)
 
     async def sendMessage(self, message):
-        await self.websocket.send_json(message)
+        data = encodeBinaryMessage(message) if self.useBinaryMessages else None
+        if data is not None:
+            messageKind = MESSAGE_KIND_BINARY
+            if not self.useChunkedMessages or len(data) <= self.chunkSize:
+                await self.websocket.send_bytes(data)
+                return
+        else:
+            text = json.dumps(message)
+            if not self.useChunkedMessages or len(text) <= self.chunkSize:
+                await self.websocket.send_str(text)
+                return
+            messageKind = MESSAGE_KIND_TEXT
+            data = text.encode("utf-8")
+        await self._sendChunked(data, messageKind)
+
+    async def _sendChunked(self, data, messageKind):
+        # Send a large message as a series of smaller messages, that the client
+        # will put back together. This allows other messages to be sent in
+        # between the chunks, so that a single large response doesn't block
+        # everything else on this connection.
+        chunkedMessageID = next(self.getNextChunkedMessageID)
+        for chunk in encodeMessageChunks(
+            data, messageKind, chunkedMessageID, self.chunkSize
+        ):
+            await self.websocket.send_bytes(chunk)
+            await asyncio.sleep(0)
 
     async def callMethod(self, methodName, *args):
         serverCallID = next(self.getNextServerCallID)
@@ -131,8 +200,21 @@ class RemoteObjectConnection:
         }
         returnFuture = asyncio.get_running_loop().create_future()
         self.callReturnFutures[serverCallID] = returnFuture
-        await self.sendMessage(message)
-        return await returnFuture
+        try:
+            await self.sendMessage(message)
+            return await asyncio.wait_for(returnFuture, self.callTimeout)
+        finally:
+            self.callReturnFutures.pop(serverCallID, None)
+
+    async def notify(self, methodName, *args):
+        # A one-way server -> client call: the client will not respond, so
+        # there is no return value, and we don't wait for the client.
+        if not self.useNotifications:
+            # Fall back to a regular call for clients that don't support
+            # notifications
+            await self.callMethod(methodName, *args)
+            return
+        await self.sendMessage({"notification": methodName, "arguments": args})
 
 
 class RemoteClientProxy:
@@ -143,10 +225,10 @@ class RemoteClientProxy:
         return await self._connection.callMethod("messageFromServer", headline, message)
 
     async def externalChange(self, change, isLiveChange):
-        return await self._connection.callMethod("externalChange", change, isLiveChange)
+        await self._connection.notify("externalChange", change, isLiveChange)
 
     async def reloadData(self, reloadPattern):
-        return await self._connection.callMethod("reloadData", reloadPattern)
+        await self._connection.notify("reloadData", reloadPattern)
 
 
 def _genNextServerCallID() -> Generator[int, None, None]:
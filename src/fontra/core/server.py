@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import errno
 import json
 import logging
@@ -19,12 +20,18 @@ except ImportError:
 from importlib.metadata import entry_points
 from typing import Any, Optional
 
-from aiohttp import WSCloseCode, web
+from aiohttp import WSCloseCode, hdrs, web
+from aiohttp.helpers import ETAG_ANY
 
 from .protocols import ProjectManager
-from .remote import RemoteObjectConnection, RemoteObjectConnectionException
-from .serverutils import apiFunctions
-from .subprocess import shutdownProcessPool
+from .remote import (
+    DEFAULT_CHUNK_SIZE,
+    RemoteObjectConnection,
+    RemoteObjectConnectionException,
+)
+from .serverutils import apiFunctions, callAPIFunction
+from .staticassets import StaticAssetIndex
+from .subprocess import ProcessPool, shutdownProcessPool
 
 logger = logging.getLogger(__name__)
 
@@ -54,9 +61,19 @@ class FontraServer:
     cookieMaxAge: int = 7 * 24 * 60 * 60
     allowedFileExtensions: frozenset[str] = frozenset(mimeTypes.keys())
     contentRoot: Traversable | None = None
+    websocketCompression: bool = True
+    websocketChunkSize: int = DEFAULT_CHUNK_SIZE
+    apiCallTimeout: float | None = 60
+    apiMaxConcurrentCalls: int = 4
+    cacheStaticAssets: bool = True
 
     def setup(self) -> None:
         self.startupTime = datetime.now(timezone.utc).replace(microsecond=0)
+        self._apiCallSemaphore = asyncio.Semaphore(self.apiMaxConcurrentCalls)
+        # API calls get a process pool of their own, so that timed out calls
+        # can't take up the workers of the shared pool
+        self._apiProcessPool = ProcessPool(self.apiMaxConcurrentCalls)
+        self._staticAssetIndexes: dict[Traversable, StaticAssetIndex] = {}
         self.httpApp = web.Application()
         self.projectManager.setupWebRoutes(self)
         routes = []
@@ -97,6 +114,9 @@ class FontraServer:
 
         self.httpApp.add_routes(routes)
 
+        self._mainContentRoot = contentRoot
+        if self.cacheStaticAssets:
+            self.httpApp.on_startup.append(self.preloadStaticAssets)
         if self.launchWebBrowser:
             self.httpApp.on_startup.append(self.launchWebBrowserCallback)
         self.httpApp.on_shutdown.append(self.closeActiveWebsockets)
@@ -134,6 +154,13 @@ class FontraServer:
 
         asyncio.create_task(_launcher())
 
+    async def preloadStaticAssets(self, httpApp: web.Application) -> None:
+        # Don't hold up startup: until an asset is preloaded, it will be loaded
+        # on demand
+        self._preloadTask = asyncio.create_task(
+            self.getStaticAssetIndex(self._mainContentRoot).preload()
+        )
+
     async def closeActiveWebsockets(self, httpApp: web.Application) -> None:
         for websocket in list(self._activeWebsockets):
             await websocket.close(
@@ -145,6 +172,7 @@ class FontraServer:
 
     async def shutdownProcessPool(self, httpApp: web.Application) -> None:
         shutdownProcessPool()
+        self._apiProcessPool.shutdown()
 
     async def websocketHandler(self, request: web.Request) -> web.WebSocketResponse:
         projectIdentifier = request.query.get("project")
@@ -158,7 +186,11 @@ class FontraServer:
 
         token = await self.projectManager.authorize(request) or ""
 
-        websocket = web.WebSocketResponse(heartbeat=55, max_msg_size=0x2000000)
+        websocket = web.WebSocketResponse(
+            heartbeat=55,
+            max_msg_size=0x2000000,
+            compress=self.websocketCompression,
+        )
         await websocket.prepare(request)
         self._activeWebsockets.add(websocket)
         try:
@@ -180,6 +212,7 @@ class FontraServer:
                 subject,
                 True,
                 authorizationToken=token,
+                chunkSize=self.websocketChunkSize,
             )
             async with subject.useConnection(connection):
                 await connection.handleConnection()
@@ -207,8 +240,32 @@ class FontraServer:
         if not authToken:
             raise web.HTTPUnauthorized()
         projectList = await self.projectManager.getProjectList(authToken)
+
+        # Optional filtering and pagination: ?prefix=...&offset=...&limit=...
+        query = request.query
+        try:
+            offset = int(query.get("offset", 0))
+            limit = int(query["limit"]) if "limit" in query else None
+        except ValueError:
+            raise web.HTTPBadRequest()
+        if offset < 0 or (limit is not None and limit < 0):
+            raise web.HTTPBadRequest()
+        prefix = query.get("prefix")
+        if prefix:
+            projectList = [
+                projectIdentifier
+                for projectIdentifier in projectList
+                if projectIdentifier.startswith(prefix)
+            ]
+        totalCount = len(projectList)
+        projectList = projectList[
+            offset : offset + limit if limit is not None else None
+        ]
+
         return web.Response(
-            text=json.dumps(projectList), content_type="application/json"
+            text=json.dumps(projectList),
+            content_type="application/json",
+            headers={"X-Total-Count": str(totalCount)},
         )
 
     async def serverInfoHandler(self, request: web.Request) -> web.Response:
@@ -240,6 +297,8 @@ class FontraServer:
         extensions = sorted(getattr(self.projectManager, "extensions", ()))
         if extensions:
             serverInfo["Supported file extensions"] = ", ".join(extensions)
+        if hasattr(self.projectManager, "getServerInfo"):
+            serverInfo.update(await self.projectManager.getServerInfo(authToken))
         return web.Response(
             text=json.dumps(serverInfo), content_type="application/json"
         )
@@ -255,7 +314,15 @@ class FontraServer:
             raise web.HTTPNotFound()
         kwargs = await request.json()
         try:
-            returnValue = function(**kwargs)
+            # The API functions may be CPU-intensive (path operations, parsing),
+            # so they run in a worker process, to keep the event loop responsive
+            async with self._apiCallSemaphore:
+                returnValue = await self._apiProcessPool.run(
+                    self.apiCallTimeout, callAPIFunction, functionName, kwargs
+                )
+        except asyncio.TimeoutError:
+            logger.error(f"API call {functionName} timed out")
+            result = {"error": f"{functionName} timed out"}
         except Exception as e:
             traceback.print_exc()
             result = {"error": repr(e)}
@@ -263,6 +330,18 @@ class FontraServer:
             result = {"returnValue": returnValue}
         return web.Response(text=json.dumps(result), content_type="application/json")
 
+    def getStaticAssetIndex(self, contentRoot: Traversable) -> StaticAssetIndex:
+        assetIndex = self._staticAssetIndexes.get(contentRoot)
+        if assetIndex is None:
+            assetIndex = StaticAssetIndex(
+                contentRoot,
+                mimeTypes,
+                self.allowedFileExtensions,
+                cacheContents=self.cacheStaticAssets,
+            )
+            self._staticAssetIndexes[contentRoot] = assetIndex
+        return assetIndex
+
     async def staticContentHandler(
         self, request: web.Request, *, contentRoot: Traversable, pathPrefix: str = ""
     ) -> web.Response:
@@ -270,23 +349,35 @@ class FontraServer:
         if pathPrefix and path.startswith(pathPrefix):
             path = path[len(pathPrefix) :]
 
-        ifModSince = request.if_modified_since
-        if ifModSince is not None and ifModSince >= self.startupTime:
-            raise web.HTTPNotModified()
-
-        resourcePath = joinpath(contentRoot, *path.split("/"))
-
-        try:
-            data = resourcePath.read_bytes()
-        except (FileNotFoundError, IsADirectoryError, ModuleNotFoundError):
+        asset = await self.getStaticAssetIndex(contentRoot).getAsset(path)
+        if asset is None:
             raise web.HTTPNotFound()
 
-        resourceName = resourcePath.name
-        ext = resourceName.rsplit(".", 1)[-1].lower()
-        if ext not in self.allowedFileExtensions:
-            raise web.HTTPNotFound()
-        contentType = mimeTypes.get(resourceName.rsplit(".")[-1], "")
-        response = web.Response(body=data, content_type=contentType)
+        contentEncoding, data, etag = asset.getVariant(
+            request.headers.get(hdrs.ACCEPT_ENCODING, "")
+        )
+        headers = {
+            hdrs.ETAG: f'"{etag}"',
+            hdrs.CACHE_CONTROL: asset.cacheControl,
+        }
+        if asset.encodings:
+            headers[hdrs.VARY] = hdrs.ACCEPT_ENCODING
+
+        ifNoneMatch = request.if_none_match
+        if ifNoneMatch is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            if any(tag.value in (etag, ETAG_ANY) for tag in ifNoneMatch):
+                raise web.HTTPNotModified(headers=headers)
+        else:
+            ifModSince = request.if_modified_since
+            if ifModSince is not None and ifModSince >= self.startupTime:
+                raise web.HTTPNotModified(headers=headers)
+
+        if contentEncoding is not None:
+            headers[hdrs.CONTENT_ENCODING] = contentEncoding
+        response = web.Response(
+            body=data, content_type=asset.contentType, headers=headers
+        )
         response.last_modified = self.startupTime
         return response
 
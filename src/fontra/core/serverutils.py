@@ -12,6 +12,12 @@ def api(func):
     return func
 
 
+def callAPIFunction(functionName, kwargs):
+    # This runs in a worker process, so it takes the function name rather than
+    # the function
+    return apiFunctions[functionName](**kwargs)
+
+
 @api
 def parseClipboard(data):
     return unstructure(clipboard.parseClipboard(data))
@@ -41,3 +47,32 @@ def excludePath(pathA, pathB):
     pathA = structure(pathA, PackedPath)
     pathB = structure(pathB, PackedPath)
     return unstructure(pathops.excludePath(pathA, pathB))
+
+
+# Batch variants, to perform an operation on many paths in a single request
+
+
+@api
+def unionPaths(paths):
+    return [unionPath(path) for path in paths]
+
+
+@api
+def subtractPaths(pathsA, pathsB):
+    return [
+        subtractPath(pathA, pathB) for pathA, pathB in zip(pathsA, pathsB, strict=True)
+    ]
+
+
+@api
+def intersectPaths(pathsA, pathsB):
+    return [
+        intersectPath(pathA, pathB) for pathA, pathB in zip(pathsA, pathsB, strict=True)
+    ]
+
+
+@api
+def excludePaths(pathsA, pathsB):
+    return [
+        excludePath(pathA, pathB) for pathA, pathB in zip(pathsA, pathsB, strict=True)
+    ]
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+
+try:
+    from importlib.resources.abc import Traversable
+except ImportError:
+    # < 3.11
+    from importlib.abc import Traversable  # type: ignore
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+from .threading import runBlockingIO
+
+logger = logging.getLogger(__name__)
+
+
+# Static assets are read (and compressed, if worthwhile) once, in the I/O
+# thread pool, and then served from memory. Each asset gets a strong ETag
+# derived from its contents, so browsers can revalidate cheaply. Files whose
+# name contains a content hash, as produced by the bundler (for example
+# "js/editor.1a2b3c4d.js"), never change, so browsers may cache them forever.
+
+_versionedFileNamePattern = re.compile(r"\.[0-9a-f]{8,}\.[^./]+$")
+
+compressibleExtensions = frozenset(
+    ["css", "csv", "html", "ico", "js", "json", "svg", "txt", "wasm"]
+)
+
+# Don't bother compressing tiny files
+MIN_COMPRESSION_SIZE = 1024
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+@dataclass(kw_only=True)
+class StaticAsset:
+    data: bytes
+    contentType: str
+    etag: str
+    isVersioned: bool = False
+    # Maps content-coding ("br", "gzip") to the compressed data, in order of
+    # preference. Only contains encodings that are smaller than the original.
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def cacheControl(self) -> str:
+        return IMMUTABLE_CACHE_CONTROL if self.isVersioned else REVALIDATE_CACHE_CONTROL
+
+    def getVariant(self, acceptEncoding: str) -> tuple[str | None, bytes, str]:
+        """Return a `(contentEncoding, data, etag)` tuple for the best variant
+        acceptable according to the `Accept-Encoding` header value. The
+        `contentEncoding` is None for the uncompressed variant.
+        """
+        if self.encodings:
+            accepted = parseAcceptEncoding(acceptEncoding)
+            for encoding, data in self.encodings.items():
+                if encoding in accepted:
+                    return encoding, data, f"{self.etag}-{encoding}"
+        return None, self.data, self.etag
+
+    @property
+    def size(self) -> int:
+        return len(self.data) + sum(len(data) for data in self.encodings.values())
+
+
+def parseAcceptEncoding(acceptEncoding: str) -> set[str]:
+    accepted = set()
+    for item in acceptEncoding.split(","):
+        encoding, *params = item.split(";")
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if quality > 0:
+            accepted.add(encoding)
+    if "*" in accepted:
+        accepted.update(["br", "gzip"])
+    return accepted
+
+
+def buildStaticAsset(data: bytes, fileName: str, contentType: str) -> StaticAsset:
+    ext = fileName.rsplit(".", 1)[-1].lower()
+    encodings = {}
+    if ext in compressibleExtensions and len(data) >= MIN_COMPRESSION_SIZE:
+        if brotli is not None:
+            encodings["br"] = brotli.compress(data)
+        encodings["gzip"] = gzip.compress(data, mtime=0)
+        encodings = {
+            encoding: compressed
+            for encoding, compressed in encodings.items()
+            if len(compressed) < len(data)
+        }
+    return StaticAsset(
+        data=data,
+        contentType=contentType,
+        etag=hashlib.sha256(data).hexdigest()[:32],
+        isVersioned=_versionedFileNamePattern.search(fileName) is not None,
+        encodings=encodings,
+    )
+
+
+class StaticAssetIndex:
+    """In-memory index of the static assets below a content root. Assets are
+    loaded on first request, or all at once by `preload()`. If `cacheContents`
+    is False (for example when the bundler is rewriting the files while the
+    server runs), assets are read anew for each request, but still off the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        contentRoot: Traversable,
+        mimeTypes: dict[str, str],
+        allowedFileExtensions: frozenset[str],
+        *,
+        cacheContents: bool = True,
+    ):
+        self.contentRoot = contentRoot
+        self.mimeTypes = mimeTypes
+        self.allowedFileExtensions = allowedFileExtensions
+        self.cacheContents = cacheContents
+        self._assets: dict[str, StaticAsset] = {}
+        self._loadTasks: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    async def getAsset(self, path: str) -> StaticAsset | None:
+        parts = [part for part in path.split("/") if part]
+        if not parts or ".." in parts:
+            return None
+        key = "/".join(parts)
+
+        asset = self._assets.get(key)
+        if asset is not None:
+            return asset
+
+        if not self.cacheContents:
+            return await runBlockingIO(self._loadAsset, parts)
+
+        # Concurrent requests for the same asset share a single load
+        loadTask = self._loadTasks.get(key)
+        if loadTask is None:
+            loadTask = asyncio.create_task(runBlockingIO(self._loadAsset, parts))
+            self._loadTasks[key] = loadTask
+            loadTask.add_done_callback(lambda task: self._loadTasks.pop(key, None))
+
+        asset = await asyncio.shield(loadTask)
+        if asset is not None:
+            # Misses are not cached: the set of requested paths is unbounded
+            self._assets[key] = asset
+        return asset
+
+    async def preload(self) -> None:
+        assets = await runBlockingIO(self._loadAllAssets)
+        for key, asset in assets.items():
+            self._assets.setdefault(key, asset)
+        logger.info(
+            f"loaded {len(assets)} static assets "
+            f"({sum(asset.size for asset in assets.values()):,} bytes)"
+        )
+
+    def _loadAsset(self, parts: list[str]) -> StaticAsset | None:
+        fileName = parts[-1]
+        ext = fileName.rsplit(".", 1)[-1].lower()
+        if ext not in self.allowedFileExtensions:
+            return None
+
+        resourcePath = self.contentRoot
+        for part in parts:
+            resourcePath = resourcePath / part
+
+        try:
+            data = resourcePath.read_bytes()
+        except (FileNotFoundError, IsADirectoryError, ModuleNotFoundError):
+            return None
+
+        contentType = self.mimeTypes.get(fileName.rsplit(".")[-1], "")
+        return buildStaticAsset(data, fileName, contentType)
+
+    def _loadAllAssets(self) -> dict[str, StaticAsset]:
+        assets: dict[str, StaticAsset] = {}
+        if not self.contentRoot.is_dir():
+            logger.warning(f"static content root not found: {self.contentRoot}")
+            return assets
+        for parts in _iterFilePaths(self.contentRoot, ()):
+            asset = self._loadAsset(list(parts))
+            if asset is not None:
+                assets["/".join(parts)] = asset
+        return assets
+
+
+def _iterFilePaths(folder: Traversable, parts: tuple[str, ...]):
+    for child in folder.iterdir():
+        childParts = parts + (child.name,)
+        if child.is_dir():
+            yield from _iterFilePaths(child, childParts)
+        elif child.is_file():
+            yield childParts
@@ -1,6 +1,9 @@
+from __future__ import annotations
+
 import asyncio
 import atexit
 import concurrent.futures
+from dataclasses import dataclass
 
 _processPool = None
 
@@ -24,3 +27,61 @@ def shutdownProcessPool():
 
 
 atexit.register(shutdownProcessPool)
+
+
+class ProcessPool:
+    """A process pool of its own, for calls that may time out. Unlike a thread,
+    a worker process that runs a timed out call can be killed: the pool is then
+    retired, new calls go to a fresh pool, and the processes of the retired pool
+    are killed once its other calls are done.
+    """
+
+    def __init__(self, maxWorkers: int | None = None):
+        self.maxWorkers = maxWorkers
+        self._current: _PoolExecutor | None = None
+        self._retired: set[_PoolExecutor] = set()
+
+    async def run(self, timeout: float | None, func, *args):
+        if self._current is None:
+            self._current = _PoolExecutor(
+                concurrent.futures.ProcessPoolExecutor(self.maxWorkers)
+            )
+        poolExecutor = self._current
+        loop = asyncio.get_running_loop()
+        poolExecutor.numRunning += 1
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(poolExecutor.executor, func, *args), timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # The worker process may still be running the call
+            if self._current is poolExecutor:
+                self._current = None
+                self._retired.add(poolExecutor)
+            raise
+        finally:
+            poolExecutor.numRunning -= 1
+            if poolExecutor in self._retired and not poolExecutor.numRunning:
+                self._retired.discard(poolExecutor)
+                poolExecutor.kill()
+
+    def shutdown(self) -> None:
+        if self._current is not None:
+            self._current.executor.shutdown(wait=False)
+            self._current = None
+        for poolExecutor in self._retired:
+            poolExecutor.kill()
+        self._retired.clear()
+
+
+@dataclass(eq=False)
+class _PoolExecutor:
+    executor: concurrent.futures.ProcessPoolExecutor
+    numRunning: int = 0
+
+    def kill(self) -> None:
+        # ProcessPoolExecutor.kill_workers() only exists as of Python 3.14
+        processes = list((self.executor._processes or {}).values())
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
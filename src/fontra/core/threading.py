@@ -15,6 +15,60 @@ async def runInThread(func, *args):
     return await loop.run_in_executor(_threadPool, func, *args)
 
 
+# Blocking I/O (and the parsing that goes with it) done by backends runs in its
+# own bounded thread pool, so a big read or write doesn't stall the event loop,
+# and with it every other connection. Command line tools that don't serve
+# connections can opt to keep running it inline.
+
+DEFAULT_IO_THREAD_POOL_SIZE = 4
+
+_ioThreadPool = None
+_ioThreadPoolSize = DEFAULT_IO_THREAD_POOL_SIZE
+_runIOInline = False
+
+
+def configureBlockingIO(
+    *, maxWorkers: int | None = None, inline: bool | None = None
+) -> None:
+    """Configure how `runBlockingIO()` runs its functions: `maxWorkers` sets
+    the size of the I/O thread pool, and if `inline` is True, functions are
+    called directly on the calling thread.
+    """
+    global _ioThreadPoolSize, _runIOInline
+
+    if maxWorkers is not None:
+        if maxWorkers < 1:
+            raise ValueError("maxWorkers must be at least 1")
+        if maxWorkers != _ioThreadPoolSize:
+            _shutdownIOThreadPool()
+            _ioThreadPoolSize = maxWorkers
+    if inline is not None:
+        _runIOInline = inline
+
+
+async def runBlockingIO(func, *args):
+    global _ioThreadPool
+
+    if _runIOInline:
+        return func(*args)
+
+    if _ioThreadPool is None:
+        _ioThreadPool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_ioThreadPoolSize, thread_name_prefix="fontra-io"
+        )
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_ioThreadPool, func, *args)
+
+
+def _shutdownIOThreadPool():
+    global _ioThreadPool
+
+    if _ioThreadPool is not None:
+        _ioThreadPool.shutdown(wait=False)
+        _ioThreadPool = None
+
+
 def shutdownThreadPool():
     global _threadPool
 
@@ -22,5 +76,7 @@ def shutdownThreadPool():
         _threadPool.shutdown()
         _threadPool = None
 
+    _shutdownIOThreadPool()
+
 
 atexit.register(shutdownThreadPool)
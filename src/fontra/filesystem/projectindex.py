@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import pathlib
+from bisect import bisect_left, insort
+from os import fspath
+
+from watchfiles import Change
+
+from ..backends.filewatcher import FileWatcher
+from ..core.threading import runBlockingIO
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectIndex:
+    """A sorted list of the projects below a root folder, as "/"-separated paths
+    relative to the root.
+
+    The folder tree is walked only once, in the I/O thread pool. After that, the
+    list is kept up to date by watching the folders that were walked for changes,
+    so that `getProjectList()` doesn't touch the file system. The folders are
+    watched non-recursively: changes inside projects, and in folders deeper
+    than `maxFolderDepth`, are not our concern.
+    """
+
+    def __init__(
+        self,
+        rootPath: pathlib.Path,
+        extensions: set[str],
+        maxFolderDepth: int | None = 3,
+    ):
+        self.rootPath = rootPath
+        self.extensions = extensions
+        self.maxFolderDepth = maxFolderDepth
+        self._projects: list[str] | None = None
+        self._watchedFolders: set[pathlib.Path] = set()
+        self._buildTask: asyncio.Task | None = None
+        self._fileWatcher: FileWatcher | None = None
+
+    async def aclose(self) -> None:
+        if self._fileWatcher is not None:
+            await self._fileWatcher.aclose()
+            self._fileWatcher = None
+
+    async def getProjectList(self) -> list[str]:
+        if self._projects is None:
+            if self._buildTask is None:
+                self._buildTask = asyncio.create_task(self._build())
+            await asyncio.shield(self._buildTask)
+            assert self._projects is not None
+        return self._projects
+
+    async def _build(self) -> None:
+        # Start watching the root folder before walking the tree, so we don't
+        # miss changes at the top level while we walk. Changes to projects that
+        # are already in the list, or that are not (yet) in the list, are
+        # harmless.
+        self._fileWatcher = FileWatcher(self._processChanges, recursive=False)
+        self._fileWatcher.setPaths([self.rootPath])
+        try:
+            projects, folders = await runBlockingIO(
+                self._findProjects, self.rootPath, self.maxFolderDepth
+            )
+        except Exception:
+            # Don't keep the failure: the next request builds the list again
+            await self._fileWatcher.aclose()
+            self._fileWatcher = None
+            self._buildTask = None
+            raise
+        self._projects = projects
+        self._watchFolders(folders)
+        logger.info(f"found {len(self._projects)} projects in {fspath(self.rootPath)}")
+
+    def _findProjects(
+        self, folderPath: pathlib.Path, maxDepth: int | None
+    ) -> tuple[list[str], list[pathlib.Path]]:
+        # Return the projects, and the folders that were searched for projects
+        rootItems = self.rootPath.parts
+        projects = []
+        folders: list[pathlib.Path] = []
+        for projectPath in iterFolder(folderPath, self.extensions, maxDepth, folders):
+            projects.append("/".join(projectPath.parts[len(rootItems) :]))
+        return sorted(projects), folders
+
+    def _watchFolders(self, folders: list[pathlib.Path]) -> None:
+        self._watchedFolders.update(folders)
+        self._updateFileWatcher()
+
+    def _unwatchFolders(self, path: pathlib.Path) -> None:
+        # Stop watching the deleted folder, and all folders below it
+        self._watchedFolders = {
+            folder
+            for folder in self._watchedFolders
+            if folder != path and path not in folder.parents
+        }
+        self._updateFileWatcher()
+
+    def _updateFileWatcher(self) -> None:
+        if self._fileWatcher is not None:
+            self._fileWatcher.setPaths(self._watchedFolders | {self.rootPath})
+
+    async def _processChanges(self, changes: set[tuple[Change, str]]) -> None:
+        if self._projects is None:
+            # Still building, the walk will pick up the changes
+            return
+        for change, path in sorted(changes, key=lambda item: item[1]):
+            try:
+                parts = pathlib.Path(path).relative_to(self.rootPath).parts
+            except ValueError:
+                continue
+            if not parts or any(
+                _hasExtension(part, self.extensions) for part in parts[:-1]
+            ):
+                # A change inside a project is not our concern
+                continue
+            if change == Change.deleted:
+                self._removeProjects(parts)
+                self._unwatchFolders(pathlib.Path(path))
+            elif change == Change.added:
+                await self._addProjects(pathlib.Path(path), parts)
+
+    def _removeProjects(self, parts: tuple[str, ...]) -> None:
+        # Remove the project, or all projects below the deleted folder
+        assert self._projects is not None
+        projectPath = "/".join(parts)
+        index = bisect_left(self._projects, projectPath)
+        while index < len(self._projects):
+            project = self._projects[index]
+            if project != projectPath and not project.startswith(projectPath + "/"):
+                break
+            del self._projects[index]
+            logger.info(f"project removed: {project}")
+
+    async def _addProjects(self, path: pathlib.Path, parts: tuple[str, ...]) -> None:
+        assert self._projects is not None
+        depth = len(parts)
+        maxDepth = self.maxFolderDepth
+        if maxDepth is not None and depth > maxDepth:
+            return
+        if _hasExtension(path.name, self.extensions):
+            newProjects = ["/".join(parts)]
+        elif path.is_dir():
+            # A folder was added (or moved here): find the projects inside it
+            newProjects, newFolders = await runBlockingIO(
+                self._findProjects,
+                path,
+                maxDepth - depth if maxDepth is not None else None,
+            )
+            self._watchFolders(newFolders)
+        else:
+            return
+        for project in newProjects:
+            index = bisect_left(self._projects, project)
+            if index >= len(self._projects) or self._projects[index] != project:
+                insort(self._projects, project)
+                logger.info(f"project added: {project}")
+
+
+def _hasExtension(fileName: str, extensions: set[str]) -> bool:
+    return pathlib.PurePath(fileName).suffix.lower() in extensions
+
+
+def iterFolder(folderPath, extensions, maxDepth=3, searchedFolders=None):
+    # If `searchedFolders` is a list, the folders whose contents were searched
+    # are appended to it
+    if maxDepth is not None and maxDepth <= 0:
+        return
+    try:
+        childPaths = list(folderPath.iterdir())
+    except PermissionError:
+        logger.info(f"Skipping {str(folderPath)!r} (no permission)")
+        return
+    if searchedFolders is not None:
+        searchedFolders.append(folderPath)
+    for childPath in childPaths:
+        if childPath.suffix.lower() in extensions:
+            yield childPath
+        elif childPath.is_dir():
+            yield from iterFolder(
+                childPath,
+                extensions,
+                maxDepth - 1 if maxDepth is not None else None,
+                searchedFolders,
+            )
@@ -1,6 +1,10 @@
 import argparse
+import asyncio
+import fnmatch
+import hashlib
 import logging
 import pathlib
+from dataclasses import dataclass, replace
 from importlib import resources
 from importlib.metadata import entry_points
 from os import PathLike, fspath
@@ -10,8 +14,10 @@ from typing import Any
 from aiohttp import web
 
 from ..backends import getFileSystemBackend
-from ..core.fonthandler import FontHandler
+from ..core.fonthandler import FontHandler, LocalDataCacheLimits
 from ..core.protocols import ExportManager, ProjectManager, ProjectOpenListener
+from ..core.threading import runBlockingIO
+from .projectindex import ProjectIndex
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +40,78 @@ class FileSystemProjectManagerFactory:
         )
         parser.add_argument("--max-folder-depth", type=int, default=3)
         parser.add_argument("--read-only", action="store_true")
+        defaultLimits = LocalDataCacheLimits()
+        parser.add_argument(
+            "--glyph-cache-size",
+            type=int,
+            default=defaultLimits.maxGlyphs,
+            help="The maximum number of glyphs to keep in memory per open project "
+            "(default: %(default)s)",
+        )
+        parser.add_argument(
+            "--glyph-cache-max-mb",
+            type=int,
+            default=_bytesToMegabytes(defaultLimits.maxGlyphBytes),
+            help="The approximate maximum amount of memory in megabytes used for "
+            "cached glyphs per open project, 0 means no limit (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--font-data-cache-max-mb",
+            type=int,
+            default=_bytesToMegabytes(defaultLimits.maxFontDataBytes),
+            help="The approximate maximum amount of memory in megabytes used for "
+            "cached font-level data, such as kerning and features, per open project, "
+            "0 means no limit (default: %(default)s)",
+        )
+        defaultKeepWarmLimits = KeepWarmLimits()
+        parser.add_argument(
+            "--keep-warm-seconds",
+            type=float,
+            default=defaultKeepWarmLimits.idleTimeout,
+            help="How long to keep a project loaded after its last connection "
+            "closed, so reconnects hit a warm cache, 0 means close immediately "
+            "(default: %(default)s)",
+        )
+        parser.add_argument(
+            "--keep-warm-max-projects",
+            type=int,
+            default=defaultKeepWarmLimits.maxIdleHandlers,
+            help="The maximum number of projects without connections to keep "
+            "loaded (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--keep-warm-max-mb",
+            type=int,
+            default=_bytesToMegabytes(defaultKeepWarmLimits.maxCacheBytes),
+            help="Close projects without connections, least recently used first, "
+            "while the caches of all loaded projects together use more than this "
+            "many megabytes, 0 means no limit (default: %(default)s)",
+        )
+
+        parser.add_argument(
+            "--preload",
+            action="append",
+            default=[],
+            metavar="PROJECT",
+            help="A project to open when the server starts, relative to the root "
+            "folder (or a full path, if the root is '-'). May contain glob "
+            "wildcards, and may be given multiple times. Preloaded projects stay "
+            "open when they have no connections.",
+        )
+        parser.add_argument(
+            "--preload-glyphs",
+            action="store_true",
+            help="Also load all glyphs of preloaded projects into the cache, in "
+            "the background",
+        )
+        parser.add_argument(
+            "--journal-dir",
+            type=pathlib.Path,
+            help="A folder for edit journals. Edits are recorded in a journal "
+            "before they are acknowledged, and edits that didn't get written to "
+            "the project, for example because the server crashed, are written "
+            "when the project is opened again.",
+        )
 
     @staticmethod
     def getProjectManager(arguments: SimpleNamespace) -> ProjectManager:
@@ -41,9 +119,40 @@ class FileSystemProjectManagerFactory:
             rootPath=arguments.path,
             maxFolderDepth=arguments.max_folder_depth,
             readOnly=arguments.read_only,
+            cacheLimits=LocalDataCacheLimits(
+                maxGlyphs=arguments.glyph_cache_size,
+                maxGlyphBytes=_megabytesToBytes(arguments.glyph_cache_max_mb),
+                maxFontDataBytes=_megabytesToBytes(arguments.font_data_cache_max_mb),
+            ),
+            keepWarmLimits=KeepWarmLimits(
+                idleTimeout=arguments.keep_warm_seconds,
+                maxIdleHandlers=arguments.keep_warm_max_projects,
+                maxCacheBytes=_megabytesToBytes(arguments.keep_warm_max_mb),
+            ),
+            preloadProjects=arguments.preload,
+            preloadGlyphs=arguments.preload_glyphs,
+            journalDir=arguments.journal_dir,
         )
 
 
+@dataclass(kw_only=True)
+class KeepWarmLimits:
+    # Seconds to keep a FontHandler open after its last connection closed
+    idleTimeout: float = 5 * 60
+    maxIdleHandlers: int = 4
+    # Idle FontHandlers are closed while the caches of all open FontHandlers
+    # together are larger than this
+    maxCacheBytes: int | None = 1024 * 1024 * 1024
+
+
+def _bytesToMegabytes(numBytes: int | None) -> int:
+    return 0 if numBytes is None else numBytes // (1024 * 1024)
+
+
+def _megabytesToBytes(numMegabytes: int) -> int | None:
+    return numMegabytes * 1024 * 1024 if numMegabytes > 0 else None
+
+
 def existingFolderOrFontFile(path):
     if path == "-":
         return None
@@ -62,6 +171,11 @@ class FileSystemProjectManager:
         readOnly: bool = False,
         exportManager: ExportManager | None = None,
         projectOpenListener: ProjectOpenListener | None = None,
+        cacheLimits: LocalDataCacheLimits | None = None,
+        keepWarmLimits: KeepWarmLimits | None = None,
+        preloadProjects: list[str] | None = None,
+        preloadGlyphs: bool = False,
+        journalDir: pathlib.Path | None = None,
     ):
         self.rootPath = rootPath
         self.singleFilePath = None
@@ -73,10 +187,42 @@ class FileSystemProjectManager:
         self.fontHandlers: dict[str, FontHandler] = {}
         self.exportManager = exportManager
         self.projectOpenListener = projectOpenListener
+        self.cacheLimits = (
+            cacheLimits if cacheLimits is not None else LocalDataCacheLimits()
+        )
+        self.keepWarmLimits = (
+            keepWarmLimits if keepWarmLimits is not None else KeepWarmLimits()
+        )
+        if self.keepWarmLimits.maxCacheBytes is not None:
+            # Closing idle FontHandlers by memory use needs the sizes of all
+            # cached values, also in caches without a byte limit of their own
+            self.cacheLimits = replace(self.cacheLimits, sizeValues=True)
+        # FontHandlers without connections, least recently used first, with
+        # the tasks that close them when they've been idle for too long
+        self._idleTimers: dict[str, asyncio.Task] = {}
+        self._openTasks: dict[str, asyncio.Task[FontHandler]] = {}
+        # A FontHandler is only opened after the previous one for the same
+        # project has been closed, as they would share the edit journal
+        self._closeTasks: dict[str, asyncio.Task] = {}
+        self.preloadProjects = preloadProjects if preloadProjects is not None else []
+        self.preloadGlyphs = preloadGlyphs
+        # Preloaded projects are not closed when they become idle
+        self._pinnedProjects: set[str] = set()
+        self._preloadTask: asyncio.Task | None = None
+        self._projectIndex: ProjectIndex | None = None
+        self.journalDir = journalDir
 
     async def aclose(self) -> None:
-        for fontHandler in self.fontHandlers.values():
+        if self._preloadTask is not None:
+            self._preloadTask.cancel()
+        if self._projectIndex is not None:
+            await self._projectIndex.aclose()
+        for idleTimer in self._idleTimers.values():
+            idleTimer.cancel()
+        self._idleTimers.clear()
+        for fontHandler in list(self.fontHandlers.values()):
             await fontHandler.aclose()
+        await asyncio.gather(*self._closeTasks.values(), return_exceptions=True)
 
     async def authorize(self, request: web.Request) -> str:
         return "yes"  # arbitrary non-false string token
@@ -94,34 +240,148 @@ class FileSystemProjectManager:
     ) -> FontHandler:
         fontHandler = self.fontHandlers.get(projectIdentifier)
         if fontHandler is None:
-            projectPath = self._getProjectPath(projectIdentifier)
-            if projectPath is None:
-                raise FileNotFoundError(projectPath)
-            backend = getFileSystemBackend(projectPath)
-
-            async def closeFontHandler():
-                logger.info(f"closing FontHandler for '{projectIdentifier}'")
-                del self.fontHandlers[projectIdentifier]
-                assert fontHandler is not None
-                await fontHandler.aclose()
-                if self.projectOpenListener is not None:
-                    self.projectOpenListener.projectClosed(projectIdentifier)
-
-            logger.info(f"new FontHandler for '{projectIdentifier}'")
-            fontHandler = FontHandler(
-                backend=backend,
-                projectIdentifier=fspath(projectPath),
-                metaInfoProvider=self,
-                exportManager=self.exportManager,
-                readOnly=self.readOnly or readOnly,
-                allConnectionsClosedCallback=closeFontHandler,
-            )
-            await fontHandler.startTasks()
-            self.fontHandlers[projectIdentifier] = fontHandler
-            if self.projectOpenListener is not None:
-                self.projectOpenListener.projectOpened(projectIdentifier)
+            # Concurrent requests for the same project share a single open
+            openTask = self._openTasks.get(projectIdentifier)
+            if openTask is None:
+                openTask = asyncio.create_task(
+                    self._openFontHandler(projectIdentifier, readOnly)
+                )
+                self._openTasks[projectIdentifier] = openTask
+                openTask.add_done_callback(
+                    lambda task: self._openTasks.pop(projectIdentifier, None)
+                )
+            fontHandler = await asyncio.shield(openTask)
+        else:
+            idleTimer = self._idleTimers.pop(projectIdentifier, None)
+            if idleTimer is not None:
+                logger.info(f"reusing idle FontHandler for '{projectIdentifier}'")
+                idleTimer.cancel()
+        return fontHandler
+
+    async def _openFontHandler(
+        self, projectIdentifier: str, readOnly: bool
+    ) -> FontHandler:
+        projectPath = self._getProjectPath(projectIdentifier)
+        if projectPath is None:
+            raise FileNotFoundError(projectPath)
+        closeTask = self._closeTasks.get(projectIdentifier)
+        if closeTask is not None:
+            await asyncio.wait([closeTask])
+        # Opening a backend can involve reading and parsing many files
+        backend = await runBlockingIO(getFileSystemBackend, projectPath)
+
+        async def allConnectionsClosed():
+            await self._fontHandlerBecameIdle(projectIdentifier)
+
+        logger.info(f"new FontHandler for '{projectIdentifier}'")
+        fontHandler = FontHandler(
+            backend=backend,
+            projectIdentifier=fspath(projectPath),
+            metaInfoProvider=self,
+            exportManager=self.exportManager,
+            readOnly=self.readOnly or readOnly,
+            allConnectionsClosedCallback=allConnectionsClosed,
+            cacheLimits=self.cacheLimits,
+            journalPath=self._getJournalPath(projectPath),
+        )
+        await fontHandler.startTasks()
+        self.fontHandlers[projectIdentifier] = fontHandler
+        if self.projectOpenListener is not None:
+            self.projectOpenListener.projectOpened(projectIdentifier)
+        await self._closeIdleFontHandlers()
         return fontHandler
 
+    async def _startPreloading(self, httpApp: web.Application) -> None:
+        # Don't hold up the server startup
+        self._preloadTask = asyncio.create_task(self.preload())
+
+    async def preload(self) -> None:
+        for projectIdentifier in await self._matchProjects(self.preloadProjects):
+            logger.info(f"preloading '{projectIdentifier}'")
+            self._pinnedProjects.add(projectIdentifier)
+            try:
+                fontHandler = await self.getRemoteSubject(projectIdentifier, "")
+                await fontHandler.warmCache(loadGlyphs=self.preloadGlyphs)
+            except Exception as e:
+                logger.error(f"error while preloading '{projectIdentifier}': {e!r}")
+        logger.info("done preloading")
+
+    async def _matchProjects(self, patterns: list[str]) -> list[str]:
+        projectList = await self.getProjectList("")
+        projectIdentifiers = []
+        for pattern in patterns:
+            matches = fnmatch.filter(projectList, pattern)
+            if not matches and self._getProjectPath(pattern) is not None:
+                matches = [pattern]
+            if not matches:
+                logger.warning(f"no projects found to preload for '{pattern}'")
+            for projectIdentifier in matches:
+                if projectIdentifier not in projectIdentifiers:
+                    projectIdentifiers.append(projectIdentifier)
+        return projectIdentifiers
+
+    async def _fontHandlerBecameIdle(self, projectIdentifier: str) -> None:
+        if projectIdentifier in self._pinnedProjects:
+            return
+        idleTimeout = self.keepWarmLimits.idleTimeout
+        if idleTimeout <= 0:
+            await self._closeFontHandler(projectIdentifier)
+            return
+
+        async def closeWhenExpired():
+            await asyncio.sleep(idleTimeout)
+            del self._idleTimers[projectIdentifier]
+            await self._closeFontHandler(projectIdentifier)
+
+        assert projectIdentifier not in self._idleTimers
+        self._idleTimers[projectIdentifier] = asyncio.create_task(closeWhenExpired())
+        await self._closeIdleFontHandlers()
+
+    async def _closeIdleFontHandlers(self) -> None:
+        # Close idle FontHandlers, least recently used first, while there are
+        # too many of them, or while all FontHandlers together use too much
+        # memory for their caches
+        limits = self.keepWarmLimits
+        while self._idleTimers:
+            if len(self._idleTimers) <= limits.maxIdleHandlers and (
+                limits.maxCacheBytes is None
+                or self._getTotalCacheBytes() <= limits.maxCacheBytes
+            ):
+                break
+            projectIdentifier = next(iter(self._idleTimers))
+            self._idleTimers.pop(projectIdentifier).cancel()
+            await self._closeFontHandler(projectIdentifier)
+
+    def _getTotalCacheBytes(self) -> int:
+        return sum(
+            poolStats["bytes"] or 0
+            for fontHandler in self.fontHandlers.values()
+            for poolStats in fontHandler.getCacheStats().values()
+        )
+
+    async def _closeFontHandler(self, projectIdentifier: str) -> None:
+        logger.info(f"closing FontHandler for '{projectIdentifier}'")
+        fontHandler = self.fontHandlers.pop(projectIdentifier)
+        closeTask = asyncio.create_task(fontHandler.aclose())
+        self._closeTasks[projectIdentifier] = closeTask
+        closeTask.add_done_callback(
+            lambda task: self._closeTaskDone(projectIdentifier, task)
+        )
+        await asyncio.shield(closeTask)
+        if self.projectOpenListener is not None:
+            self.projectOpenListener.projectClosed(projectIdentifier)
+
+    def _closeTaskDone(self, projectIdentifier: str, task: asyncio.Task) -> None:
+        if self._closeTasks.get(projectIdentifier) is task:
+            del self._closeTasks[projectIdentifier]
+
+    def _getJournalPath(self, projectPath: PathLike) -> pathlib.Path | None:
+        if self.journalDir is None:
+            return None
+        projectPath = pathlib.Path(projectPath)
+        pathHash = hashlib.sha256(fspath(projectPath).encode("utf-8")).hexdigest()
+        return self.journalDir / f"{projectPath.name}-{pathHash[:16]}.journal"
+
     def _getProjectPath(self, path: str) -> PathLike | None:
         if self.rootPath is None:
             projectPath = pathlib.Path(path)
@@ -137,22 +397,40 @@ class FileSystemProjectManager:
     async def getProjectList(self, token: str) -> list[str]:
         if self.rootPath is None:
             return []
-        projectPaths = []
-        rootItems = self.rootPath.parts
         if self.singleFilePath is not None:
-            paths = [self.singleFilePath]
-        else:
-            paths = sorted(
-                _iterFolder(self.rootPath, fileExtensions, self.maxFolderDepth)
+            return [self.singleFilePath.name]
+        if self._projectIndex is None:
+            self._projectIndex = ProjectIndex(
+                self.rootPath, fileExtensions, self.maxFolderDepth
             )
-        for projectPath in paths:
-            projectItems = projectPath.parts
-            assert projectItems[: len(rootItems)] == rootItems
-            projectPaths.append("/".join(projectItems[len(rootItems) :]))
-        return projectPaths
+        return await self._projectIndex.getProjectList()
 
     def setupWebRoutes(self, server):
-        pass
+        if self.preloadProjects:
+            server.httpApp.on_startup.append(self._startPreloading)
+
+    async def getServerInfo(self, token: str) -> dict[str, str]:
+        serverInfo = {}
+        if self._idleTimers:
+            serverInfo["Idle projects kept warm"] = ", ".join(self._idleTimers)
+        for projectIdentifier, fontHandler in sorted(self.fontHandlers.items()):
+            stats = fontHandler.getCacheStats()
+            serverInfo[f"Cache statistics for {projectIdentifier}"] = "; ".join(
+                f"{poolName}: {formatCacheStats(poolStats)}"
+                for poolName, poolStats in stats.items()
+            )
+            queueStats = fontHandler.getOutboundQueueStats()
+            serverInfo[f"Outbound change queues for {projectIdentifier}"] = (
+                f"{queueStats['connections']} connections, "
+                f"{queueStats['depth']} queued (max {queueStats['maxDepth']}), "
+                f"{queueStats['sent']} sent, {queueStats['coalesced']} coalesced"
+            )
+            loadStats = fontHandler.getLoadStats()
+            serverInfo[f"Backend loads for {projectIdentifier}"] = (
+                f"{loadStats['loads']} loads, {loadStats['shared']} duplicates "
+                f"saved, {loadStats['inFlight']} in flight"
+            )
+        return serverInfo
 
     async def getMetaInfo(
         self, projectIdentifier: str, authorizationToken: str
@@ -168,18 +446,14 @@ class FileSystemProjectManager:
         pass
 
 
-def _iterFolder(folderPath, extensions, maxDepth=3):
-    if maxDepth is not None and maxDepth <= 0:
-        return
-    try:
-        for childPath in folderPath.iterdir():
-            if childPath.suffix.lower() in extensions:
-                yield childPath
-            elif childPath.is_dir():
-                yield from _iterFolder(
-                    childPath,
-                    extensions,
-                    maxDepth - 1 if maxDepth is not None else None,
-                )
-    except PermissionError:
-        logger.info(f"Skipping {str(folderPath)!r} (no permission)")
+def formatCacheStats(stats: dict) -> str:
+    items = f"{stats['size']}/{stats['maxSize']} items"
+    if stats["bytes"] is not None:
+        megabytes = f"{stats['bytes'] / (1024 * 1024):.1f}"
+        if stats["maxBytes"] is not None:
+            megabytes += f"/{stats['maxBytes'] / (1024 * 1024):.0f}"
+        items += f", {megabytes} MB"
+    return (
+        f"{items}, {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['evictions']} evictions"
+    )
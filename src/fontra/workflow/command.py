@@ -8,6 +8,7 @@ from contextlib import AsyncExitStack
 
 import yaml
 
+from ..core.threading import configureBlockingIO
 from .workflow import Workflow
 
 if hasattr(logging, "getLevelNamesMapping"):
@@ -150,6 +151,9 @@ async def mainAsync() -> None:
 
 
 def main():
+    # There are no connections to keep responsive, so there's no need to move
+    # blocking I/O off the event loop
+    configureBlockingIO(inline=True)
     asyncio.run(mainAsync())
 
 
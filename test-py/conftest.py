@@ -1,5 +1,7 @@
 import pytest
 
+from fontra.core.glyphdependencycache import configureGlyphDependencyCache
+
 
 def pytest_addoption(parser):
     parser.addoption("--write-expected-data", action="store_true", default=False)
@@ -8,3 +10,11 @@ def pytest_addoption(parser):
 @pytest.fixture(scope="session")
 def writeExpectedData(pytestconfig):
     return pytestconfig.getoption("write_expected_data")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def glyphDependencyCacheDir(tmp_path_factory):
+    # Don't write glyph dependency caches to the user's cache folder
+    cacheDir = tmp_path_factory.mktemp("glyph-dependency-cache")
+    configureGlyphDependencyCache(cacheDir=cacheDir)
+    return cacheDir
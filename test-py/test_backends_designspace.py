@@ -1,3 +1,5 @@
+import asyncio
+import os
 import pathlib
 import shutil
 import uuid
@@ -848,6 +850,78 @@ async def test_deleteGlyph_addGlyph(writableTestFont):
         assert beforeGlyphOrder == afterGlyphOrder
 
 
+async def test_putGlyph_usesLayerLock(writableTestFont):
+    glyph = await writableTestFont.getGlyph("A")
+    layerGlyph = glyph.layers[writableTestFont.defaultUFOLayer.fontraLayerName].glyph
+    layerGlyph.xAdvance += 10
+    ufoLayer = writableTestFont.defaultUFOLayer
+
+    with ufoLayer.lock:
+        # The write happens in an I/O thread, which waits for the layer lock
+        task = asyncio.create_task(writableTestFont.putGlyph("A", glyph, [ord("A")]))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+    await task
+
+    reopenedFont = DesignspaceBackend.fromPath(writableTestFont.dsDoc.path)
+    assert glyph == await reopenedFont.getGlyph("A")
+
+
+async def test_putGlyphs_deleteGlyphs(writableTestFont, monkeypatch):
+    numContentsWrites = 0
+    originalUpdateGlyphSetContents = writableTestFont.updateGlyphSetContents
+
+    async def updateGlyphSetContents(ufoLayer):
+        nonlocal numContentsWrites
+        if not writableTestFont._glyphBatchDepth:
+            numContentsWrites += 1
+        await originalUpdateGlyphSetContents(ufoLayer)
+
+    monkeypatch.setattr(
+        writableTestFont, "updateGlyphSetContents", updateGlyphSetContents
+    )
+
+    beforeGlyphOrders = [
+        dsSource.layer.reader.readLib().get("public.glyphOrder")
+        for dsSource in writableTestFont.dsSources
+    ]
+
+    glyphMap = await writableTestFont.getGlyphMap()
+    glyphNames = ["A", "B", "C"]
+    glyphs = [await writableTestFont.getGlyph(glyphName) for glyphName in glyphNames]
+
+    await writableTestFont.deleteGlyphs(glyphNames)
+    for glyphName in glyphNames:
+        assert await writableTestFont.getGlyph(glyphName) is None
+        for ufoLayer in writableTestFont.ufoLayers:
+            assert glyphName not in ufoLayer.glyphSetReader.contents
+            lib = ufoLayer.reader.readLib()
+            assert glyphName not in lib.get("public.glyphOrder", [])
+    numDeleteContentsWrites = numContentsWrites
+    # Once per glyph set, not once per glyph
+    assert numDeleteContentsWrites <= len(writableTestFont.ufoLayers)
+
+    await writableTestFont.putGlyphs(
+        [
+            (glyphName, glyph, glyphMap[glyphName])
+            for glyphName, glyph in zip(glyphNames, glyphs)
+        ]
+    )
+    assert numContentsWrites - numDeleteContentsWrites <= len(
+        writableTestFont.ufoLayers
+    )
+
+    reopenedFont = DesignspaceBackend.fromPath(writableTestFont.dsDoc.path)
+    for glyphName, glyph in zip(glyphNames, glyphs):
+        assert glyph == await reopenedFont.getGlyph(glyphName)
+
+    afterGlyphOrders = [
+        dsSource.layer.reader.readLib().get("public.glyphOrder")
+        for dsSource in writableTestFont.dsSources
+    ]
+    assert beforeGlyphOrders == afterGlyphOrders
+
+
 async def test_deleteUnknownGlyph(writableTestFont):
     glyphName = "A.doesnotexist"
     glyphMap = await writableTestFont.getGlyphMap()
@@ -877,6 +951,83 @@ async def test_findGlyphsThatUseGlyph(writableTestFont):
         ] == await writableTestFont.findGlyphsThatUseGlyph("A")
 
 
+async def test_findGlyphsThatUseGlyph_cached(writableTestFont):
+    async with aclosing(writableTestFont):
+        await writableTestFont.findGlyphsThatUseGlyph("A")
+        glyph = await writableTestFont.getGlyph("Aacute")
+        await writableTestFont.putGlyph("B", glyph, [ord("B")])
+        await writableTestFont.deleteGlyph("Adieresis")
+
+    reopenedFont = DesignspaceBackend.fromPath(writableTestFont.dsDoc.path)
+    async with aclosing(reopenedFont):
+        assert [
+            "Aacute",
+            "B",
+            "varcotest1",
+        ] == await reopenedFont.findGlyphsThatUseGlyph("A")
+        assert reopenedFont._glyphDependencyCache.numParsed == 0
+
+    # Only glyph files that changed since are parsed
+    ufoLayer = reopenedFont.defaultUFOLayer
+    glifPath = pathlib.Path(ufoLayer.path) / "glyphs" / "B_.glif"
+    glifPath.write_text(
+        glifPath.read_text(encoding="utf-8").replace('base="A"', 'base="E"'),
+        encoding="utf-8",
+    )
+    reopenedFont = DesignspaceBackend.fromPath(writableTestFont.dsDoc.path)
+    async with aclosing(reopenedFont):
+        assert ["B"] == await reopenedFont.findGlyphsThatUseGlyph("E")
+        assert reopenedFont._glyphDependencyCache.numParsed == 1
+
+
+async def test_getGlyph_parsedGlyphCache(writableTestFont):
+    fontPath = writableTestFont.dsDoc.path
+    async with aclosing(writableTestFont):
+        glyph = await writableTestFont.getGlyph("A")
+        numLayers = len(glyph.layers)
+        stats = writableTestFont.getCacheStats()["parsedGlyphs"]
+        assert (stats["size"], stats["hits"], stats["misses"]) == (
+            numLayers,
+            0,
+            numLayers,
+        )
+
+        # The cache hands out copies
+        defaultLayerName = writableTestFont.defaultUFOLayer.fontraLayerName
+        glyph.layers[defaultLayerName].glyph.path.coordinates[0] += 100
+        glyph.customData["test"] = 1
+        cachedGlyph = await writableTestFont.getGlyph("A")
+        stats = writableTestFont.getCacheStats()["parsedGlyphs"]
+        assert (stats["hits"], stats["misses"]) == (numLayers, numLayers)
+        referenceFont = DesignspaceBackend.fromPath(fontPath)
+        assert cachedGlyph == await referenceFont.getGlyph("A")
+
+        # Writing the glyph invalidates its cache entries
+        cachedGlyph.layers[defaultLayerName].glyph.xAdvance = 1234
+        await writableTestFont.putGlyph("A", cachedGlyph, [ord("A"), ord("a")])
+        assert await writableTestFont.getGlyph("A") == cachedGlyph
+        stats = writableTestFont.getCacheStats()["parsedGlyphs"]
+        assert (stats["hits"], stats["misses"]) == (numLayers, 2 * numLayers)
+
+        # A .glif file changed by someone else is noticed by its modification time
+        glifPath = (
+            pathlib.Path(writableTestFont.defaultUFOLayer.path) / "glyphs" / "A_.glif"
+        )
+        glifPath.write_text(
+            glifPath.read_text(encoding="utf-8").replace('"1234"', '"1000"'),
+            encoding="utf-8",
+        )
+        modTime = glifPath.stat().st_mtime_ns + 1_000_000_000
+        os.utime(glifPath, ns=(modTime, modTime))
+        glyph = await writableTestFont.getGlyph("A")
+        assert glyph.layers[defaultLayerName].glyph.xAdvance == 1000
+        stats = writableTestFont.getCacheStats()["parsedGlyphs"]
+        assert (stats["hits"], stats["misses"]) == (
+            2 * numLayers - 1,
+            2 * numLayers + 1,
+        )
+
+
 getSourcesTestData = [
     {
         "location": {"italic": 0.0, "weight": 150.0, "width": 0.0},
@@ -1342,6 +1493,34 @@ async def test_kerning_read_write(writableTestFont):
     assert "<key>public.kern2.A</key>" in someKerningData
 
 
+async def test_kerning_pairs_write(writableTestFont):
+    kerning = await writableTestFont.getKerning()
+    sourceIdentifiers = kerning["kern"].sourceIdentifiers
+    assert kerning["kern"].values["T"]["@A"] == [-75, None, -215, -150, None]
+
+    await writableTestFont.putKerningPairs(
+        "kern",
+        sourceIdentifiers,
+        {
+            ("A", "J"): [None, -25, -30, -15, None],
+            ("T", "@A"): [-70, None, None, -150, 5],
+        },
+    )
+    await writableTestFont.deleteKerningPairs("kern", [("@A", "T")])
+
+    reopenedFont = getFileSystemBackend(writableTestFont.path)
+    reopenedKerning = await reopenedFont.getKerning()
+    assert reopenedKerning["kern"].values["A"]["J"] == [None, -25, -30, -15, None]
+    assert reopenedKerning["kern"].values["T"]["@A"] == [-70, None, None, -150, 5]
+    assert "T" not in reopenedKerning["kern"].values.get("@A", {})
+    assert reopenedKerning["kern"].groupsSide1 == kerning["kern"].groupsSide1
+
+    del kerning["kern"].values["@A"]["T"]
+    kerning["kern"].values["A"]["J"] = [None, -25, -30, -15, None]
+    kerning["kern"].values["T"]["@A"] = [-70, None, None, -150, 5]
+    assert kerning == reopenedKerning
+
+
 async def test_roundtrip_single_UFO(testFontSingleUFO, tmpdir):
     tmpdir = pathlib.Path(tmpdir)
     outPath = tmpdir / "roundtripped.ufo"
@@ -1445,7 +1624,8 @@ async def test_write_italicAngle(writableTestFont):
     assert reopenedSources["light-condensed"].italicAngle == -15
 
 
-async def test_rtl_kerning(writableRTLTestFont):
+@pytest.mark.parametrize("usePairs", [False, True])
+async def test_rtl_kerning(writableRTLTestFont, usePairs):
     ufoPath = writableRTLTestFont.dsDoc.sources[0].path
     reader = UFOReaderWriter(ufoPath)
     ufoGroups = reader.readGroups()
@@ -1463,7 +1643,17 @@ async def test_rtl_kerning(writableRTLTestFont):
     _modifyUFOPairs(ufoKerning, ltrPairs, -10, False)
     _modifyUFOPairs(ufoKerning, rtlPairs, -20, True)
 
-    await writableRTLTestFont.putKerning(allFontraKerning)
+    if usePairs:
+        await writableRTLTestFont.putKerningPairs(
+            "kern",
+            fontraKerning.sourceIdentifiers,
+            {
+                (left, right): fontraKerning.values[left][right]
+                for left, right in ltrPairs + rtlPairs
+            },
+        )
+    else:
+        await writableRTLTestFont.putKerning(allFontraKerning)
 
     ufoGroupsAfter = reader.readGroups()
     ufoKerningAfter = reader.readKerning()
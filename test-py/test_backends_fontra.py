@@ -1,24 +1,46 @@
 import asyncio
+import dataclasses
+import json
 import pathlib
 import shutil
 from contextlib import aclosing
 from copy import deepcopy
 
 import pytest
+from fontTools.misc.transform import DecomposedTransform
 
-from fontra.backends import getFileSystemBackend, newFileSystemBackend
+from fontra.backends import getFileSystemBackend, glyphjson, newFileSystemBackend
 from fontra.backends.copy import copyFont
-from fontra.backends.fontra import longestCommonPrefix
+from fontra.backends.fontra import (
+    deserializeGlyph,
+    longestCommonPrefix,
+    serialize,
+    serializeGlyph,
+)
+from fontra.backends.glyphjson import UnsupportedGlyphData, decodeGlyph, encodeGlyph
 from fontra.core.classes import (
+    Anchor,
+    BackgroundImage,
+    Component,
     ConditionalSubstitutions,
+    GlyphAxis,
+    GlyphSource,
+    Guideline,
     ImageType,
     Kerning,
+    Layer,
     OpenTypeFeatures,
+    RGBAColor,
+    StaticGlyph,
     SubstitutionCondition,
     SubstitutionConditionSet,
     SubstitutionRule,
+    VariableGlyph,
+    structure,
+    unstructure,
 )
 from fontra.core.fonthandler import FontHandler
+from fontra.core.path import Contour, PackedPath, Path
 from fontra.filesystem.projectmanager import FileSystemProjectManager
 
 dataDir = pathlib.Path(__file__).resolve().parent / "data"
@@ -179,6 +201,33 @@ async def test_findGlyphsThatUseGlyph(writableFontraFont):
         ] == await writableFontraFont.findGlyphsThatUseGlyph("A")
 
 
+async def test_findGlyphsThatUseGlyph_cached(writableFontraFont):
+    async with aclosing(writableFontraFont):
+        await writableFontraFont.findGlyphsThatUseGlyph("A")
+        glyph = await writableFontraFont.getGlyph("Aacute")
+        await writableFontraFont.putGlyph("B", glyph, [ord("B")])
+        await writableFontraFont.deleteGlyph("Adieresis")
+
+    reopenedFont = getFileSystemBackend(writableFontraFont.path)
+    async with aclosing(reopenedFont):
+        assert [
+            "Aacute",
+            "B",
+            "varcotest1",
+        ] == await reopenedFont.findGlyphsThatUseGlyph("A")
+        assert reopenedFont._glyphDependencyCache.numParsed == 0
+
+    # Only glyph files that changed since are parsed
+    glyphPath = writableFontraFont.getGlyphFilePath("B")
+    glyphPath.write_text(
+        glyphPath.read_text(encoding="utf-8").replace('"A"', '"E"'), encoding="utf-8"
+    )
+    reopenedFont = getFileSystemBackend(writableFontraFont.path)
+    async with aclosing(reopenedFont):
+        assert ["B"] == await reopenedFont.findGlyphsThatUseGlyph("E")
+        assert reopenedFont._glyphDependencyCache.numParsed == 1
+
+
 async def test_getBackgroundImage(testFontraFont):
     glyph = await testFontraFont.getGlyph("C")
     bgImage = None
@@ -262,6 +311,29 @@ async def test_kerningEdgeCases(
         assert not kerningPath.exists()
 
 
+async def test_kerningPairs(writableFontraFont):
+    async with aclosing(writableFontraFont):
+        kerning = await writableFontraFont.getKerning()
+        kerningTable = kerning["kern"]
+        (left, rightDict), *_ = kerningTable.values.items()
+        right = next(iter(rightDict))
+        newValues = [-1] * len(kerningTable.sourceIdentifiers)
+
+        await writableFontraFont.putKerningPairs(
+            "kern", kerningTable.sourceIdentifiers, {("X", "Y"): newValues}
+        )
+        await writableFontraFont.deleteKerningPairs("kern", [(left, right)])
+
+    reopenedFont = getFileSystemBackend(writableFontraFont.path)
+    reopenedKerning = await reopenedFont.getKerning()
+
+    kerningTable.values["X"] = {"Y": newValues}
+    del kerningTable.values[left][right]
+    if not kerningTable.values[left]:
+        del kerningTable.values[left]
+    assert kerning == reopenedKerning
+
+
 async def test_externalChanges(writableFontraFont):
     listenerFont = getFileSystemBackend(writableFontraFont.path)
     listenerHandler = FontHandler(
@@ -338,6 +410,39 @@ async def test_putGlyphInfos(writableFontraFont):
     assert glyphInfos == newGlyphsInfos
 
 
+async def test_writeGlyphInfo_incremental(writableFontraFont):
+    glyphMap = await writableFontraFont.getGlyphMap()
+    glyph = await writableFontraFont.getGlyph("A")
+    expectedGlyphMap = dict(glyphMap, A=[0x61], **{"A.alt": []})
+    del expectedGlyphMap["B"]
+
+    async with aclosing(writableFontraFont):
+        await writableFontraFont.putGlyph("A", glyph, [0x41])
+        writableFontraFont.flush()
+        assert set(writableFontraFont._glyphInfoRows) == set(glyphMap)
+
+        # Only the rows of changed glyphs get formatted again
+        await writableFontraFont.putGlyph("A", glyph, [0x61])
+        await writableFontraFont.putGlyph("A.alt", glyph, [])
+        await writableFontraFont.deleteGlyph("B")
+        assert set(writableFontraFont._glyphInfoRows) == set(glyphMap) - {"A", "B"}
+        await writableFontraFont.putGlyphInfos({"C": {"category": "Letter"}})
+        assert writableFontraFont._glyphInfoRows == {}  # the columns changed
+        writableFontraFont.flush()
+        await writableFontraFont.putGlyphInfos({"C": {"category": "Mark"}})
+        assert set(writableFontraFont._glyphInfoRows) == set(expectedGlyphMap) - {"C"}
+
+    glyphInfoData = writableFontraFont.glyphInfoPath.read_bytes()
+    reopenedFont = getFileSystemBackend(writableFontraFont.path)
+    assert await reopenedFont.getGlyphMap() == expectedGlyphMap
+    assert await reopenedFont.getGlyphInfos() == {"C": {"category": "Mark"}}
+
+    # A full rewrite gives the same result
+    assert reopenedFont._glyphInfoRows == {}
+    reopenedFont._writeGlyphInfo()
+    assert reopenedFont.glyphInfoPath.read_bytes() == glyphInfoData
+
+
 expectedConditionalSubstitutions = ConditionalSubstitutions(
     featureTags=["rclt"],
     rules=[
@@ -387,3 +492,149 @@ async def test_readWriteConditionalSubstitutions(writableFontraFont):
     reopenedFont = getFileSystemBackend(writableFontraFont.path)
     reopenedSubstitutions = await reopenedFont.getConditionalSubstitutions()
     assert reopenedSubstitutions == modfiedExpected
+
+
+def serializeGlyphGeneric(glyph, glyphName=None):
+    jsonGlyph = unstructure(glyph.convertToPaths())
+    if glyphName is not None:
+        jsonGlyph["name"] = glyphName
+    return serialize(jsonGlyph) + "\n"
+
+
+def deserializeGlyphGeneric(jsonSource):
+    return structure(json.loads(jsonSource), VariableGlyph).convertToPackedPaths()
+
+
+def test_serializeGlyph_roundTrip():
+    glyphPaths = sorted(commonFontsDir.glob("*.fontra/glyphs/*.json"))
+    assert len(glyphPaths) > 50
+    for glyphPath in glyphPaths:
+        jsonSource = glyphPath.read_text(encoding="utf-8")
+        glyph = decodeGlyph(json.loads(jsonSource))
+        assert glyph == deserializeGlyphGeneric(jsonSource), glyphPath.name
+        assert deserializeGlyph(jsonSource) == glyph
+        assert encodeGlyph(glyph) + "\n" == serializeGlyphGeneric(glyph)
+        assert serializeGlyph(glyph, "x") == serializeGlyphGeneric(glyph, "x")
+
+
+serializeGlyphTestData = [
+    VariableGlyph(name="empty"),
+    VariableGlyph(
+        name="a",
+        axes=[
+            GlyphAxis(name="b", minValue=0.0, defaultValue=0.5, maxValue=1.0),
+            GlyphAxis(
+                name="a",
+                minValue=-1,
+                defaultValue=0,
+                maxValue=1,
+                customData={"z": 1.0, "a": [{"y": 2.0, "x": (1, 2.5)}]},
+            ),
+        ],
+        sources=[
+            GlyphSource(
+                name="b",
+                layerName="b",
+                location={"z": 1.0, "a": 0.25},
+                locationBase="base",
+                inactive=True,
+                customData={"é": "ü"},
+            ),
+            GlyphSource(name="a", layerName="a"),
+        ],
+        layers={
+            "b": Layer(
+                glyph=StaticGlyph(
+                    path=PackedPath.fromUnpackedContours(
+                        [
+                            dict(
+                                points=[
+                                    dict(x=0.0, y=1.5, attrs={"b": 1.0, "a": None}),
+                                    dict(x=10, y=-20.0, type="quad"),
+                                    dict(x=10.25, y=20, type="cubic"),
+                                    dict(x=1e20, y=-0.0, smooth=True),
+                                ],
+                                isClosed=True,
+                            ),
+                            dict(points=[], isClosed=False),
+                        ]
+                    ),
+                    components=[
+                        Component(
+                            name="c",
+                            transformation=DecomposedTransform(
+                                translateX=10.0, scaleY=1.0, skewX=2.5
+                            ),
+                            location={"z": 2.0, "a": 1.5},
+                        ),
+                        Component(name="d", customData={"b": True, "a": None}),
+                    ],
+                    xAdvance=500.0,
+                    yAdvance=float("nan"),
+                    verticalOrigin=float("inf"),
+                    anchors=[Anchor(name=None, x=1.0, y=2.5)],
+                    guidelines=[Guideline(), Guideline(name="g", x=1.0, locked=True)],
+                    backgroundImage=BackgroundImage(
+                        identifier="image",
+                        transformation=DecomposedTransform(rotation=90.0),
+                        opacity=0.5,
+                        color=RGBAColor(red=1.0, green=0.5, blue=0),
+                    ),
+                ),
+                customData={"layer": 1.0},
+            ),
+            "a": Layer(
+                glyph=StaticGlyph(
+                    path=Path(
+                        contours=[Contour(points=[{"x": 1.0, "y": 2, "smooth": True}])]
+                    )
+                )
+            ),
+        },
+        customData={"b": {"d": 1.0, "c": [True, "x"]}, "a": 0.5},
+    ),
+]
+
+
+@pytest.mark.parametrize("glyph", serializeGlyphTestData)
+def test_serializeGlyph(glyph):
+    jsonSource = encodeGlyph(glyph) + "\n"
+    assert jsonSource == serializeGlyphGeneric(glyph)
+    # Compare the serialized glyphs, as NaN != NaN
+    decodedGlyph = decodeGlyph(json.loads(jsonSource))
+    expectedGlyph = deserializeGlyphGeneric(jsonSource)
+    assert serializeGlyph(decodedGlyph) == serializeGlyphGeneric(expectedGlyph)
+
+
+def test_serializeGlyph_unsupported():
+    glyph = VariableGlyph(name="a", customData={"a": {1: "x"}})
+    with pytest.raises(UnsupportedGlyphData):
+        encodeGlyph(glyph)
+    jsonSource = serializeGlyph(glyph)
+    assert jsonSource == serializeGlyphGeneric(glyph)
+
+    jsonSource = jsonSource.replace('"name"', '"unknownField": 1,\n"name"')
+    with pytest.raises(UnsupportedGlyphData):
+        decodeGlyph(json.loads(jsonSource))
+    assert deserializeGlyph(jsonSource) == deserializeGlyphGeneric(jsonSource)
+
+
+@pytest.mark.parametrize(
+    "cls, fieldNames",
+    list(glyphjson._schemaFields.items()),
+    ids=lambda value: value.__name__ if isinstance(value, type) else "",
+)
+def test_glyphJSONSchemaFields(cls, fieldNames):
+    # When this fails, a class gained or lost a field: the glyph encoders and
+    # decoders in glyphjson.py must be updated
+    assert {field.name for field in dataclasses.fields(cls)} == fieldNames
+
+
+def test_serializeGlyph_schemaMismatch(monkeypatch):
+    glyph = VariableGlyph(name="a")
+    monkeypatch.setattr(glyphjson, "_schemaMismatches", {"VariableGlyph": {"x"}})
+    with pytest.raises(UnsupportedGlyphData):
+        encodeGlyph(glyph)
+    jsonSource = serializeGlyph(glyph)
+    assert jsonSource == serializeGlyphGeneric(glyph)
+    assert deserializeGlyph(jsonSource) == glyph
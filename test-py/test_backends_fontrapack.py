@@ -0,0 +1,180 @@
+import pathlib
+import sqlite3
+from contextlib import aclosing
+
+import pytest
+
+from fontra.backends import getFileSystemBackend
+from fontra.backends.copy import copyFont
+from fontra.backends.fontrapack import FontraPackBackend, FontraPackFormatError
+from fontra.core.classes import ImageData, ImageType
+
+commonFontsDir = pathlib.Path(__file__).parent.parent / "test-common" / "fonts"
+
+
+@pytest.fixture
+def testFontraFont():
+    return getFileSystemBackend(commonFontsDir / "MutatorSans.fontra")
+
+
+@pytest.fixture
+async def writableFontraPackFont(tmpdir, testFontraFont):
+    path = tmpdir / "MutatorSans.fontrapack"
+    packFont = FontraPackBackend.createFromPath(path)
+    async with aclosing(packFont):
+        await copyFont(testFontraFont, packFont)
+    return FontraPackBackend.fromPath(path)
+
+
+async def test_copy_to_fontrapack(testFontraFont, writableFontraPackFont):
+    packFont = writableFontraPackFont
+    async with aclosing(packFont):
+        glyphMap = await testFontraFont.getGlyphMap()
+        assert glyphMap == await packFont.getGlyphMap()
+        for glyphName in glyphMap:
+            assert await testFontraFont.getGlyph(glyphName) == await packFont.getGlyph(
+                glyphName
+            )
+
+        for getterName in [
+            "getUnitsPerEm",
+            "getFontInfo",
+            "getAxes",
+            "getSources",
+            "getKerning",
+            "getFeatures",
+            "getCustomData",
+            "getGlyphInfos",
+            "getConditionalSubstitutions",
+        ]:
+            assert (
+                await getattr(testFontraFont, getterName)()
+                == await getattr(packFont, getterName)()
+            ), getterName
+
+
+async def test_putGlyph_deleteGlyph(writableFontraPackFont):
+    packFont = writableFontraPackFont
+    async with aclosing(packFont):
+        assert [
+            "Aacute",
+            "Adieresis",
+            "varcotest1",
+        ] == await packFont.findGlyphsThatUseGlyph("A")
+
+        glyph = await packFont.getGlyph("Aacute")
+        await packFont.putGlyph("B", glyph, [ord("B"), ord("b")])
+        await packFont.deleteGlyph("Adieresis")
+        # Unwritten changes are visible right away
+        assert (await packFont.getGlyph("B")).layers == glyph.layers
+        assert await packFont.getGlyph("Adieresis") is None
+        assert [
+            "Aacute",
+            "B",
+            "varcotest1",
+        ] == await packFont.findGlyphsThatUseGlyph("A")
+
+    reopenedFont = FontraPackBackend.fromPath(packFont.path)
+    async with aclosing(reopenedFont):
+        glyphMap = await reopenedFont.getGlyphMap()
+        assert glyphMap["B"] == [ord("B"), ord("b")]
+        assert "Adieresis" not in glyphMap
+        assert (await reopenedFont.getGlyph("B")).layers == glyph.layers
+        assert await reopenedFont.getGlyph("Adieresis") is None
+        assert [
+            "Aacute",
+            "B",
+            "varcotest1",
+        ] == await reopenedFont.findGlyphsThatUseGlyph("A")
+
+
+async def test_writesAreBatched(tmpdir, testFontraFont):
+    path = tmpdir / "MutatorSans.fontrapack"
+    packFont = FontraPackBackend.createFromPath(path)
+    async with aclosing(packFont):
+        await copyFont(testFontraFont, packFont)
+        # Nothing has been written yet
+        connection = sqlite3.connect(path)
+        assert connection.execute("SELECT COUNT(*) FROM glyphs").fetchone() == (0,)
+
+    glyphMap = await testFontraFont.getGlyphMap()
+    assert connection.execute("SELECT COUNT(*) FROM glyphs").fetchone() == (
+        len(glyphMap),
+    )
+    connection.close()
+
+
+async def test_writesAreCommittedInThread(tmpdir, testFontraFont):
+    path = tmpdir / "test.fontrapack"
+    packFont = FontraPackBackend.createFromPath(path)
+    glyph = await testFontraFont.getGlyph("A")
+    async with aclosing(packFont):
+        packFont.startOptionalBackgroundTasks()
+        backgroundTask = packFont._backgroundTasksTask
+        for glyphName in ["A", "B"]:
+            await packFont.putGlyph(glyphName, glyph, [])
+        # The scheduler collects the changes, and commits them in a thread
+        packFont._scheduler.flush()
+        assert len(packFont._commitTasks) == 1
+        await packFont.deleteGlyph("B")
+        packFont._scheduler.flush()
+        # Collected changes are committed before reading
+        assert await packFont.getGlyph("A") == glyph
+        assert await packFont.getGlyph("B") is None
+        for task in list(packFont._commitTasks):
+            await task
+        assert not packFont._changesToCommit
+
+        connection = sqlite3.connect(path)
+        assert connection.execute("SELECT name FROM glyphs").fetchall() == [("A",)]
+        connection.close()
+
+    assert backgroundTask is not None and backgroundTask.done()
+
+
+async def test_failedCommitIsKept(tmpdir, testFontraFont):
+    path = tmpdir / "test.fontrapack"
+    packFont = FontraPackBackend.createFromPath(path)
+    glyph = await testFontraFont.getGlyph("A")
+    commitCollectedChanges = packFont._commitCollectedChanges
+    failing = True
+
+    def failingCommit(changes):
+        if failing:
+            raise RuntimeError("disk full")
+        commitCollectedChanges(changes)
+
+    packFont._commitCollectedChanges = failingCommit
+    async with aclosing(packFont):
+        await packFont.putGlyph("A", glyph, [])
+        with pytest.raises(RuntimeError, match="disk full"):
+            await packFont.flush()
+        # The changes are still queued, and the next flush commits them
+        assert len(packFont._changesToCommit) == 1
+        failing = False
+        await packFont.flush()
+        assert not packFont._changesToCommit
+
+    reopenedFont = FontraPackBackend.fromPath(path)
+    async with aclosing(reopenedFont):
+        assert await reopenedFont.getGlyph("A") == glyph
+
+
+async def test_backgroundImage(tmpdir):
+    path = tmpdir / "test.fontrapack"
+    packFont = FontraPackBackend.createFromPath(path)
+    imageData = ImageData(type=ImageType.PNG, data=b"not really a png")
+    async with aclosing(packFont):
+        await packFont.putBackgroundImage("image-id", imageData)
+
+    reopenedFont = FontraPackBackend.fromPath(path)
+    async with aclosing(reopenedFont):
+        assert await reopenedFont.getBackgroundImage("image-id") == imageData
+        assert await reopenedFont.getBackgroundImage("other-id") is None
+
+
+def test_notAFontraPack(tmpdir):
+    path = pathlib.Path(tmpdir / "test.fontrapack")
+    path.write_text("this is not an SQLite database, " * 10)
+    with pytest.raises(FontraPackFormatError):
+        FontraPackBackend.fromPath(path)
@@ -228,9 +228,13 @@ async def test_getShaperFontData_ttf():
 
 async def test_getShaperFontData_ttx():
     path = dataDir / "mutatorsans" / "MutatorSans.subset.ttx"
-    font = getFileSystemBackend(path)
-    shaperFontData = await font.getShaperFontData()
+    backend = getFileSystemBackend(path)
+    tableTags = sorted(backend.font.keys())
+    shaperFontData = await backend.getShaperFontData()
     assert shaperFontData is not None
+    # The shaper font is built from its own TTFont, leaving the backend's intact
+    assert sorted(backend.font.keys()) == tableTags
+    assert "glyf" in backend.font
     f = io.BytesIO(shaperFontData.data)
     font = TTFont(f)
     assert sorted(font.keys()) == [
@@ -246,6 +250,50 @@ async def test_getShaperFontData_ttx():
     ]
 
 
+async def test_getShaperFontData_cached(tmpdir):
+    tmpdir = pathlib.Path(tmpdir)
+    sourcePath = dataDir / "mutatorsans" / "MutatorSans.subset.ttf"
+    destPath = tmpdir / "testfont.ttf"
+    shutil.copy(sourcePath, destPath)
+
+    backend = getFileSystemBackend(destPath)
+    handler = FontHandler(
+        backend=backend,
+        projectIdentifier="test",
+        metaInfoProvider=FileSystemProjectManager(),
+    )
+
+    async with aclosing(handler):
+        shaperFontData1 = await backend.getShaperFontData()
+        shaperFontData2 = await backend.getShaperFontData()
+        assert shaperFontData1 is shaperFontData2
+
+        encoded1 = await handler.getShaperFontData()
+        encoded2 = await handler.getShaperFontData()
+        assert encoded1 is encoded2
+
+        ttFont = TTFont(destPath)
+        ttFont["name"].setName("Modified", 1, 3, 1, 0x409)
+        ttFont.save(destPath)
+
+        # The file changed, so the cached data is stale
+        shaperFontData3 = await backend.getShaperFontData()
+        assert shaperFontData3 is not shaperFontData1
+        assert "Modified" == TTFont(io.BytesIO(shaperFontData3.data))[
+            "name"
+        ].getDebugName(1)
+        assert encoded1 != await handler.getShaperFontData()
+
+
+async def test_shaperFontDataTask_cancelledOnClose():
+    backend = getFileSystemBackend(dataDir / "mutatorsans" / "MutatorSans.ttf")
+    backend.startOptionalBackgroundTasks()
+    _, task = backend._shaperFontDataTask
+    await backend.aclose()
+    assert task.done()
+    assert backend._shaperFontDataTask is None
+
+
 async def test_getSources(testFontMutatorSans):
     sources = await testFontMutatorSans.getSources()
     assert len(sources) == 4
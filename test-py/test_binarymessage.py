@@ -0,0 +1,109 @@
+import pytest
+
+from fontra.core.binarymessage import (
+    BINARY_ARRAY_KEY,
+    MESSAGE_KIND_BINARY,
+    _extractArrays,
+    decodeBinaryMessage,
+    decodeMessageChunk,
+    encodeBinaryMessage,
+    encodeMessageChunks,
+    isMessageChunk,
+)
+from fontra.core.classes import StaticGlyph, unstructure
+from fontra.core.path import PackedPath
+
+
+def makeMessage(coordinates):
+    path = PackedPath.fromUnpackedContours(
+        [
+            {
+                "points": [
+                    {"x": x, "y": y}
+                    for x, y in zip(coordinates[::2], coordinates[1::2])
+                ],
+                "isClosed": True,
+            }
+        ]
+    )
+    return {
+        "client-call-id": 3,
+        "return-value": unstructure(StaticGlyph(path=path, xAdvance=500)),
+    }
+
+
+@pytest.mark.parametrize(
+    "coordinates",
+    [
+        list(range(20)),
+        [0, 100000, 20, 30, -100000, 50, 60, 70],
+        [0.5, 1, 2.25, 3, 4, 5, 6.125, 7],
+        [25_000_000_000, 0, 0, 0, 0, 0, 0, 0],
+    ],
+)
+def test_binaryMessage_roundTrip(coordinates):
+    message = makeMessage(coordinates)
+    data = encodeBinaryMessage(message)
+    assert data is not None
+    assert len(data) % 8 == 0
+    assert message == decodeBinaryMessage(data)
+    assert not isMessageChunk(data)
+
+
+def test_messageChunks():
+    data = bytes(range(25))
+    chunks = list(encodeMessageChunks(data, MESSAGE_KIND_BINARY, 3, 10))
+    assert all(isMessageChunk(chunk) for chunk in chunks)
+    assert [decodeMessageChunk(chunk) for chunk in chunks] == [
+        (3, 0, 3, MESSAGE_KIND_BINARY, data[:10]),
+        (3, 1, 3, MESSAGE_KIND_BINARY, data[10:20]),
+        (3, 2, 3, MESSAGE_KIND_BINARY, data[20:]),
+    ]
+
+
+def test_binaryMessage_noArrays():
+    assert encodeBinaryMessage({"server-call-id": 0, "arguments": []}) is None
+    # Too short to bother
+    assert encodeBinaryMessage(makeMessage([0, 1, 2, 3])) is None
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        {"coordinates": ["a"] * 10, "pointTypes": []},
+        {"coordinates": [True, False] * 5, "pointTypes": []},
+        {"coordinates": [1, 2.5, None, 4, 5, 6, 7, 8], "pointTypes": []},
+        # Not a packed path
+        {"customData": {"coordinates": list(range(10))}},
+    ],
+)
+def test_binaryMessage_notArrays(message):
+    assert encodeBinaryMessage(message) is None
+
+
+def test_binaryMessage_noCopy():
+    message = makeMessage(list(range(20)))
+    message["return-value"]["anchors"] = [{"name": "top", "x": 0, "y": 0}]
+    arrays: list = []
+    extracted = _extractArrays(message, arrays)
+    assert len(arrays) == 1
+    assert extracted is not message
+    assert extracted["return-value"]["anchors"] is message["return-value"]["anchors"]
+    # The original message is unchanged
+    assert message["return-value"]["path"]["coordinates"] == list(range(20))
+
+    message = {"server-call-id": 0, "arguments": [{"a": [1, 2]}]}
+    assert _extractArrays(message, []) is message
+
+
+def test_binaryMessage_arrayTypes():
+    data = encodeBinaryMessage(
+        [
+            {"coordinates": [1] * 8, "pointTypes": []},
+            {"coordinates": [100000] * 8, "pointTypes": []},
+            {"coordinates": [0.5] * 8, "pointTypes": []},
+        ]
+    )
+    assert data is not None
+    assert b'"a":[["i16",0,8],["i32",16,8],["f64",48,8]]' in data
+    assert f'{{"{BINARY_ARRAY_KEY}":1}}'.encode() in data
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from fontra.core.changequeue import OutboundChangeQueue
+
+
+class SlowClient:
+    def __init__(self):
+        self.receivedChanges = []
+        self.respond = asyncio.Event()
+
+    async def externalChange(self, change, isLiveChange):
+        self.receivedChanges.append((change, isLiveChange))
+        await self.respond.wait()
+        self.respond.clear()
+
+
+def moveChange(pointIndex, x, y):
+    return {"p": ["glyphs", "A", "path"], "f": "=xy", "a": [pointIndex, x, y]}
+
+
+async def waitForClient(client, numChanges):
+    while len(client.receivedChanges) < numChanges:
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_outboundChangeQueue_coalesceLiveChanges():
+    client = SlowClient()
+    queue = OutboundChangeQueue(client.externalChange)
+
+    queue.put(moveChange(0, 1, 1), True)
+    await waitForClient(client, 1)
+
+    # The client is busy, these should coalesce
+    for i in range(2, 10):
+        queue.put(moveChange(0, i, i), True)
+        queue.put(moveChange(1, i, i), True)
+    assert 2 == len(queue)
+
+    client.respond.set()
+    await waitForClient(client, 2)
+    assert (
+        {"c": [moveChange(0, 9, 9), moveChange(1, 9, 9)]},
+        True,
+    ) == client.receivedChanges[1]
+
+    client.respond.set()
+    await asyncio.sleep(0)
+    assert dict(depth=0, maxDepth=2, queued=17, sent=2, coalesced=14) == (
+        queue.getStats()
+    )
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_outboundChangeQueue_barriers():
+    client = SlowClient()
+    queue = OutboundChangeQueue(client.externalChange)
+
+    queue.put(moveChange(0, 1, 1), True)
+    await waitForClient(client, 1)
+
+    insertChange = {"p": ["glyphs", "A", "path"], "f": "insertPoint", "a": [0, 0, {}]}
+    finalChange = moveChange(0, 3, 3)
+
+    queue.put(moveChange(0, 2, 2), True)
+    queue.put(insertChange, True)
+    queue.put(moveChange(0, 3, 3), True)
+    queue.put(finalChange, False)
+    queue.put(moveChange(0, 4, 4), True)
+    queue.put(moveChange(0, 5, 5), True)
+
+    # Nothing can be coalesced across a structural change or a final change
+    assert 5 == len(queue)
+
+    for i in range(3):
+        client.respond.set()
+        await waitForClient(client, i + 2)
+
+    assert [
+        (moveChange(0, 1, 1), True),
+        ({"c": [moveChange(0, 2, 2), insertChange, moveChange(0, 3, 3)]}, True),
+        (finalChange, False),
+        (moveChange(0, 5, 5), True),
+    ] == client.receivedChanges
+    client.respond.set()
+    queue.close()
@@ -5,8 +5,10 @@ from copy import deepcopy
 import pytest
 
 from fontra.core.changes import (
+    ChangePatternIndex,
     applyChange,
     collectChangePaths,
+    copyChangeTargets,
     filterChangePattern,
     matchChangePattern,
     patternDifference,
@@ -14,6 +16,8 @@ from fontra.core.changes import (
     patternIntersect,
     patternUnion,
 )
+from fontra.core.classes import StaticGlyph
+from fontra.core.path import PackedPath
 
 
 def getTestData(fileName):
@@ -48,6 +52,73 @@ def test_applyChange(testName, inputDataName, change, expectedData):
     assert change == change2
 
 
+@pytest.mark.parametrize(
+    "testName, inputDataName, change, expectedData", applyChangeTestData
+)
+def test_copyChangeTargets(testName, inputDataName, change, expectedData):
+    subject = deepcopy(applyChangeTestInputData[inputDataName])
+    originalSubject = deepcopy(subject)
+    root = {"subject": subject}
+    change = {"p": ["subject"], "c": [change]}
+    copyChangeTargets(root, change)
+    applyChange(root, change)
+    assert root["subject"] == expectedData
+    # The original must not have been modified
+    assert subject == originalSubject
+
+
+def test_copyChangeTargets_structuralSharing():
+    path = PackedPath.fromUnpackedContours(
+        [{"points": [{"x": 0, "y": 0}, {"x": 10, "y": 10}], "isClosed": True}]
+    )
+    glyphs = {
+        "A": StaticGlyph(path=path, xAdvance=500),
+        "B": StaticGlyph(xAdvance=300),
+    }
+    root = {"glyphs": glyphs}
+    change = {
+        "p": ["glyphs"],
+        "c": [
+            {"p": ["A", "path"], "f": "=xy", "a": [0, 5, 5]},
+            {"p": ["A"], "f": "=", "a": ["xAdvance", 600]},
+        ],
+    }
+    copyChangeTargets(root, change)
+    applyChange(root, change)
+
+    assert [0, 0, 10, 10] == glyphs["A"].path.coordinates
+    assert 500 == glyphs["A"].xAdvance
+    assert [5, 5, 10, 10] == root["glyphs"]["A"].path.coordinates
+    assert 600 == root["glyphs"]["A"].xAdvance
+    assert root["glyphs"] is not glyphs
+    assert root["glyphs"]["B"] is glyphs["B"]
+
+
+def test_copyChangeTargets_pathPrefixWithChildren():
+    path = PackedPath.fromUnpackedContours(
+        [
+            {
+                "points": [{"x": 0, "y": 0}, {"x": 10, "y": 10}, {"x": 10, "y": 10}],
+                "isClosed": True,
+            }
+        ]
+    )
+    glyphs = {"A": StaticGlyph(path=path)}
+    root = {"glyphs": glyphs}
+    change = {
+        "p": ["glyphs", "A", "path"],
+        "c": [
+            {"f": "=xy", "a": [0, 99, 99]},
+            {"f": "=xy", "a": [1, 77, 77]},
+        ],
+    }
+    copyChangeTargets(root, change)
+    applyChange(root, change)
+
+    assert [0, 0, 10, 10, 10, 10] == glyphs["A"].path.coordinates
+    assert [99, 99, 77, 77, 10, 10] == root["glyphs"]["A"].path.coordinates
+
+
 @pytest.mark.parametrize(
     "patternA, path, expectedPattern",
     [
@@ -178,6 +249,75 @@ def test_matchChangePattern(change, pattern, expectedResult):
     assert expectedResult == result
 
 
+@pytest.mark.parametrize(
+    "change, pattern, expectedResult",
+    getTestData("match-change-pattern-test-data.json"),
+)
+def test_changePatternIndex_match(change, pattern, expectedResult):
+    index = ChangePatternIndex()
+    index.setPattern("subscriber", pattern)
+    index.setPattern("other", {"unrelated": None})
+    result = index.match(change)
+    assert expectedResult == ("subscriber" in result)
+
+
+changePatternIndexPatterns = {
+    "a": {"glyphs": {"A": None}},
+    "b": {"glyphs": {"__WILDCARD__": {"layers": None}}},
+    "c": {"glyphs": {"A": {"layers": None}, "__WILDCARD__": None}},
+    "d": {"glyphMap": None, "kerning": {"kern": None}},
+}
+
+changePatternIndexChanges = [
+    {"p": ["glyphs", "A"], "f": "=xy", "a": [0, 1, 2]},
+    {"p": ["glyphs", "A", "layers", "default"], "f": "=", "a": ["x", 1]},
+    {"p": ["glyphs", "B", "layers"], "f": "d", "a": ["default"]},
+    {"p": ["glyphs", "B", "axes"], "f": "=", "a": [0, {}]},
+    {"p": ["glyphs"], "f": "=", "a": ["A", {}]},
+    {"p": ["glyphs"], "c": [{"p": ["C", "layers"], "f": "d", "a": ["x"]}]},
+    {"c": [{"p": ["glyphMap"], "f": "=", "a": ["A", []]}]},
+    {"p": ["kerning"], "f": "=", "a": ["kern", {}]},
+    {"p": ["kerning"], "f": "=", "a": ["vkrn", {}]},
+    {"p": ["fontInfo"], "f": "=", "a": ["familyName", "X"]},
+]
+
+
+@pytest.mark.parametrize("change", changePatternIndexChanges)
+def test_changePatternIndex_multipleSubscribers(change):
+    index = ChangePatternIndex()
+    for subscriber, pattern in changePatternIndexPatterns.items():
+        index.setPattern(subscriber, pattern)
+
+    expectedResult = {
+        subscriber
+        for subscriber, pattern in changePatternIndexPatterns.items()
+        if matchChangePattern(change, pattern)
+    }
+    assert expectedResult == index.match(change)
+
+
+def test_changePatternIndex_incrementalUpdates():
+    index = ChangePatternIndex()
+    change = {"p": ["glyphs", "B", "layers"], "f": "d", "a": ["default"]}
+
+    pattern = patternUnion({}, {"glyphs": {"A": None}})
+    index.setPattern("a", pattern)
+    assert set() == index.match(change)
+
+    pattern = patternUnion(pattern, {"glyphs": {"B": None}})
+    index.setPattern("a", pattern)
+    assert {"a"} == index.match(change)
+
+    pattern = patternDifference(pattern, {"glyphs": {"B": None}})
+    index.setPattern("a", pattern)
+    assert set() == index.match(change)
+    assert {"glyphs": {"A": None}} == index.getPattern("a")
+
+    index.removeSubscriber("a")
+    assert {} == index.getPattern("a")
+    assert {} == index._root.children
+
+
 @pytest.mark.parametrize(
     "change, pattern, inverse, expectedResult",
     getTestData("filter-change-pattern-test-data.json"),
@@ -0,0 +1,47 @@
+import json
+import pathlib
+import time
+from copy import deepcopy
+
+from fontra.core.changes import applyChange
+
+# Run with `pytest -s test-py/test_changes_benchmark.py` to see the numbers,
+# or run this file as a script for a longer run.
+
+
+def getTestData(fileName):
+    path = pathlib.Path(__file__).parent.parent / "test-common" / fileName
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def measureApplyChangeRate(minDuration):
+    testData = getTestData("apply-change-test-data.json")
+    inputData = testData["inputData"]
+    testCases = [
+        (testCase["inputDataName"], testCase["change"])
+        for testCase in testData["tests"]
+    ]
+
+    numChanges = 0
+    duration = 0.0
+    while duration < minDuration:
+        subjects = [
+            deepcopy(inputData[inputDataName]) for inputDataName, _ in testCases
+        ]
+        t = time.perf_counter()
+        for subject, (_, change) in zip(subjects, testCases):
+            applyChange(subject, change)
+        duration += time.perf_counter() - t
+        numChanges += len(testCases)
+
+    return numChanges / duration
+
+
+def test_applyChange_benchmark():
+    changesPerSecond = measureApplyChangeRate(0.2)
+    print(f"\napplyChange: {changesPerSecond:,.0f} changes/sec")
+    assert changesPerSecond > 0
+
+
+if __name__ == "__main__":
+    print(f"applyChange: {measureApplyChangeRate(5):,.0f} changes/sec")
@@ -7,7 +7,14 @@ from contextlib import aclosing
 import pytest
 
 from fontra.backends.designspace import DesignspaceBackend
-from fontra.core.fonthandler import FontHandler
+from fontra.core.classes import Kerning
+from fontra.core.fonthandler import (
+    CHANGES_PATTERN_KEY,
+    FontHandler,
+    LocalDataCacheLimits,
+    collectChangedKerningPairs,
+)
+from fontra.core.journal import EditJournal
 from fontra.filesystem.projectmanager import FileSystemProjectManager
 
 mutatorSansDir = pathlib.Path(__file__).resolve().parent / "data" / "mutatorsans"
@@ -27,7 +34,10 @@ mutatorFiles = [
 
 @pytest.fixture(scope="session")
 def testFontPath(tmp_path_factory):
-    tmpDir = tmp_path_factory.mktemp("font")
+    return copyTestFont(tmp_path_factory.mktemp("font"))
+
+
+def copyTestFont(tmpDir):
     for fn in mutatorFiles:
         srcPath = mutatorSansDir / fn
         dstPath = tmpDir / fn
@@ -167,6 +177,115 @@ async def test_fontHandler_editGlyph(testFontHandler):
     await asyncio.sleep(0)
 
 
+@pytest.mark.asyncio
+async def test_fontHandler_editGlyph_copyOnWrite(testFontHandler):
+    async with aclosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyphBefore = await testFontHandler.getGlyph("A")
+        layerName, layer = firstLayerItem(glyphBefore)
+        otherLayerNames = [name for name in glyphBefore.layers if name != layerName]
+        coordinatesBefore = layer.glyph.path.coordinates[:2]
+        newCoordinates = [x + 1 for x in coordinatesBefore]
+
+        change = {
+            "p": ["glyphs", "A", "layers", layerName, "glyph", "path"],
+            "f": "=xy",
+            "a": [0, *newCoordinates],
+        }
+        await testFontHandler.editFinal(
+            change, {}, "Test edit", False, connection=MockRemoteObjectConnection()
+        )
+        await testFontHandler.finishWriting()
+
+        glyphAfter = await testFontHandler.getGlyph("A")
+        # The previous version, which may be shared with the writer, is untouched
+        assert glyphAfter is not glyphBefore
+        assert coordinatesBefore == layer.glyph.path.coordinates[:2]
+        assert newCoordinates == glyphAfter.layers[layerName].glyph.path.coordinates[:2]
+        # Everything that wasn't changed is shared
+        for otherLayerName in otherLayerNames:
+            assert (
+                glyphBefore.layers[otherLayerName] is glyphAfter.layers[otherLayerName]
+            )
+
+
+@pytest.mark.parametrize(
+    "change, expectedPairs",
+    [
+        (
+            {"p": ["kerning", "kern", "values", "A"], "f": "=", "a": ["V", [1]]},
+            {"kern": {("A", "V")}},
+        ),
+        (
+            {"p": ["kerning", "kern", "values", "A", "V"], "f": "=", "a": [0, 2]},
+            {"kern": {("A", "V")}},
+        ),
+        (
+            {"p": ["kerning", "kern", "values"], "f": "d", "a": ["A"]},
+            {"kern": {("A", "V"), ("A", "W")}},
+        ),
+        (
+            {
+                "p": ["kerning", "kern"],
+                "c": [
+                    {"p": ["values", "T"], "f": "=", "a": ["o", [3]]},
+                    {"p": ["values", "A"], "f": "d", "a": ["W"]},
+                ],
+            },
+            {"kern": {("T", "o"), ("A", "W")}},
+        ),
+        (
+            {"p": ["kerning", "kern", "groupsSide1"], "f": "=", "a": ["A", ["A"]]},
+            None,
+        ),
+        ({"p": ["kerning"], "f": "=", "a": ["vkrn", {}]}, None),
+    ],
+)
+def test_collectChangedKerningPairs(change, expectedPairs):
+    kerning = {
+        "kern": Kerning(
+            groupsSide1={},
+            groupsSide2={},
+            sourceIdentifiers=["a"],
+            values={"A": {"V": [-10], "W": [-20]}},
+        )
+    }
+    assert expectedPairs == collectChangedKerningPairs(change, kerning, kerning)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_editKerningPairs(testFontHandler):
+    writtenPairs = []
+    backend = testFontHandler.backend
+    originalPutKerningPairs = backend.putKerningPairs
+
+    async def putKerningPairs(kernType, sourceIdentifiers, pairs):
+        writtenPairs.append(sorted(pairs))
+        await originalPutKerningPairs(kernType, sourceIdentifiers, pairs)
+
+    backend.putKerningPairs = putKerningPairs
+
+    async with aclosing(testFontHandler):
+        await testFontHandler.startTasks()
+        kerning = await testFontHandler.getKerning()
+        numSources = len(kerning["kern"].sourceIdentifiers)
+
+        for i in range(3):
+            change = {
+                "p": ["kerning", "kern", "values", "A"],
+                "f": "=",
+                "a": ["J", [-10 - i] * numSources],
+            }
+            await testFontHandler.editFinal(
+                change, {}, "Test edit", False, connection=MockRemoteObjectConnection()
+            )
+        await testFontHandler.finishWriting()
+
+    assert writtenPairs[-1] == [("A", "J")]
+    reopenedKerning = await DesignspaceBackend.fromPath(backend.dsDoc.path).getKerning()
+    assert [-12] * numSources == reopenedKerning["kern"].values["A"]["J"]
+
+
 @pytest.mark.asyncio
 async def test_fontHandler_editGlyph_delete_layer(testFontHandler):
     async with aclosing(testFontHandler):
@@ -210,6 +329,152 @@ async def test_fontHandler_editGlyph_delete_layer(testFontHandler):
     await asyncio.sleep(0)
 
 
+@pytest.mark.asyncio
+async def test_fontHandler_editGlyphs_batchedWrite(testFontHandler):
+    backend = testFontHandler.backend
+    putGlyphsCalls = []
+    backendPutGlyphs = backend.putGlyphs
+
+    async def putGlyphs(glyphs):
+        putGlyphsCalls.append([glyphName for glyphName, _, _ in glyphs])
+        await backendPutGlyphs(glyphs)
+
+    backend.putGlyphs = putGlyphs
+
+    async with aclosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyphNames = ["B", "C", "D"]
+        changes = []
+        rollbackChanges = []
+        for glyphName in glyphNames:
+            glyph = await testFontHandler.getGlyph(glyphName)
+            layerName, layer = firstLayerItem(glyph)
+            path = ["glyphs", glyphName, "layers", layerName, "glyph", "path"]
+            x, y = layer.glyph.path.coordinates[:2]
+            changes.append({"p": path, "f": "=xy", "a": [0, x + 1, y]})
+            rollbackChanges.append({"p": path, "f": "=xy", "a": [0, x, y]})
+
+        await testFontHandler.editFinal(
+            {"c": changes},
+            {"c": rollbackChanges},
+            "Test edit",
+            False,
+            connection=MockRemoteObjectConnection(),
+        )
+        await testFontHandler.finishWriting()
+        assert [glyphNames] == putGlyphsCalls
+
+        # Single glyph writes don't go through the batch API
+        await testFontHandler.editFinal(
+            {"c": rollbackChanges[:1]},
+            {"c": changes[:1]},
+            "Test edit",
+            False,
+            connection=MockRemoteObjectConnection(),
+        )
+        await testFontHandler.finishWriting()
+        assert [glyphNames] == putGlyphsCalls
+
+        reopenedBackend = DesignspaceBackend.fromPath(backend.dsDoc.path)
+        for glyphName, change in zip(glyphNames, changes):
+            glyph = await reopenedBackend.getGlyph(glyphName)
+            layerName, layer = firstLayerItem(glyph)
+            expectedCoordinates = (
+                [change["a"][1] - 1, change["a"][2]]
+                if glyphName == "B"
+                else change["a"][1:]
+            )
+            assert expectedCoordinates == layer.glyph.path.coordinates[:2]
+
+
+class MessageRecordingConnection:
+    def __init__(self, messageError=None):
+        self.messages = []
+        self.proxy = self
+        self.messageError = messageError
+
+    async def messageFromServer(self, headline, msg=None):
+        self.messages.append(headline)
+        if self.messageError is not None:
+            # The client timed out, or its connection closed
+            raise self.messageError
+
+
+class SubscribingConnection:
+    def __init__(self, clientUUID):
+        self.clientUUID = clientUUID
+        self.proxy = self
+
+    async def externalChange(self, change, isLiveChange):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_subscriptionsRemovedOnClose(testFontHandler):
+    index = testFontHandler._subscriptionIndexes[CHANGES_PATTERN_KEY]
+    connectionA = SubscribingConnection("client-1")
+    connectionB = SubscribingConnection("client-1")
+    async with testFontHandler.useConnection(connectionA):
+        async with testFontHandler.useConnection(connectionB):
+            await testFontHandler.subscribeChanges(
+                ["glyphs", "A"], False, connection=connectionB
+            )
+        # The client still has a connection
+        assert {"glyphs": {"A": None}} == index.getPattern("client-1")
+    assert {} == index.getPattern("client-1")
+    assert {} == index._root.children
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "messageError", [None, asyncio.TimeoutError(), asyncio.CancelledError()]
+)
+async def test_fontHandler_editGlyphs_batchedWriteError(testFontHandler, messageError):
+    backend = testFontHandler.backend
+    putGlyphCalls = []
+    backendPutGlyph = backend.putGlyph
+
+    async def putGlyphs(glyphs):
+        raise OSError("disk full")
+
+    async def putGlyph(glyphName, glyph, codePoints):
+        putGlyphCalls.append(glyphName)
+        await backendPutGlyph(glyphName, glyph, codePoints)
+
+    backend.putGlyphs = putGlyphs
+    backend.putGlyph = putGlyph
+
+    async with aclosing(testFontHandler):
+        await testFontHandler.startTasks()
+        connection = MessageRecordingConnection(messageError)
+        changes = []
+        for glyphName in ["B", "C"]:
+            glyph = await testFontHandler.getGlyph(glyphName)
+            layerName, layer = firstLayerItem(glyph)
+            path = ["glyphs", glyphName, "layers", layerName, "glyph", "path"]
+            x, y = layer.glyph.path.coordinates[:2]
+            changes.append({"p": path, "f": "=xy", "a": [0, x, y]})
+
+        # The failing batch is reported to the connection the edits came from
+        await testFontHandler.editFinal(
+            {"c": changes}, {"c": changes}, "Test edit", False, connection=connection
+        )
+        await testFontHandler.finishWriting()
+        assert connection.messages == ["The data could not be saved due to an error."]
+
+        # The write loop is still running
+        await testFontHandler.editFinal(
+            {"c": changes[:1]},
+            {"c": changes[:1]},
+            "Test edit",
+            False,
+            connection=connection,
+        )
+        await testFontHandler.finishWriting()
+        assert putGlyphCalls == ["B"]
+        assert len(connection.messages) == 1
+
+
 @pytest.mark.asyncio
 async def test_fontHandler_getData(testFontHandler):
     async with aclosing(testFontHandler):
@@ -218,6 +483,101 @@ async def test_fontHandler_getData(testFontHandler):
         assert 1000 == unitsPerEm
 
 
+@pytest.mark.asyncio
+async def test_fontHandler_getData_singleFlight(testFontHandler):
+    backendGetKerning = testFontHandler.backend.getKerning
+    numCalls = 0
+
+    async def getKerning():
+        nonlocal numCalls
+        numCalls += 1
+        await asyncio.sleep(0.01)
+        return await backendGetKerning()
+
+    testFontHandler.backend.getKerning = getKerning
+
+    async with aclosing(testFontHandler):
+        await testFontHandler.startTasks()
+        kernings = await asyncio.gather(
+            *(testFontHandler.getData("kerning") for i in range(3))
+        )
+        assert all(kerning is kernings[0] for kerning in kernings)
+        assert 1 == numCalls
+        assert dict(loads=1, shared=2, inFlight=0) == testFontHandler.getLoadStats()
+
+        # A cancelled request doesn't cancel the load for the other requests
+        testFontHandler.localData.pop("kerning")
+        request1 = asyncio.create_task(testFontHandler.getData("kerning"))
+        request2 = asyncio.create_task(testFontHandler.getData("kerning"))
+        await asyncio.sleep(0)
+        request1.cancel()
+        assert kernings[0] == await request2
+        assert request1.cancelled()
+        assert 2 == numCalls
+
+        # Data that is reloaded while it's being loaded is not stored
+        testFontHandler.localData.pop("kerning")
+        request = asyncio.create_task(testFontHandler.getData("kerning"))
+        await asyncio.sleep(0)
+        await testFontHandler.reloadData({"kerning": None})
+        await request
+        assert "kerning" not in testFontHandler.localData
+        await testFontHandler.getData("kerning")
+        assert 4 == numCalls
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphs(testFontHandler):
+    backendGetGlyph = testFontHandler.backend.getGlyph
+    requestedGlyphNames = []
+
+    async def getGlyph(glyphName):
+        requestedGlyphNames.append(glyphName)
+        await asyncio.sleep(0.01)
+        return await backendGetGlyph(glyphName)
+
+    testFontHandler.backend.getGlyph = getGlyph
+
+    async with aclosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyphs, glyphA = await asyncio.gather(
+            testFontHandler.getGlyphs(["A", "B", "A", "nonexistent"]),
+            testFontHandler.getGlyph("A"),
+        )
+        assert ["A", "B", "nonexistent"] == list(glyphs)
+        assert glyphs["A"] is glyphA
+        assert "B" == glyphs["B"].name
+        assert glyphs["nonexistent"] is None
+        assert ["A", "B", "nonexistent"] == requestedGlyphNames
+        assert {} == testFontHandler._loadTasks
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_cachePools(testFontPath):
+    fontHandler = FontHandler(
+        backend=DesignspaceBackend.fromPath(testFontPath),
+        projectIdentifier="dummy",
+        metaInfoProvider=FileSystemProjectManager(),
+        cacheLimits=LocalDataCacheLimits(maxGlyphs=2),
+    )
+    async with aclosing(fontHandler):
+        await fontHandler.startTasks()
+        await fontHandler.getGlyphMap()
+        for glyphName in ["A", "B", "A", "C"]:
+            await fontHandler.getGlyph(glyphName)
+        await fontHandler.getKerning()
+
+        assert [("glyphs", "A"), ("glyphs", "C")] == list(fontHandler.localData.glyphs)
+        assert ["glyphMap", "kerning"] == list(fontHandler.localData.fontData)
+
+        stats = fontHandler.getCacheStats()
+        assert 1 == stats["glyphs"]["hits"]
+        assert 3 == stats["glyphs"]["misses"]
+        assert 1 == stats["glyphs"]["evictions"]
+        assert stats["glyphs"]["bytes"] > 0
+        assert 0 == stats["fontData"]["evictions"]
+
+
 @pytest.mark.asyncio
 async def test_fontHandler_setData(testFontHandler, caplog):
     caplog.set_level(logging.INFO)
@@ -369,5 +729,150 @@ async def test_getKerning(testFontHandler):
     assert "kern" in kerning
 
 
+async def test_fontHandler_journal(tmp_path):
+    fontPath = copyTestFont(tmp_path)
+    journalPath = tmp_path / "journal" / "edits.journal"
+    fontHandler = FontHandler(
+        backend=DesignspaceBackend.fromPath(fontPath),
+        projectIdentifier="dummy",
+        metaInfoProvider=FileSystemProjectManager(),
+        journalPath=journalPath,
+        journalCheckpointDelay=1000,
+    )
+    async with aclosing(fontHandler):
+        await fontHandler.startTasks()
+        glyph = await fontHandler.getGlyph("B")
+        layerName, layer = firstLayerItem(glyph)
+        path = ["glyphs", "B", "layers", layerName, "glyph", "path"]
+        x, y = layer.glyph.path.coordinates[:2]
+        await fontHandler.editFinal(
+            {"p": path, "f": "=xy", "a": [0, x + 10, y]},
+            {"p": path, "f": "=xy", "a": [0, x, y]},
+            "Test edit",
+            False,
+            connection=MockRemoteObjectConnection(),
+        )
+        # The edit is journaled as soon as editFinal returns
+        entries = await EditJournal(journalPath).read()
+        assert len(entries) == 1
+        [[operation, glyphName, glyphData, codePoints]] = entries[0]
+        assert (operation, glyphName, codePoints) == ("putGlyph", "B", [66, 98])
+
+        await fontHandler.finishWriting()
+        await fontHandler._checkpointJournal()
+        assert not journalPath.exists()
+
+        fontInfo = await fontHandler.getFontInfo()
+
+    # Edits that were acknowledged, but never written to the backend
+    fontInfo.familyName = "Journaled Sans"
+    journal = EditJournal(journalPath)
+    await journal.append([["deleteGlyph", "C"]])
+    await journal.append([["putData", "fontInfo", fontInfo], ["deleteGlyph", "C"]])
+
+    fontHandler = FontHandler(
+        backend=DesignspaceBackend.fromPath(fontPath),
+        projectIdentifier="dummy",
+        metaInfoProvider=FileSystemProjectManager(),
+        journalPath=journalPath,
+    )
+    async with aclosing(fontHandler):
+        await fontHandler.startTasks()
+        assert not journalPath.exists()
+        await fontHandler.finishWriting()
+
+    reopenedBackend = DesignspaceBackend.fromPath(fontPath)
+    glyph = await reopenedBackend.getGlyph("B")
+    assert firstLayerItem(glyph)[1].glyph.path.coordinates[:2] == [x + 10, y]
+    assert "C" not in await reopenedBackend.getGlyphMap()
+    assert (await reopenedBackend.getFontInfo()).familyName == "Journaled Sans"
+
+
+async def test_fontHandler_journalKerningPairs(tmp_path):
+    fontPath = copyTestFont(tmp_path)
+    journalPath = tmp_path / "journal" / "edits.journal"
+    fontHandler = FontHandler(
+        backend=DesignspaceBackend.fromPath(fontPath),
+        projectIdentifier="dummy",
+        metaInfoProvider=FileSystemProjectManager(),
+        journalPath=journalPath,
+        journalCheckpointDelay=1000,
+    )
+    async with aclosing(fontHandler):
+        await fontHandler.startTasks()
+        kerning = await fontHandler.getKerning()
+        sourceIdentifiers = kerning["kern"].sourceIdentifiers
+        values = [-10] * len(sourceIdentifiers)
+        await fontHandler.editFinal(
+            {"p": ["kerning", "kern", "values", "A"], "f": "=", "a": ["J", values]},
+            {},
+            "Test edit",
+            False,
+            connection=MockRemoteObjectConnection(),
+        )
+        # Only the modified pair is journaled, not the entire kerning
+        entries = await EditJournal(journalPath).read()
+        assert entries == [
+            [["putKerningPairs", "kern", sourceIdentifiers, [["A", "J", values]]]]
+        ]
+
+    # A kerning edit that was acknowledged, but never written to the backend
+    values = [-20] * len(sourceIdentifiers)
+    await EditJournal(journalPath).append(
+        [["putKerningPairs", "kern", sourceIdentifiers, [["A", "J", values]]]]
+    )
+
+    fontHandler = FontHandler(
+        backend=DesignspaceBackend.fromPath(fontPath),
+        projectIdentifier="dummy",
+        metaInfoProvider=FileSystemProjectManager(),
+        journalPath=journalPath,
+    )
+    async with aclosing(fontHandler):
+        await fontHandler.startTasks()
+        assert not journalPath.exists()
+
+    reopenedKerning = await DesignspaceBackend.fromPath(fontPath).getKerning()
+    assert values == reopenedKerning["kern"].values["A"]["J"]
+
+
+async def test_editJournal_batchedAppends(tmp_path):
+    journal = EditJournal(tmp_path / "edits.journal")
+    writtenBatches = []
+    appendEntries = journal._appendEntries
+
+    def recordingAppendEntries(entries):
+        writtenBatches.append(len(entries))
+        appendEntries(entries)
+
+    journal._appendEntries = recordingAppendEntries  # type: ignore
+    await asyncio.gather(
+        *(journal.append([["deleteGlyph", f"glyph{i}"]]) for i in range(5))
+    )
+    # Entries that are appended before their batch is written are written
+    # together
+    assert writtenBatches == [5]
+    assert journal.numEntries == 5
+    entries = await EditJournal(journal.path).read()
+    assert entries == [[["deleteGlyph", f"glyph{i}"]] for i in range(5)]
+
+
+async def test_editJournal_cancelledAppend(tmp_path):
+    journal = EditJournal(tmp_path / "edits.journal")
+    appendTasks = [
+        asyncio.create_task(journal.append([["deleteGlyph", f"glyph{i}"]]))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0)
+    # Cancelling the append that started the batch doesn't stop the batch
+    appendTasks[0].cancel()
+    await asyncio.gather(*appendTasks[1:])
+    with pytest.raises(asyncio.CancelledError):
+        await appendTasks[0]
+    assert journal.numEntries == 3
+    entries = await EditJournal(journal.path).read()
+    assert entries == [[["deleteGlyph", f"glyph{i}"]] for i in range(3)]
+
+
 def firstLayerItem(glyph):
     return next(iter(glyph.layers.items()))
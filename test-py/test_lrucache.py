@@ -1,4 +1,4 @@
-from fontra.core.lrucache import LRUCache
+from fontra.core.lrucache import LRUCache, approximateSize
 
 
 def test_lruCache():
@@ -19,3 +19,76 @@ def test_lruCache():
     _ = cache["a"]
     cache["f"] = None
     assert ["c", "e", "a", "f"] == list(cache.keys())
+
+
+def test_lruCache_maxBytes():
+    cache = LRUCache(10, maxBytes=10, sizeFunc=len)
+    cache["a"] = "xxxx"
+    cache["b"] = "xxxx"
+    assert ["a", "b"] == list(cache.keys())
+    assert 8 == cache.totalSize
+    _ = cache["a"]
+    cache["c"] = "xxxx"
+    assert ["a", "c"] == list(cache.keys())
+    assert 8 == cache.totalSize
+    cache["d"] = "x" * 20  # too big, but the newest item is never evicted
+    assert ["d"] == list(cache.keys())
+    assert 20 == cache.totalSize
+    del cache["d"]
+    assert 0 == cache.totalSize
+    cache["e"] = "xx"
+    assert "xx" == cache.pop("e")
+    assert 0 == cache.totalSize
+    assert 3 == cache.evictions
+
+
+def test_lruCache_lazySizing():
+    sizedValues = []
+
+    def sizeFunc(value):
+        sizedValues.append(value)
+        return len(value)
+
+    cache = LRUCache(10, maxBytes=10, sizeFunc=sizeFunc)
+    cache["a"] = "xx"
+    assert ["xx"] == sizedValues
+    for value in ["xxx", "xxxx", "xxxxx"]:
+        cache["a"] = value
+    assert ["xx"] == sizedValues
+    assert 5 == cache.totalSize
+    assert ["xx", "xxxxx"] == sizedValues
+    cache["a"] = "x" * 8
+    cache["b"] = "xxxx"  # sizes the replaced value, and evicts it
+    assert ["b"] == list(cache.keys())
+    assert 4 == cache.totalSize
+
+
+def test_lruCache_noSizing():
+    cache = LRUCache(10)
+    cache["a"] = [1.5] * 1000
+    assert 0 == cache.totalSize
+    assert None is cache.getStats()["bytes"]
+
+
+def test_lruCache_stats():
+    cache = LRUCache(2)
+    cache["a"] = 1
+    assert 1 == cache.get("a")
+    assert None is cache.get("b")
+    cache["b"] = 2
+    cache["c"] = 3
+    assert {
+        "size": 2,
+        "maxSize": 2,
+        "bytes": None,
+        "maxBytes": None,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    } == cache.getStats()
+
+
+def test_approximateSize():
+    assert approximateSize([1.5, 2.5]) > approximateSize([1.5])
+    sharedList = [1.5] * 100
+    assert approximateSize([sharedList, sharedList]) < 2 * approximateSize(sharedList)
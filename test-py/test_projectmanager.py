@@ -0,0 +1,357 @@
+import asyncio
+import os
+import pathlib
+import shutil
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from watchfiles import Change
+
+from fontra.core.fonthandler import LocalDataCacheLimits
+from fontra.core.server import FontraServer
+from fontra.filesystem.projectindex import ProjectIndex
+from fontra.filesystem.projectmanager import (
+    FileSystemProjectManager,
+    KeepWarmLimits,
+    fileExtensions,
+)
+
+dataDir = pathlib.Path(__file__).resolve().parent / "data"
+projectA = "mutatorsans/MutatorSans.designspace"
+projectB = "mutatorsans/MutatorSansBoldCondensed.ufo"
+projectC = "mutatorsans/MutatorSansLightWide.ufo"
+
+
+class ProjectOpenListener:
+    def __init__(self):
+        self.events = []
+
+    def projectOpened(self, projectIdentifier):
+        self.events.append(("opened", projectIdentifier))
+
+    def projectClosed(self, projectIdentifier):
+        self.events.append(("closed", projectIdentifier))
+
+
+class MockConnection:
+    def __init__(self):
+        self.clientUUID = object()
+        self.proxy = SimpleNamespace(externalChange=self.externalChange)
+
+    async def externalChange(self, change, isLiveChange):
+        pass
+
+
+async def connectAndDisconnect(projectManager, projectIdentifier):
+    fontHandler = await projectManager.getRemoteSubject(projectIdentifier, "token")
+    async with fontHandler.useConnection(MockConnection()):
+        await fontHandler.getGlyph("A")
+    return fontHandler
+
+
+@pytest.mark.asyncio
+async def test_keepWarm_reconnect():
+    listener = ProjectOpenListener()
+    projectManager = FileSystemProjectManager(
+        dataDir,
+        readOnly=True,
+        projectOpenListener=listener,
+        keepWarmLimits=KeepWarmLimits(idleTimeout=0.05),
+    )
+    try:
+        fontHandler = await connectAndDisconnect(projectManager, projectA)
+        assert projectA in projectManager.fontHandlers
+        serverInfo = await projectManager.getServerInfo("token")
+        assert serverInfo["Idle projects kept warm"] == projectA
+
+        reconnectedFontHandler = await connectAndDisconnect(projectManager, projectA)
+        assert reconnectedFontHandler is fontHandler
+        assert fontHandler.getCacheStats()["glyphs"]["hits"] == 1
+
+        await asyncio.sleep(0.1)
+        assert projectA not in projectManager.fontHandlers
+        assert listener.events == [("opened", projectA), ("closed", projectA)]
+    finally:
+        await projectManager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_keepWarm_closeImmediately():
+    projectManager = FileSystemProjectManager(
+        dataDir, readOnly=True, keepWarmLimits=KeepWarmLimits(idleTimeout=0)
+    )
+    await connectAndDisconnect(projectManager, projectA)
+    assert projectA not in projectManager.fontHandlers
+    await projectManager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_keepWarm_maxIdleHandlers():
+    projectManager = FileSystemProjectManager(
+        dataDir, readOnly=True, keepWarmLimits=KeepWarmLimits(maxIdleHandlers=2)
+    )
+    try:
+        for projectIdentifier in [projectA, projectB, projectC]:
+            await connectAndDisconnect(projectManager, projectIdentifier)
+        # The least recently used idle FontHandler got closed
+        assert sorted(projectManager.fontHandlers) == [projectB, projectC]
+    finally:
+        await projectManager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_keepWarm_maxCacheBytes():
+    projectManager = FileSystemProjectManager(
+        dataDir, readOnly=True, keepWarmLimits=KeepWarmLimits(maxCacheBytes=1)
+    )
+    try:
+        fontHandler = await projectManager.getRemoteSubject(projectA, "token")
+        async with fontHandler.useConnection(MockConnection()):
+            await fontHandler.getGlyph("A")
+            # FontHandlers in use are never closed, however much memory they use
+            await connectAndDisconnect(projectManager, projectB)
+            assert list(projectManager.fontHandlers) == [projectA]
+        assert list(projectManager.fontHandlers) == []
+    finally:
+        await projectManager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_keepWarm_maxCacheBytesWithoutGlyphCacheLimit():
+    projectManager = FileSystemProjectManager(
+        dataDir,
+        readOnly=True,
+        cacheLimits=LocalDataCacheLimits(maxGlyphBytes=None),
+        keepWarmLimits=KeepWarmLimits(maxCacheBytes=1),
+    )
+    try:
+        # The cached values are sized for the keep-warm limit
+        fontHandler = await connectAndDisconnect(projectManager, projectA)
+        assert fontHandler.getCacheStats()["glyphs"]["bytes"] > 1
+        assert list(projectManager.fontHandlers) == []
+    finally:
+        await projectManager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_reopenWaitsForClose(monkeypatch):
+    projectManager = FileSystemProjectManager(
+        dataDir, readOnly=True, keepWarmLimits=KeepWarmLimits(idleTimeout=0)
+    )
+    events = []
+    closeStarted = asyncio.Event()
+    mayClose = asyncio.Event()
+    try:
+        fontHandler = await projectManager.getRemoteSubject(projectA, "token")
+        originalAclose = fontHandler.aclose
+
+        async def aclose():
+            closeStarted.set()
+            await mayClose.wait()
+            await originalAclose()
+            events.append("closed")
+
+        monkeypatch.setattr(fontHandler, "aclose", aclose)
+        disconnectTask = asyncio.create_task(
+            connectAndDisconnect(projectManager, projectA)
+        )
+        await closeStarted.wait()
+        assert projectA not in projectManager.fontHandlers
+
+        # Reconnecting while the previous FontHandler is still closing
+        reopenTask = asyncio.create_task(
+            projectManager.getRemoteSubject(projectA, "token")
+        )
+        await asyncio.sleep(0.05)
+        assert not reopenTask.done()
+
+        mayClose.set()
+        reopenedFontHandler = await reopenTask
+        events.append("reopened")
+        assert reopenedFontHandler is not fontHandler
+        assert events == ["closed", "reopened"]
+        await disconnectTask
+        assert not projectManager._closeTasks
+    finally:
+        await projectManager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_getRemoteSubject_concurrent():
+    projectManager = FileSystemProjectManager(dataDir, readOnly=True)
+    try:
+        fontHandlers = await asyncio.gather(
+            *(projectManager.getRemoteSubject(projectA, "token") for i in range(3))
+        )
+        assert all(fontHandler is fontHandlers[0] for fontHandler in fontHandlers)
+    finally:
+        await projectManager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_preload():
+    projectManager = FileSystemProjectManager(
+        dataDir,
+        readOnly=True,
+        keepWarmLimits=KeepWarmLimits(idleTimeout=0),
+        preloadProjects=["mutatorsans/MutatorSansBold*.ufo", projectA, "nothing*"],
+        preloadGlyphs=True,
+    )
+    try:
+        await projectManager.preload()
+        assert sorted(projectManager.fontHandlers) == sorted(
+            [
+                projectA,
+                "mutatorsans/MutatorSansBoldCondensed.ufo",
+                "mutatorsans/MutatorSansBoldWide.ufo",
+            ]
+        )
+        fontHandler = projectManager.fontHandlers[projectA]
+        glyphMap = await fontHandler.getGlyphMap()
+        assert len(fontHandler.localData.glyphs) == len(glyphMap)
+
+        # Preloaded projects are not closed when their last connection closes
+        misses = fontHandler.getCacheStats()["glyphs"]["misses"]
+        await connectAndDisconnect(projectManager, projectA)
+        assert projectManager.fontHandlers[projectA] is fontHandler
+        assert fontHandler.getCacheStats()["glyphs"]["misses"] == misses
+    finally:
+        await projectManager.aclose()
+
+
+def makeProjects(rootPath, relativePaths):
+    for relativePath in relativePaths:
+        path = rootPath / relativePath
+        path.mkdir(parents=True)
+        (path / "metainfo.plist").write_text("")
+
+
+@pytest.mark.asyncio
+async def test_projectIndex(tmp_path):
+    makeProjects(
+        tmp_path,
+        ["b.ufo", "a/a.ufo", "a/b/c.fontra", "a/b/c/too-deep.ufo", "c/d/e/f.ufo"],
+    )
+    index = ProjectIndex(tmp_path, fileExtensions, 3)
+    try:
+        assert await index.getProjectList() == ["a/a.ufo", "a/b/c.fontra", "b.ufo"]
+        # Folders that can't contain projects within maxFolderDepth, and the
+        # projects themselves, are not watched
+        assert watchedFolders(index) == {"", "a", "a/b", "c", "c/d"}
+
+        makeProjects(tmp_path, ["x/y.ufo", "x/z/z.ufo", "x/z/w/too-deep.ufo"])
+        await index._processChanges(
+            {
+                (Change.added, os.fspath(tmp_path / "x")),
+                (Change.added, os.fspath(tmp_path / "x" / "y.ufo")),
+                (Change.added, os.fspath(tmp_path / "x" / "y.ufo" / "metainfo.plist")),
+            }
+        )
+        assert await index.getProjectList() == [
+            "a/a.ufo",
+            "a/b/c.fontra",
+            "b.ufo",
+            "x/y.ufo",
+            "x/z/z.ufo",
+        ]
+        assert watchedFolders(index) == {"", "a", "a/b", "c", "c/d", "x", "x/z"}
+
+        await index._processChanges(
+            {
+                (Change.deleted, os.fspath(tmp_path / "a")),
+                (Change.deleted, os.fspath(tmp_path / "b.ufo" / "metainfo.plist")),
+            }
+        )
+        assert await index.getProjectList() == ["b.ufo", "x/y.ufo", "x/z/z.ufo"]
+        assert watchedFolders(index) == {"", "c", "c/d", "x", "x/z"}
+    finally:
+        await index.aclose()
+
+
+@pytest.mark.asyncio
+async def test_projectIndex_buildFailed(tmp_path, monkeypatch):
+    makeProjects(tmp_path, ["a.ufo"])
+    index = ProjectIndex(tmp_path, fileExtensions, 3)
+    findProjects = index._findProjects
+
+    def failingFindProjects(folderPath, maxDepth):
+        raise PermissionError(folderPath)
+
+    monkeypatch.setattr(index, "_findProjects", failingFindProjects)
+    try:
+        with pytest.raises(PermissionError):
+            await index.getProjectList()
+        assert index._fileWatcher is None
+
+        # The next request builds the list again
+        monkeypatch.setattr(index, "_findProjects", findProjects)
+        assert await index.getProjectList() == ["a.ufo"]
+    finally:
+        await index.aclose()
+
+
+def watchedFolders(index):
+    return {
+        "/".join(folder.relative_to(index.rootPath).parts)
+        for folder in index._watchedFolders
+    }
+
+
+@pytest.mark.asyncio
+async def test_projectIndex_watch(tmp_path):
+    makeProjects(tmp_path, ["a.ufo"])
+    index = ProjectIndex(tmp_path, fileExtensions, 3)
+    try:
+        assert await index.getProjectList() == ["a.ufo"]
+        await asyncio.sleep(0.3)  # Give the file watcher time to start
+        makeProjects(tmp_path, ["folder/b.ufo"])
+        for i in range(50):
+            await asyncio.sleep(0.1)
+            if len(await index.getProjectList()) == 2:
+                break
+        assert await index.getProjectList() == ["a.ufo", "folder/b.ufo"]
+
+        # Changes in a subfolder that was added after the index was built
+        await asyncio.sleep(0.3)
+        makeProjects(tmp_path, ["folder/c.ufo"])
+        shutil.rmtree(tmp_path / "folder" / "b.ufo")
+        for i in range(50):
+            await asyncio.sleep(0.1)
+            if await index.getProjectList() == ["a.ufo", "folder/c.ufo"]:
+                break
+        assert await index.getProjectList() == ["a.ufo", "folder/c.ufo"]
+    finally:
+        await index.aclose()
+
+
+class DummyProjectManager(FileSystemProjectManager):
+    async def getProjectList(self, token):
+        return ["a/x.ufo", "a/y.ufo", "b/x.ufo", "c.ufo"]
+
+
+@pytest.mark.parametrize(
+    "query, expectedProjects, expectedTotalCount",
+    [
+        ("", ["a/x.ufo", "a/y.ufo", "b/x.ufo", "c.ufo"], 4),
+        ("?prefix=a/", ["a/x.ufo", "a/y.ufo"], 2),
+        ("?offset=1&limit=2", ["a/y.ufo", "b/x.ufo"], 4),
+        ("?prefix=a/&offset=1", ["a/y.ufo"], 2),
+        ("?limit=0", [], 4),
+    ],
+)
+@pytest.mark.asyncio
+async def test_projectListHandler(query, expectedProjects, expectedTotalCount):
+    server = FontraServer(
+        host="localhost", httpPort=0, projectManager=DummyProjectManager()
+    )
+    server.setup()
+
+    async with TestClient(TestServer(server.httpApp)) as client:
+        response = await client.get(f"/projectlist{query}")
+        assert response.status == 200
+        assert await response.json() == expectedProjects
+        assert response.headers["X-Total-Count"] == str(expectedTotalCount)
+
+        response = await client.get("/projectlist?limit=abc")
+        assert response.status == 400
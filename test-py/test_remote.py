@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+
+from fontra.core.binarymessage import (
+    MESSAGE_KIND_BINARY,
+    MESSAGE_KIND_TEXT,
+    decodeBinaryMessage,
+    decodeMessageChunk,
+    isMessageChunk,
+)
+from fontra.core.remote import RemoteObjectConnection
+
+
+class MockWebSocket:
+    def __init__(self):
+        self.sentMessages = []
+
+    async def send_str(self, data):
+        self.sentMessages.append(json.loads(data))
+
+    async def send_json(self, data):
+        self.sentMessages.append(json.loads(json.dumps(data)))
+
+    async def send_bytes(self, data):
+        self.sentMessages.append(data)
+
+
+def makeConnection(chunkSize):
+    connection = RemoteObjectConnection(
+        MockWebSocket(), "dummy", None, False, chunkSize=chunkSize
+    )
+    connection.useChunkedMessages = chunkSize > 0
+    return connection
+
+
+def joinMessageChunks(chunkMessages):
+    chunks = [decodeMessageChunk(data) for data in chunkMessages]
+    chunkedMessageID, _, chunkCount, messageKind, _ = chunks[0]
+    assert all(chunk[0] == chunkedMessageID for chunk in chunks)
+    assert [chunk[1] for chunk in chunks] == list(range(chunkCount))
+    assert all(chunk[2] == chunkCount for chunk in chunks)
+    data = b"".join(chunk[4] for chunk in chunks)
+    if messageKind == MESSAGE_KIND_BINARY:
+        return chunkedMessageID, decodeBinaryMessage(data)
+    assert messageKind == MESSAGE_KIND_TEXT
+    return chunkedMessageID, json.loads(data.decode("utf-8"))
+
+
+@pytest.mark.asyncio
+async def test_sendMessage_chunked():
+    connection = makeConnection(10)
+    message = {"client-call-id": 0, "return-value": "\u00e9" * 25}
+    await connection.sendMessage(message)
+
+    chunkMessages = connection.websocket.sentMessages
+    assert len(chunkMessages) > 1
+    assert all(isMessageChunk(data) for data in chunkMessages)
+    # The chunks are slices of the JSON text, which isn't escaped again
+    assert all(len(decodeMessageChunk(data)[4]) <= 10 for data in chunkMessages)
+    assert (0, message) == joinMessageChunks(chunkMessages)
+
+    connection.websocket.sentMessages = []
+    await connection.sendMessage(message)
+    assert joinMessageChunks(connection.websocket.sentMessages)[0] == 1
+
+
+@pytest.mark.asyncio
+async def test_sendMessage_chunkedBinary():
+    connection = makeConnection(100)
+    connection.useBinaryMessages = True
+    coordinates = [float(i) for i in range(100)]
+    message = {
+        "client-call-id": 0,
+        "return-value": {"coordinates": coordinates, "pointTypes": [0] * 50},
+    }
+    await connection.sendMessage(message)
+
+    chunkMessages = connection.websocket.sentMessages
+    assert len(chunkMessages) > 1
+    assert all(isMessageChunk(data) for data in chunkMessages)
+    assert (0, message) == joinMessageChunks(chunkMessages)
+
+
+@pytest.mark.asyncio
+async def test_sendMessage_notChunked():
+    message = {"client-call-id": 0, "return-value": "x" * 25}
+
+    connection = makeConnection(1000)
+    await connection.sendMessage(message)
+    assert [message] == connection.websocket.sentMessages
+
+    connection = makeConnection(0)
+    await connection.sendMessage(message)
+    assert [message] == connection.websocket.sentMessages
+
+
+@pytest.mark.asyncio
+async def test_notify():
+    connection = makeConnection(0)
+    connection.useNotifications = True
+    await connection.notify("externalChange", {"p": []}, True)
+    assert [
+        {"notification": "externalChange", "arguments": [{"p": []}, True]}
+    ] == connection.websocket.sentMessages
+    assert {} == connection.callReturnFutures
+
+
+@pytest.mark.asyncio
+async def test_callMethod_timeout():
+    connection = makeConnection(0)
+    connection.callTimeout = 0.01
+    with pytest.raises(asyncio.TimeoutError):
+        await connection.callMethod("messageFromServer", "headline", "message")
+    assert [0] == [m["server-call-id"] for m in connection.websocket.sentMessages]
+    assert {} == connection.callReturnFutures
+
+    # A notification falls back to a regular call for older clients
+    with pytest.raises(asyncio.TimeoutError):
+        await connection.notify("reloadData", {})
+    assert "method-name" in connection.websocket.sentMessages[-1]
+    assert {} == connection.callReturnFutures
@@ -0,0 +1,51 @@
+import pytest
+
+from fontra.core.classes import unstructure
+from fontra.core.path import PackedPathPointPen
+from fontra.core.serverutils import callAPIFunction
+from fontra.core.subprocess import runInSubProcess
+
+
+def buildRectPath(x, y, w, h):
+    pen = PackedPathPointPen()
+    pen.beginPath()
+    pen.addPoint((x, y), "line")
+    pen.addPoint((x, y + h), "line")
+    pen.addPoint((x + w, y + h), "line")
+    pen.addPoint((x + w, y), "line")
+    pen.endPath()
+    return unstructure(pen.getPath())
+
+
+rect1 = buildRectPath(0, 0, 100, 100)
+rect2 = buildRectPath(50, 50, 100, 100)
+rect3 = buildRectPath(75, 0, 100, 100)
+
+
+@pytest.mark.parametrize(
+    "functionName", ["subtractPath", "intersectPath", "excludePath"]
+)
+def test_batchPathFunctions(functionName):
+    pathsA = [rect1, rect2]
+    pathsB = [rect2, rect3]
+    expectedResult = [
+        callAPIFunction(functionName, dict(pathA=pathA, pathB=pathB))
+        for pathA, pathB in zip(pathsA, pathsB)
+    ]
+    result = callAPIFunction(functionName + "s", dict(pathsA=pathsA, pathsB=pathsB))
+    assert expectedResult == result
+
+    with pytest.raises(ValueError):
+        callAPIFunction(functionName + "s", dict(pathsA=pathsA, pathsB=pathsB[:1]))
+
+
+def test_unionPaths():
+    paths = [rect1, rect2]
+    expectedResult = [callAPIFunction("unionPath", dict(path=path)) for path in paths]
+    assert expectedResult == callAPIFunction("unionPaths", dict(paths=paths))
+
+
+@pytest.mark.asyncio
+async def test_callAPIFunction_subProcess():
+    result = await runInSubProcess(callAPIFunction, "unionPaths", dict(paths=[rect1]))
+    assert [callAPIFunction("unionPath", dict(path=rect1))] == result
@@ -0,0 +1,150 @@
+import gzip
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from fontra.core.server import FontraServer, mimeTypes
+from fontra.core.staticassets import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    StaticAssetIndex,
+    parseAcceptEncoding,
+)
+
+scriptSource = b"export const answer = 42;\n" * 100
+
+
+@pytest.fixture
+def contentRoot(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "editor.1a2b3c4d.js").write_bytes(scriptSource)
+    (tmp_path / "test.js").write_bytes(scriptSource)
+    (tmp_path / "small.css").write_bytes(b"body {}\n")
+    (tmp_path / "secret.py").write_bytes(b"print('hi')\n")
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "acceptEncoding, expectedEncodings",
+    [
+        ("", set()),
+        ("gzip", {"gzip"}),
+        ("gzip, deflate, br", {"gzip", "deflate", "br"}),
+        ("br;q=1.0, gzip;q=0", {"br"}),
+        ("GZIP ; q=0.5", {"gzip"}),
+        ("*", {"*", "br", "gzip"}),
+    ],
+)
+def test_parseAcceptEncoding(acceptEncoding, expectedEncodings):
+    assert parseAcceptEncoding(acceptEncoding) == expectedEncodings
+
+
+async def test_staticAssetIndex(contentRoot):
+    assetIndex = StaticAssetIndex(contentRoot, mimeTypes, frozenset(mimeTypes))
+
+    asset = await assetIndex.getAsset("/test.js")
+    assert asset.data == scriptSource
+    assert asset.contentType == "application/javascript"
+    assert not asset.isVersioned
+    assert asset.cacheControl == REVALIDATE_CACHE_CONTROL
+    assert gzip.decompress(asset.encodings["gzip"]) == scriptSource
+    assert await assetIndex.getAsset("/test.js") is asset
+
+    versionedAsset = await assetIndex.getAsset("/js/editor.1a2b3c4d.js")
+    assert versionedAsset.isVersioned
+    assert versionedAsset.cacheControl == IMMUTABLE_CACHE_CONTROL
+    assert versionedAsset.etag == asset.etag
+
+    smallAsset = await assetIndex.getAsset("/small.css")
+    assert smallAsset.encodings == {}
+    assert smallAsset.getVariant("gzip") == (None, b"body {}\n", smallAsset.etag)
+
+    assert await assetIndex.getAsset("/secret.py") is None
+    assert await assetIndex.getAsset("/js") is None
+    assert await assetIndex.getAsset("/missing.js") is None
+    assert await assetIndex.getAsset("/../test.js") is None
+    assert len(assetIndex) == 3
+
+
+async def test_staticAssetIndex_preload(contentRoot):
+    assetIndex = StaticAssetIndex(contentRoot, mimeTypes, frozenset(mimeTypes))
+    await assetIndex.preload()
+    assert len(assetIndex) == 3
+    (contentRoot / "test.js").write_bytes(b"changed")
+    asset = await assetIndex.getAsset("/test.js")
+    assert asset.data == scriptSource
+
+
+async def test_staticAssetIndex_noCache(contentRoot):
+    assetIndex = StaticAssetIndex(
+        contentRoot, mimeTypes, frozenset(mimeTypes), cacheContents=False
+    )
+    asset = await assetIndex.getAsset("/test.js")
+    (contentRoot / "test.js").write_bytes(b"changed")
+    changedAsset = await assetIndex.getAsset("/test.js")
+    assert changedAsset.data == b"changed"
+    assert changedAsset.etag != asset.etag
+    assert len(assetIndex) == 0
+
+
+class DummyProjectManager:
+    def setupWebRoutes(self, server):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+async def test_staticContentHandler(contentRoot):
+    server = FontraServer(
+        host="localhost",
+        httpPort=0,
+        projectManager=DummyProjectManager(),
+        contentRoot=contentRoot,
+    )
+    server.setup()
+
+    async with TestClient(TestServer(server.httpApp)) as client:
+        response = await client.get("/test.js", headers={"Accept-Encoding": "gzip"})
+        assert response.status == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+        assert await response.read() == scriptSource
+        gzipETag = response.headers["ETag"]
+        assert gzipETag.endswith('-gzip"')
+
+        response = await client.get(
+            "/test.js", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipETag}
+        )
+        assert response.status == 304
+        assert response.headers["ETag"] == gzipETag
+
+        response = await client.get("/test.js", headers={"Accept-Encoding": "identity"})
+        assert response.status == 200
+        assert "Content-Encoding" not in response.headers
+        assert await response.read() == scriptSource
+        plainETag = response.headers["ETag"]
+        assert plainETag != gzipETag
+
+        # The gzip ETag does not match the uncompressed variant
+        response = await client.get(
+            "/test.js",
+            headers={"Accept-Encoding": "identity", "If-None-Match": gzipETag},
+        )
+        assert response.status == 200
+
+        response = await client.get("/js/editor.1a2b3c4d.js")
+        assert response.status == 200
+        assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+
+        response = await client.get("/secret.py")
+        assert response.status == 404
+        response = await client.get("/missing.js")
+        assert response.status == 404
+
+
+async def test_staticAssetIndex_preload_missingContentRoot(tmp_path):
+    assetIndex = StaticAssetIndex(tmp_path / "missing", mimeTypes, frozenset(mimeTypes))
+    await assetIndex.preload()
+    assert len(assetIndex) == 0
@@ -0,0 +1,56 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+from fontra.core.subprocess import ProcessPool
+
+
+@pytest.mark.asyncio
+async def test_processPool():
+    pool = ProcessPool(2)
+    try:
+        assert 2 == await pool.run(None, math.sqrt, 4)
+        assert [3, 4] == await asyncio.gather(
+            pool.run(10, math.sqrt, 9), pool.run(10, math.sqrt, 16)
+        )
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_processPool_timeout():
+    pool = ProcessPool(2)
+    try:
+        assert 2 == await pool.run(None, math.sqrt, 4)
+        assert pool._current is not None
+        processes = list(pool._current.executor._processes.values())
+
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(0.2, time.sleep, 60)
+
+        # The stuck worker process is killed, and new calls use a fresh pool
+        for process in processes:
+            process.join(5)
+            assert not process.is_alive()
+        assert pool._current is None
+        assert not pool._retired
+        assert 3 == await pool.run(None, math.sqrt, 9)
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_processPool_timeoutWithOtherCalls():
+    pool = ProcessPool(2)
+    try:
+        otherCall = asyncio.create_task(pool.run(None, time.sleep, 0.5))
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(0.1, time.sleep, 60)
+        # The pool is retired, but its other call is allowed to finish
+        assert len(pool._retired) == 1
+        assert None is await otherCall
+        assert not pool._retired
+    finally:
+        pool.shutdown()
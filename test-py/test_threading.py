@@ -0,0 +1,30 @@
+import threading
+
+import pytest
+
+from fontra.core.threading import configureBlockingIO, runBlockingIO
+
+
+def getThreadName():
+    return threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_runBlockingIO():
+    threadName = await runBlockingIO(getThreadName)
+    assert threadName.startswith("fontra-io")
+
+
+@pytest.mark.asyncio
+async def test_runBlockingIO_inline():
+    configureBlockingIO(inline=True)
+    try:
+        threadName = await runBlockingIO(getThreadName)
+    finally:
+        configureBlockingIO(inline=False)
+    assert threadName == threading.current_thread().name
+
+
+def test_configureBlockingIO_invalid():
+    with pytest.raises(ValueError):
+        configureBlockingIO(maxWorkers=0)